@@ -0,0 +1,18 @@
+"""
+Configuration gunicorn (lue automatiquement au lancement de `gunicorn`).
+
+Profil choisi par la variable GUNICORN_PROFIL :
+    wsgi (défaut) : workers synchrones, une requête à la fois par worker
+    asgi          : workers uvicorn, les vues asynchrones (/api/async/...)
+                    attendent la base sans bloquer le worker
+"""
+
+import os
+
+PROFIL = os.environ.get('GUNICORN_PROFIL', 'wsgi')
+
+if PROFIL == 'asgi':
+    wsgi_app = 'monsitereservation.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'monsitereservation.wsgi:application'
@@ -27,6 +27,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'reservation.instrumentation.InstrumentationMiddleware',  # 🛰️ Inactif sans INSTRUMENTATION=true
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -34,6 +35,7 @@ MIDDLEWARE = [
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'reservation.routage.RepliqueMiddleware',  # 🪞 Inactif sans réplique configurée
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -44,6 +46,8 @@ TEMPLATES = [
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
+        # ⚡ Sans 'loaders', Django enveloppe déjà les chargeurs dans cached.Loader :
+        # chaque gabarit est compilé une fois par processus (rechargé à chaud en DEBUG)
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.request',
@@ -72,9 +76,94 @@ else:
         }
     }
 
+# 🪞 RÉPLIQUE EN LECTURE (optionnelle) - lectures des vues @lecture_replique
+# En local : SQLITE_REPLIQUE=db-replique.sqlite3 puis « manage.py copier_replique »
+if 'DATABASE_REPLICA_URL' in os.environ:
+    import dj_database_url
+    DATABASES['replique'] = dj_database_url.parse(os.environ['DATABASE_REPLICA_URL'], conn_max_age=600)
+elif os.environ.get('SQLITE_REPLIQUE'):
+    DATABASES['replique'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / os.environ['SQLITE_REPLIQUE'],
+    }
+REPLIQUE_ALIAS = 'replique' if 'replique' in DATABASES else None
+if REPLIQUE_ALIAS:
+    DATABASES['replique']['TEST'] = {'MIRROR': 'default'}  # 🧪 Même base de test que la principale
+DATABASE_ROUTERS = ['reservation.routage.RouteurReplique']
+REPLIQUE_EPINGLE = int(os.environ.get('REPLIQUE_EPINGLE', 5))  # Secondes sur la principale après une écriture
+
+# ✅ CACHE - mémoire locale par défaut, fichier ou base de données via CACHE_BACKEND
+# (locmem est propre à chaque worker gunicorn : préférer 'fichier' ou 'base' en production)
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'memoire')
+if CACHE_BACKEND == 'fichier':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('CACHE_LOCATION', BASE_DIR / 'cache'),
+        }
+    }
+elif CACHE_BACKEND == 'base':
+    # ⚠️ Nécessite : python manage.py createcachetable
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'cache_reservation',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'campus-reservation',
+        }
+    }
+
+# Cache vu par tous les workers ? Sinon, ni le fragment « dernières réservations »
+# ni l'utilisateur de la session ne sont mis en cache (leur invalidation n'atteindrait
+# que le worker qui a écrit) et les clés d'idempotence sont ignorées
+CACHE_PARTAGE = CACHE_BACKEND != 'memoire'
+# Durée de vie des salles en cache (borne aussi le retard des autres workers en locmem)
+CACHE_SALLES_TIMEOUT = int(os.environ.get('CACHE_SALLES_TIMEOUT', 300))
+# 🔂 Clés d'idempotence du formulaire de réservation (double clic, F5 après un POST lent)
+IDEMPOTENCE_TIMEOUT = int(os.environ.get('IDEMPOTENCE_TIMEOUT', 600))  # Résultat rejoué pendant 10 min
+# Fragments de l'accueil ({% cache %}) : cartes des salles, dernières réservations
+CACHE_FRAGMENTS_TIMEOUT = int(os.environ.get('CACHE_FRAGMENTS_TIMEOUT', 300))
+
+# ✅ INSTRUMENTATION (opt-in) - Server-Timing, /metriques/ et profils cProfile
+INSTRUMENTATION = os.environ.get('INSTRUMENTATION', 'False').lower() == 'true'
+INSTRUMENTATION_JETON = os.environ.get('INSTRUMENTATION_JETON', '')  # Bearer du scraper Prometheus
+INSTRUMENTATION_ECHANTILLON = float(os.environ.get('INSTRUMENTATION_ECHANTILLON', 0))  # 0.01 = 1 % profilé
+INSTRUMENTATION_PROFILS = int(os.environ.get('INSTRUMENTATION_PROFILS', 10))  # Profils les plus lents gardés
+INSTRUMENTATION_DOSSIER_PROFILS = os.environ.get('INSTRUMENTATION_DOSSIER_PROFILS', BASE_DIR / 'profils')
+
+# 📡 FLUX SSE DU DASHBOARD (journal en base, sans Redis)
+FLUX_INTERVALLE = float(os.environ.get('FLUX_INTERVALLE', 2))  # Sondage du journal (écritures des autres workers)
+FLUX_PULSATION = float(os.environ.get('FLUX_PULSATION', 15))  # Commentaire envoyé sur un flux inactif
+FLUX_DUREE_MAX = float(os.environ.get('FLUX_DUREE_MAX', 300))  # Puis le navigateur se reconnecte (Last-Event-ID)
+FLUX_RETENTION = int(os.environ.get('FLUX_RETENTION', 7 * 24 * 3600))  # Événements gardés pour la reprise (purgés par manage.py purger_flux)
+
+# 📅 ABONNEMENTS ICALENDAR (par salle, par utilisateur)
+CALENDRIER_JOURS_PASSES = int(os.environ.get('CALENDRIER_JOURS_PASSES', 30))  # Historique inclus dans les flux
+
+# 📊 ANALYSES D'OCCUPATION (NumPy)
+ANALYSES_CACHE_TIMEOUT = int(os.environ.get('ANALYSES_CACHE_TIMEOUT', 3600))  # Résultats gardés par période
+ANALYSES_JOURS_MAX = int(os.environ.get('ANALYSES_JOURS_MAX', 366))  # Période la plus longue acceptée
+
 # ✅ UTILISATEUR PERSONNALISÉ
 AUTH_USER_MODEL = 'reservation.Utilisateur'
 
+# 🔐 Seuls les comptes approuvés s'authentifient (plus de contrôle dans chaque vue)
+AUTHENTICATION_BACKENDS = ['reservation.backends.ApprobationBackend']
+AUTH_CACHE_TIMEOUT = int(os.environ.get('AUTH_CACHE_TIMEOUT', 300))  # Utilisateur de la session en cache
+
+# ✅ SESSIONS - cache (cached_db, défaut), cookie (signed_cookies) ou base (db)
+SESSION_STRATEGIE = os.environ.get('SESSION_STRATEGIE', 'cache')
+SESSION_ENGINE = {
+    'cache': 'django.contrib.sessions.backends.cached_db',
+    'cookie': 'django.contrib.sessions.backends.signed_cookies',
+    'base': 'django.contrib.sessions.backends.db',
+}[SESSION_STRATEGIE]
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'
@@ -100,6 +189,8 @@ USE_TZ = True
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# 🎨 CSS des pages dans reservation/static : collectstatic les publie sous un nom
+# haché (cache navigateur d'un an) avec leurs versions .gz, servies par WhiteNoise
 STORAGES = {
     'staticfiles': {
         'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
@@ -111,7 +202,14 @@ LOGIN_URL = 'reservation:connexion'
 LOGIN_REDIRECT_URL = 'reservation:accueil'
 LOGOUT_REDIRECT_URL = 'reservation:connexion'
 
+# 🧪 « manage.py test » tourne sans collectstatic : le lanceur sert les CSS sans manifeste
+TEST_RUNNER = 'reservation.lanceur_tests.LanceurTests'
+
 # ✅ EMAILS (mode développement)
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+# 📧 File d'envoi (commande envoyer_emails)
+EMAIL_TAILLE_LOT = int(os.environ.get('EMAIL_TAILLE_LOT', 50))  # Emails par connexion SMTP
+EMAIL_MAX_TENTATIVES = int(os.environ.get('EMAIL_MAX_TENTATIVES', 5))  # Échecs avant « Abandonné »
+EMAIL_BAIL = int(os.environ.get('EMAIL_BAIL', 600))  # Lot « En cours » repris après ce délai (worker arrêté)
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
\ No newline at end of file
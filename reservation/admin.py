@@ -1,12 +1,21 @@
 from django.contrib import admin
 from django.contrib import messages
 from django.contrib.auth.admin import UserAdmin
-from django.db.models import Q
-from django.utils.html import format_html
-from django.core.mail import send_mail
-from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.db import transaction
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
 from django.utils import timezone
-from .models import Utilisateur, Salle, Reservation
+from .models import Utilisateur, Salle, Reservation, ReservationArchivee, EmailSortant, Recurrence, DemandeAttente
+from .forms import ReservationAdminForm, ImportUtilisateursForm
+from .services import reserver, valider_en_lot
+from . import statistiques
+from .disponibilites import recalculer_masques
+from .cache import invalider_reservations
+from .comptes import approuver, importer_utilisateurs
+from .attente import signaler_liberations
+from . import flux
 
 @admin.register(Utilisateur)
 class UtilisateurAdmin(UserAdmin):
@@ -14,15 +23,42 @@ class UtilisateurAdmin(UserAdmin):
     list_filter = ['statut', 'est_approuve']
     search_fields = ['username', 'email']
     actions = ['approuver_comptes']
+    change_list_template = 'admin/reservation/utilisateur/change_list.html'
     
     fieldsets = UserAdmin.fieldsets + (
         ('Infos', {'fields': ('statut', 'telephone', 'est_approuve')}),
     )
     
     def approuver_comptes(self, request, queryset):
-        queryset.update(est_approuve=True)
-        self.message_user(request, f"✅ {queryset.count()} compte(s) approuvé(s)")
+        approuves = approuver(queryset)
+        self.message_user(request, f"✅ {len(approuves)} compte(s) approuvé(s)")
     approuver_comptes.short_description = "Approuver les comptes"
+    
+    def get_urls(self):
+        return [
+            path('importer/', self.admin_site.admin_view(self.importer_csv), name='reservation_utilisateur_importer'),
+        ] + super().get_urls()
+    
+    # 📥 Import d'une liste de classe, comme la commande importer_utilisateurs
+    def importer_csv(self, request):
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+        form = ImportUtilisateursForm(request.POST or None, request.FILES or None)
+        resultat = None
+        if form.is_valid():
+            resultat = importer_utilisateurs(form.cleaned_data['fichier'])
+            self.message_user(request, f"✅ {len(resultat.crees)} compte(s) créé(s), "
+                                       f"{len(resultat.erreurs)} ligne(s) écartée(s)")
+            if not resultat.erreurs and not resultat.mots_de_passe_generes:
+                return redirect('admin:reservation_utilisateur_changelist')
+        # Erreurs et mots de passe générés affichés une seule fois, sur cette page
+        return TemplateResponse(request, 'admin/reservation/utilisateur/importer.html', {
+            **self.admin_site.each_context(request),
+            'title': "Importer une liste de classe",
+            'opts': self.model._meta,
+            'form': form,
+            'resultat': resultat,
+        })
 
 @admin.register(Salle)
 class SalleAdmin(admin.ModelAdmin):
@@ -38,25 +74,82 @@ class ReservationAdmin(admin.ModelAdmin):
     search_fields = ['utilisateur__username', 'salle__nom']
     actions = ['valider_reservations', 'refuser_reservations']
     list_editable = ['statut']
+    list_select_related = ['salle', 'utilisateur']
+    form = ReservationAdminForm
+    
+    def get_changelist_form(self, request, **kwargs):
+        kwargs.setdefault('form', ReservationAdminForm)
+        return super().get_changelist_form(request, **kwargs)
+    
+    def save_model(self, request, obj, form, change):
+        reserver(obj)
     
     def valider_reservations(self, request, queryset):
-        for resa in queryset:
-            conflits = Reservation.objects.filter(
-                salle=resa.salle,
-                date=resa.date,
-                statut="Validée",
-            ).filter(
-                Q(heure_debut__lt=resa.heure_fin, 
-                  heure_fin__gt=resa.heure_debut)
-            ).exclude(pk=resa.pk)
-            
-            if not conflits.exists():
-                resa.statut = "Validée"
-                resa.save()
-        self.message_user(request, f"✅ Réservation(s) validée(s)")
+        resultat = valider_en_lot(queryset)
+        self.message_user(request, f"✅ {len(resultat.acceptees)} réservation(s) validée(s)")
+        if resultat.rejetees:
+            self.message_user(
+                request,
+                f"⚠️ {len(resultat.rejetees)} réservation(s) en conflit non validée(s) : "
+                + ", ".join(str(resa) for resa in resultat.rejetees),
+                level=messages.WARNING,
+            )
     valider_reservations.short_description = "Valider"
     
     def refuser_reservations(self, request, queryset):
-        queryset.update(statut="Refusée")
+        with transaction.atomic():
+            avant = statistiques.compter_par_statut(queryset)
+            lignes = list(queryset.order_by().values_list('pk', 'statut', 'salle_id', 'date', 'utilisateur_id'))
+            queryset.update(statut="Refusée")
+            statistiques.ajuster_statuts(avant, "Refusée")
+            recalculer_masques({(salle_id, date) for _, _, salle_id, date, _ in lignes})
+            flux.publier_statuts([(pk, statut) for pk, statut, _, _, _ in lignes], "Refusée")
+            invalider_reservations(utilisateur_id for _, _, _, _, utilisateur_id in lignes)
+            signaler_liberations(
+                (salle_id, date) for _, statut, salle_id, date, _ in lignes if statut in Reservation.STATUTS_ACTIFS
+            )
         self.message_user(request, f"❌ Réservation(s) refusée(s)")
-    refuser_reservations.short_description = "Refuser"
\ No newline at end of file
+    refuser_reservations.short_description = "Refuser"
+
+@admin.register(Recurrence)
+class RecurrenceAdmin(admin.ModelAdmin):
+    list_display = ['salle', 'utilisateur', 'date_debut', 'date_fin', 'heure_debut', 'heure_fin', 'intervalle_semaines']
+    list_filter = ['intervalle_semaines', 'salle']
+    search_fields = ['utilisateur__username', 'salle__nom']
+    list_select_related = ['salle', 'utilisateur']
+
+@admin.register(DemandeAttente)
+class DemandeAttenteAdmin(admin.ModelAdmin):
+    list_display = ['salle', 'utilisateur', 'date', 'heure_debut', 'heure_fin', 'statut', 'date_creation']
+    list_filter = ['statut', 'date', 'salle']
+    search_fields = ['utilisateur__username', 'salle__nom']
+    list_select_related = ['salle', 'utilisateur']
+    raw_id_fields = ['reservation']
+
+@admin.register(ReservationArchivee)
+class ReservationArchiveeAdmin(admin.ModelAdmin):
+    list_display = ['salle', 'utilisateur', 'date', 'heure_debut', 'heure_fin', 'statut', 'date_archivage']
+    list_filter = ['statut', 'date']
+    search_fields = ['utilisateur__username', 'salle__nom']
+    list_select_related = ['salle', 'utilisateur']
+    
+    # 🗄️ Historique figé : consultation seule
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+@admin.register(EmailSortant)
+class EmailSortantAdmin(admin.ModelAdmin):
+    list_display = ['sujet', 'destinataires', 'statut', 'tentatives', 'prochain_essai', 'date_envoi']
+    list_filter = ['statut']
+    search_fields = ['sujet', 'destinataires']
+    actions = ['remettre_en_file']
+    
+    def remettre_en_file(self, request, queryset):
+        nombre = queryset.exclude(statut='Envoyé').update(
+            statut='En attente', tentatives=0, prochain_essai=timezone.now()
+        )
+        self.message_user(request, f"📤 {nombre} email(s) remis en file")
+    remettre_en_file.short_description = "Remettre en file"
\ No newline at end of file
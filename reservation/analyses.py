@@ -0,0 +1,172 @@
+import time
+from datetime import date, timedelta
+from itertools import islice
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, CharField, IntegerField, Value, When
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from .models import Salle, Reservation, ReservationArchivee
+
+TAILLE_LOT_ANALYSE = 50000  # Lignes converties en tableaux NumPy à la fois
+JOURS = ['lundi', 'mardi', 'mercredi', 'jeudi', 'vendredi', 'samedi', 'dimanche']
+HEURES = list(range(Reservation.HEURE_OUVERTURE, Reservation.HEURE_FERMETURE))
+CODES_STATUT = {statut: code for code, (statut, _) in enumerate(Reservation.STATUT_CHOIX)}
+REFUSEE = CODES_STATUT['Refusée']
+# 🔒 Statuts qui comptent comme occupation : ceux qui bloquent un créneau, plus
+# 'Terminée' pour les jours déjà passés (le créneau a bien été utilisé)
+ACTIFS = [CODES_STATUT[statut] for statut in Reservation.STATUTS_ACTIFS]
+TERMINEE = CODES_STATUT['Terminée']
+HEURES_DE_POINTE = 5
+
+
+# 📥 LECTURE PAR LOTS
+def _colonnes(queryset):
+    # Dates et heures en texte ISO (CAST natif, sans convertisseur Python ligne à
+    # ligne ni fonction Extract, exécutée en Python sous SQLite), statut en entier :
+    # NumPy analyse ensuite chaque lot en bloc
+    return queryset.annotate(
+        jour=Cast('date', CharField()),
+        debut=Cast('heure_debut', CharField()),
+        fin=Cast('heure_fin', CharField()),
+        code_statut=Case(*[When(statut=statut, then=Value(code)) for statut, code in CODES_STATUT.items()],
+                         default=Value(-1), output_field=IntegerField()),
+    ).values_list('salle_id', 'jour', 'debut', 'fin', 'code_statut')
+
+
+def _lots(debut, fin, taille_lot):
+    """📥 Réservations vivantes puis archivées de la période, par lots de tuples"""
+    for modele in (Reservation, ReservationArchivee):
+        lignes = _colonnes(modele.objects.filter(date__range=(debut, fin))).iterator(chunk_size=taille_lot)
+        while lot := list(islice(lignes, taille_lot)):
+            yield lot
+
+
+def _jour_epoch(valeur):
+    return (valeur - date(1970, 1, 1)).days
+
+
+def _minutes(heures):
+    """⏱️ 'HH:MM[:SS]' → minutes depuis minuit, sur tout le lot à la fois"""
+    chiffres = np.array(heures, dtype='<U5').view(np.uint32).reshape(-1, 5).astype(np.int64) - ord('0')
+    return (chiffres[:, 0] * 10 + chiffres[:, 1]) * 60 + chiffres[:, 3] * 10 + chiffres[:, 4]
+
+
+# 📊 CALCUL
+def calculer_occupation(debut, fin, taille_lot=TAILLE_LOT_ANALYSE):
+    """📊 Taux d'occupation salle × jour × heure, par semaine, et taux de refus.
+
+    Une réservation occupe les minutes de chaque créneau d'une heure qu'elle
+    chevauche si elle est active (Reservation.STATUTS_ACTIFS) ou terminée un
+    jour déjà passé ; les refusées, et tout autre statut, ne comptent que dans
+    les demandes et le taux de refus. Le taux rapporte ces minutes aux
+    minutes ouvertes de la période (HEURE_OUVERTURE à HEURE_FERMETURE, sept
+    jours sur sept). Les cumuls sont des np.bincount : la mémoire ne dépend
+    que de la taille des lots, pas de l'historique.
+    """
+    depart = time.perf_counter()
+    aujourdhui = _jour_epoch(timezone.localdate())
+
+    salles = list(Salle.objects.order_by('nom', 'pk').values_list('pk', 'nom'))
+    nb_salles, nb_heures = len(salles), len(HEURES)
+    position = np.full(max([pk for pk, _ in salles], default=0) + 1, -1, dtype=np.int64)
+    position[[pk for pk, _ in salles]] = np.arange(nb_salles)
+
+    # 📅 Minutes ouvertes : jours de la période par jour de semaine et par semaine
+    premier_lundi = _jour_epoch(debut) - debut.weekday()
+    jours = np.arange(_jour_epoch(debut), _jour_epoch(fin) + 1)
+    jours_par_jour_semaine = np.bincount((jours + 3) % 7, minlength=7)  # 1970-01-01 : un jeudi
+    jours_par_semaine = np.bincount((jours - premier_lundi) // 7)
+    nb_semaines = len(jours_par_semaine)
+
+    bornes = np.array(HEURES) * 60
+    minutes = np.zeros(nb_salles * 7 * nb_heures)
+    minutes_semaines = np.zeros(nb_salles * nb_semaines)
+    demandes = np.zeros(nb_salles, dtype=np.int64)
+    refusees = np.zeros(nb_salles, dtype=np.int64)
+    total = 0
+
+    for lot in _lots(debut, fin, taille_lot):
+        salle_ids, dates, debuts, fins, statuts = zip(*lot)
+        salle_ids = np.array(salle_ids, dtype=np.int64)
+        connue = salle_ids < len(position)  # Salle créée pendant la lecture : ignorée
+        salle = np.where(connue, position[np.where(connue, salle_ids, 0)], -1)
+        garder = salle >= 0
+        salle = salle[garder]
+        jour_epoch = np.array(dates, dtype='datetime64[D]').astype(np.int64)[garder]
+        debut_min = _minutes(debuts)[garder]
+        fin_min = _minutes(fins)[garder]
+        statut = np.array(statuts)[garder]
+        total += len(salle)
+
+        demandes += np.bincount(salle, minlength=nb_salles)
+        refusees += np.bincount(salle[statut == REFUSEE], minlength=nb_salles)
+
+        occupe = np.isin(statut, ACTIFS) | ((statut == TERMINEE) & (jour_epoch <= aujourdhui))
+        salle, jour_epoch = salle[occupe], jour_epoch[occupe]
+        # Minutes de chaque réservation dans chaque créneau : matrice (réservations × heures)
+        chevauchement = np.clip(
+            np.minimum(fin_min[occupe, None], bornes + 60) - np.maximum(debut_min[occupe, None], bornes), 0, 60,
+        )
+        cellule = (salle * 7 + (jour_epoch + 3) % 7) * nb_heures
+        minutes += np.bincount((cellule[:, None] + np.arange(nb_heures)).ravel(),
+                               weights=chevauchement.ravel(), minlength=len(minutes))
+        minutes_semaines += np.bincount(salle * nb_semaines + (jour_epoch - premier_lundi) // 7,
+                                        weights=chevauchement.sum(axis=1), minlength=len(minutes_semaines))
+
+    minutes = minutes.reshape(nb_salles, 7, nb_heures)
+    minutes_semaines = minutes_semaines.reshape(nb_salles, nb_semaines)
+    ouvertes_cellule = jours_par_jour_semaine[:, None] * 60.0  # Par (jour, heure)
+    ouvertes_semaine = jours_par_semaine * 60.0 * nb_heures
+    with np.errstate(divide='ignore', invalid='ignore'):
+        matrices = np.nan_to_num(minutes / ouvertes_cellule)
+        semaines = minutes_semaines / ouvertes_semaine
+        globale = np.nan_to_num(minutes.sum(axis=0) / (ouvertes_cellule * nb_salles))
+        par_salle = minutes.sum(axis=(1, 2)) / (ouvertes_cellule.sum() * nb_heures)
+        taux_refus = np.nan_to_num(refusees / demandes)
+
+    pointe = np.argsort(globale, axis=None, kind='stable')[::-1][:HEURES_DE_POINTE]
+    return {
+        'debut': debut.isoformat(),
+        'fin': fin.isoformat(),
+        'jours': JOURS,
+        'heures': HEURES,
+        'semaines': [(debut - timedelta(days=debut.weekday()) + timedelta(weeks=numero)).isoformat()
+                     for numero in range(nb_semaines)],
+        'reservations': total,
+        'utilisation': round(float(minutes.sum() / (ouvertes_cellule.sum() * nb_heures * nb_salles)), 4)
+                       if nb_salles else 0.0,
+        'matrice': np.round(globale, 4).tolist(),
+        'heures_de_pointe': [
+            {'jour': JOURS[indice // nb_heures], 'heure': HEURES[indice % nb_heures],
+             'utilisation': round(float(globale.flat[indice]), 4)}
+            for indice in pointe if globale.flat[indice] > 0
+        ],
+        'salles': [
+            {
+                'id': pk, 'nom': nom,
+                'utilisation': round(float(par_salle[rang]), 4),
+                'demandes': int(demandes[rang]),
+                'refusees': int(refusees[rang]),
+                'taux_refus': round(float(taux_refus[rang]), 4),
+                'matrice': np.round(matrices[rang], 4).tolist(),
+                'semaines': np.round(semaines[rang], 4).tolist(),
+            }
+            for rang, (pk, nom) in enumerate(salles)
+        ],
+        'duree': round(time.perf_counter() - depart, 3),
+    }
+
+
+# 🗃️ CACHE PAR PÉRIODE
+def occupation(debut, fin):
+    """🗃️ calculer_occupation mis en cache ANALYSES_CACHE_TIMEOUT secondes par période"""
+    cle = f"analyses:occupation:{debut.isoformat()}:{fin.isoformat()}"
+    resultat = cache.get(cle)
+    if resultat is None:
+        resultat = calculer_occupation(debut, fin)
+        cache.set(cle, resultat, settings.ANALYSES_CACHE_TIMEOUT)
+    return resultat
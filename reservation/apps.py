@@ -1,5 +1,12 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class ReservationConfig(AppConfig):
     name = 'reservation'
+
+    def ready(self):
+        from . import signals  # noqa: F401  📡 Compteurs du dashboard
+        if settings.INSTRUMENTATION:
+            from .instrumentation import installer_chronometre
+            installer_chronometre()  # 🎨 Une fois par processus, jamais dans le middleware
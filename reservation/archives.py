@@ -0,0 +1,75 @@
+import time
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Reservation, ReservationArchivee, DemandeAttente
+from . import statistiques
+from .cache import invalider_reservations
+
+TAILLE_LOT = 1000
+JOURS_CONSERVES = 365  # ⏳ Par défaut, on archive ce qui date de plus d'un an
+
+CHAMPS = ['id', 'salle_id', 'utilisateur_id', 'date', 'heure_debut', 'heure_fin', 'statut',
+          'date_creation', 'date_traitement', 'recurrence_id']
+
+
+def archivables(avant):
+    """🗄️ Réservations closes antérieures à `avant`"""
+    return Reservation.objects.filter(date__lt=avant, statut__in=ReservationArchivee.STATUTS_ARCHIVABLES)
+
+
+def date_limite(jours=JOURS_CONSERVES):
+    return timezone.now().date() - timedelta(days=jours)
+
+
+# 📦 ARCHIVAGE PAR LOTS
+def archiver(avant, taille_lot=TAILLE_LOT, simuler=False):
+    """📦 Déplace les réservations archivables, un lot par transaction.
+
+    Génère (lignes du lot, durée en secondes) pour chaque lot. Les lots sont
+    parcourus par clé primaire croissante : chaque lot est une requête indexée
+    et une interruption ne laisse jamais de ligne à moitié déplacée.
+    En simulation, les lots sont seulement lus.
+    """
+    dernier = 0
+    while True:
+        depart = time.perf_counter()
+        with transaction.atomic():
+            lignes = list(
+                archivables(avant).filter(pk__gt=dernier).order_by('pk').values(*CHAMPS)[:taille_lot]
+            )
+            if not lignes:
+                return
+            dernier = lignes[-1]['id']
+            if not simuler:
+                ReservationArchivee.objects.bulk_create(
+                    [ReservationArchivee(**ligne) for ligne in lignes], ignore_conflicts=True,
+                )
+                # Suppression SQL directe : les signaux par ligne recalculeraient des
+                # masques inchangés (une réservation close n'occupe aucun créneau).
+                # _raw_delete ignore on_delete : le SET_NULL des demandes d'attente
+                # promues est appliqué à la main, seule référence à une réservation
+                pks = [ligne['id'] for ligne in lignes]
+                DemandeAttente.objects.filter(reservation__in=pks).update(reservation=None)
+                supprimees = Reservation.objects.filter(pk__in=pks)
+                supprimees._raw_delete(supprimees.db)
+                par_statut = {}
+                for ligne in lignes:
+                    par_statut[ligne['statut']] = par_statut.get(ligne['statut'], 0) + 1
+                statistiques.ajuster({
+                    statistiques.compteur_reservations(statut): -nombre
+                    for statut, nombre in par_statut.items()
+                })
+                invalider_reservations(ligne['utilisateur_id'] for ligne in lignes)
+        yield len(lignes), time.perf_counter() - depart
+
+
+# 📖 LECTURE UNIFIÉE (table vivante + archive)
+def historique(utilisateur):
+    """📖 Querysets (vivant, archivé) de l'historique d'un utilisateur"""
+    return (
+        Reservation.objects.filter(utilisateur=utilisateur).select_related('salle'),
+        ReservationArchivee.objects.filter(utilisateur=utilisateur).select_related('salle'),
+    )
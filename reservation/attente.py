@@ -0,0 +1,94 @@
+from collections import namedtuple
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Reservation, DemandeAttente
+from .conflits import charger_index_par_paire
+from .services import reserver, ConflitReservation
+from .utils import envoyer_email_promotion
+
+TAILLE_LOT_ATTENTE = 200
+
+ResultatPromotion = namedtuple('ResultatPromotion', ['promues', 'examinees'])
+
+
+# 🔔 CRÉNEAUX LIBÉRÉS
+def signaler_liberations(paires):
+    """🔔 Marque les demandes en file des (salle_id, date) libérés.
+
+    Un seul UPDATE, servi par l'index attente_salle_date_idx : seules les
+    demandes de ces journées sont lues, jamais toute la liste d'attente.
+    """
+    paires = {(salle_id, date) for salle_id, date in paires if salle_id and date}
+    if not paires:
+        return 0
+    return DemandeAttente.objects.filter(
+        reduce(or_, (Q(salle_id=salle_id, date=date) for salle_id, date in paires)),
+        statut='En file', a_examiner=False,
+    ).update(a_examiner=True)
+
+
+# ⌛ DEMANDES PÉRIMÉES
+def expirer(aujourd_hui=None):
+    """⌛ Passe en « Expirée » les demandes dont la date est passée"""
+    aujourd_hui = aujourd_hui or timezone.localdate()
+    return DemandeAttente.objects.filter(statut='En file', date__lt=aujourd_hui).update(
+        statut='Expirée', a_examiner=False,
+    )
+
+
+# ⏫ PROMOTION
+def promouvoir(taille_lot=TAILLE_LOT_ATTENTE):
+    """⏫ Transforme en réservations les demandes marquées dont le créneau est libre.
+
+    Les demandes sont traitées dans l'ordre d'arrivée : sur un créneau libéré,
+    la première demande compatible passe, les suivantes restent en file.
+    Les créneaux des demandes d'un lot sont chargés en une requête ;
+    reserver() revérifie sous verrou avant d'écrire. Chaque réservation et sa
+    demande « Promue » sont écrites dans la même transaction, et la marque
+    a_examiner n'est levée que sur les demandes effectivement examinées : une
+    erreur en cours de lot laisse les suivantes marquées pour le prochain passage.
+    """
+    demandes = list(
+        DemandeAttente.objects.filter(a_examiner=True, statut='En file', date__gte=timezone.localdate())
+        .select_related('salle', 'utilisateur').order_by('date_creation', 'pk')[:taille_lot]
+    )
+    if not demandes:
+        return ResultatPromotion([], 0)
+
+    index = charger_index_par_paire({(demande.salle_id, demande.date) for demande in demandes})
+    libres = [demande for demande in demandes
+              if index[(demande.salle_id, demande.date)].est_libre(demande.heure_debut, demande.heure_fin)]
+    # Sans place : examinées, marque levée avant toute écriture (une libération
+    # pendant le passage remarque la demande)
+    pk_libres = {demande.pk for demande in libres}
+    DemandeAttente.objects.filter(
+        pk__in=[demande.pk for demande in demandes if demande.pk not in pk_libres],
+    ).update(a_examiner=False)
+
+    promues = []
+    for demande in libres:
+        creneaux = index[(demande.salle_id, demande.date)]
+        if creneaux.est_libre(demande.heure_debut, demande.heure_fin):  # Pas pris par une promotion du lot
+            reservation = Reservation(
+                salle=demande.salle, utilisateur=demande.utilisateur, date=demande.date,
+                heure_debut=demande.heure_debut, heure_fin=demande.heure_fin,
+            )
+            try:
+                with transaction.atomic():
+                    reserver(reservation, statut='En attente')
+                    demande.statut, demande.reservation, demande.a_examiner = 'Promue', reservation, False
+                    demande.save(update_fields=['statut', 'reservation', 'a_examiner'])
+                    envoyer_email_promotion(demande)
+            except ConflitReservation:
+                pass  # Pris entre la lecture et l'écriture : reste en file
+            else:
+                creneaux.ajouter(demande.heure_debut, demande.heure_fin, reservation.pk)
+                promues.append(demande)
+                continue
+        DemandeAttente.objects.filter(pk=demande.pk).update(a_examiner=False)
+    return ResultatPromotion(promues, len(demandes))
@@ -0,0 +1,75 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+
+def cle_utilisateur(pk):
+    return f"auth:utilisateur:{pk}"
+
+
+def invalider_utilisateurs(pks):
+    """🧹 Oublie les utilisateurs mis en cache (après un update() sans signaux)"""
+    cache.delete_many([cle_utilisateur(pk) for pk in pks])
+
+
+def est_approuve(utilisateur):
+    # Les superutilisateurs (createsuperuser) accèdent à l'admin sans approbation
+    return utilisateur.est_approuve or utilisateur.is_superuser
+
+
+# 🔐 BACKEND D'AUTHENTIFICATION
+class ApprobationBackend(ModelBackend):
+    """🔐 ModelBackend qui refuse les comptes non approuvés.
+
+    Le contrôle est fait une fois, à authenticate(), et à chaque chargement de
+    l'utilisateur de la session : un compte désapprouvé est déconnecté à la
+    requête suivante et les vues n'ont plus à vérifier est_approuve.
+    L'utilisateur est gardé en cache (AUTH_CACHE_TIMEOUT) seulement si le
+    cache est partagé (CACHE_PARTAGE) : les signaux de Utilisateur et les
+    actions en masse l'invalident alors pour tous les workers. En locmem, un
+    compte désactivé resterait connecté sur les autres workers : relu en base.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        utilisateur = super().authenticate(request, username, password, **kwargs)
+        if utilisateur is not None and not est_approuve(utilisateur):
+            if request is not None:
+                request.compte_en_attente = True  # Lu par ConnexionForm pour son message
+            return None
+        return utilisateur
+
+    async def aauthenticate(self, request, username=None, password=None, **kwargs):
+        utilisateur = await super().aauthenticate(request, username, password, **kwargs)
+        if utilisateur is not None and not est_approuve(utilisateur):
+            if request is not None:
+                request.compte_en_attente = True
+            return None
+        return utilisateur
+
+    def get_user(self, user_id):
+        cle = cle_utilisateur(user_id)
+        utilisateur = cache.get(cle) if settings.CACHE_PARTAGE else None
+        if utilisateur is None:
+            utilisateur = super().get_user(user_id)
+            if utilisateur is None:
+                return None
+            if settings.CACHE_PARTAGE:
+                cache.set(cle, utilisateur, settings.AUTH_CACHE_TIMEOUT)
+        return self._si_autorise(utilisateur)
+
+    async def aget_user(self, user_id):
+        # request.auser() des vues asynchrones : mêmes règles, même cache
+        cle = cle_utilisateur(user_id)
+        utilisateur = await cache.aget(cle) if settings.CACHE_PARTAGE else None
+        if utilisateur is None:
+            utilisateur = await super().aget_user(user_id)
+            if utilisateur is None:
+                return None
+            if settings.CACHE_PARTAGE:
+                await cache.aset(cle, utilisateur, settings.AUTH_CACHE_TIMEOUT)
+        return self._si_autorise(utilisateur)
+
+    def _si_autorise(self, utilisateur):
+        if not (self.user_can_authenticate(utilisateur) and est_approuve(utilisateur)):
+            return None
+        return utilisateur
@@ -0,0 +1,367 @@
+import asyncio
+import gzip
+import random
+import re
+import statistics as stats
+import time as chrono
+from concurrent.futures import ThreadPoolExecutor
+from datetime import time, timedelta
+
+from django.contrib.staticfiles import finders
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.db import connection, connections
+from django.db.models import Max, Min
+from django.test import AsyncClient, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Utilisateur, Salle, Reservation
+from .disponibilites import recalculer_masques
+from .recherche import synchroniser_equipements
+from .forms import ReservationForm
+from . import statistiques
+from .cache import version_salles, version_reservations
+from .analyses import calculer_occupation
+
+# 📈 Répartition réaliste : heures de pointe en milieu de matinée et d'après-midi
+POIDS_HEURES = {8: 2, 9: 4, 10: 8, 11: 7, 12: 2, 13: 4, 14: 8, 15: 7, 16: 5, 17: 3, 18: 1, 19: 1}
+POIDS_DUREES = {1: 5, 2: 4, 3: 1}
+POIDS_JOURS = [10, 10, 10, 10, 8, 1, 0]  # lundi → dimanche
+EQUIPEMENTS = ['Projecteur', 'Wifi', 'Tableau', 'Visio', 'Sono', 'Ordinateurs']
+
+
+# 🏭 GÉNÉRATION DE DONNÉES
+def generer_donnees(nb_salles, nb_utilisateurs, nb_reservations, graine=42):
+    """🏭 Salles, utilisateurs et réservations sans chevauchement actif.
+
+    Quelques utilisateurs (secrétariats) concentrent une grande part des
+    réservations ; l'historique couvre l'année passée et le mois à venir.
+    """
+    alea = random.Random(graine)
+    aujourd_hui = timezone.now().date()
+
+    salles = Salle.objects.bulk_create([
+        Salle(
+            nom=f"Salle {numero:03d}",
+            capacite=alea.choice([12, 20, 30, 40, 60, 120, 250]),
+            localisation=f"Bâtiment {chr(65 + numero % 6)}",
+            equipements=' '.join(alea.sample(EQUIPEMENTS, alea.randint(1, 4))),
+        )
+        for numero in range(nb_salles)
+    ])
+    # Les mots de passe ne servent pas : le banc se connecte avec force_login
+    utilisateurs = Utilisateur.objects.bulk_create([
+        Utilisateur(
+            username=f"bench{numero}",
+            email=f"bench{numero}@campus.test",
+            statut='enseignant' if numero % 4 == 0 else 'delegue',
+            est_approuve=numero % 10 != 0,
+            password='!',
+        )
+        for numero in range(nb_utilisateurs)
+    ], batch_size=1000)
+    admin = Utilisateur.objects.create(
+        username='bench-admin', email='bench-admin@campus.test', statut='administrateur',
+        est_approuve=True, is_staff=True, is_superuser=True, password='!',
+    )
+    # Loi de Zipf : l'utilisateur de rang r réserve ~ 1/r fois plus que le premier
+    poids_utilisateurs = [1 / rang for rang in range(1, nb_utilisateurs + 1)]
+
+    jours = [aujourd_hui + timedelta(days=decalage) for decalage in range(-365, 31)]
+    poids_dates = [POIDS_JOURS[jour.weekday()] for jour in jours]
+    occupation = {}
+    reservations = []
+    for _ in range(nb_reservations):
+        jour = alea.choices(jours, poids_dates)[0]
+        salle = alea.choice(salles)
+        debut = alea.choices(list(POIDS_HEURES), list(POIDS_HEURES.values()))[0]
+        fin = min(debut + alea.choices(list(POIDS_DUREES), list(POIDS_DUREES.values()))[0],
+                  Reservation.HEURE_FERMETURE)
+        masque = ((1 << (fin - debut)) - 1) << (debut - Reservation.HEURE_OUVERTURE)
+
+        if jour < aujourd_hui:
+            statut = alea.choices(['Terminée', 'Refusée'], [85, 15])[0]
+        else:
+            statut = alea.choices(['En attente', 'Validée', 'Refusée'], [45, 45, 10])[0]
+        if statut in Reservation.STATUTS_ACTIFS:
+            if occupation.get((salle.pk, jour), 0) & masque:
+                statut = 'Refusée'
+            else:
+                occupation[(salle.pk, jour)] = occupation.get((salle.pk, jour), 0) | masque
+
+        reservations.append(Reservation(
+            salle=salle,
+            utilisateur=alea.choices(utilisateurs, poids_utilisateurs)[0],
+            date=jour,
+            heure_debut=time(debut),
+            heure_fin=time(fin),
+            statut=statut,
+        ))
+    Reservation.objects.bulk_create(reservations, batch_size=2000)
+
+    # bulk_create n'envoie pas de signaux
+    statistiques.recalculer()
+    recalculer_masques()
+    synchroniser_equipements(salles)
+    return {'salles': salles, 'utilisateurs': utilisateurs, 'admin': admin}
+
+
+# ⏱️ MESURE
+def mesurer(action, iterations, preparer=None):
+    """⏱️ Durées (ms) et nombres de requêtes de `iterations` appels à action(numero).
+
+    preparer(numero), hors mesure, remet les données dans l'état attendu.
+    """
+    durees, requetes = [], []
+    for numero in range(iterations):
+        if preparer:
+            preparer(numero)
+        with CaptureQueriesContext(connection) as capture:
+            depart = chrono.perf_counter()
+            action(numero)
+            durees.append((chrono.perf_counter() - depart) * 1000)
+        requetes.append(len(capture))
+    return resumer(durees, requetes)
+
+
+def resumer(durees, requetes):
+    centiles = stats.quantiles(durees, n=100, method='inclusive') if len(durees) > 1 else durees * 99
+    return {
+        'iterations': len(durees),
+        'moyenne_ms': round(stats.fmean(durees), 3),
+        'p50_ms': round(centiles[49], 3),
+        'p90_ms': round(centiles[89], 3),
+        'p99_ms': round(centiles[98], 3),
+        'max_ms': round(max(durees), 3),
+        'requetes_moyenne': round(stats.fmean(requetes), 2),
+        'requetes_max': max(requetes),
+    }
+
+
+# 🎬 SCÉNARIOS
+def scenarios(donnees, graine=42):
+    """🎬 {nom: (preparer, action)} des chemins critiques de l'application"""
+    alea = random.Random(graine)
+    demain = timezone.now().date() + timedelta(days=1)
+    salles = donnees['salles']
+    # L'utilisateur le plus actif (rang 1 de la loi de Zipf)
+    gros_utilisateur = donnees['utilisateurs'][0]
+    gros_utilisateur.est_approuve = True
+    gros_utilisateur.save(update_fields=['est_approuve'])
+
+    client = Client()
+    client.force_login(gros_utilisateur)
+    client_admin = Client()
+    client_admin.force_login(donnees['admin'])
+
+    def accueil_get(numero):
+        client.get(reverse('reservation:accueil'))
+
+    def accueil_post(numero):
+        debut = alea.randint(Reservation.HEURE_OUVERTURE, Reservation.HEURE_FERMETURE - 1)
+        client.post(reverse('reservation:accueil'), {
+            'salle': alea.choice(salles).pk,
+            'date': (demain + timedelta(days=alea.randint(0, 60))).isoformat(),
+            'heure_debut': f"{debut:02d}:00",
+            'heure_fin': f"{debut + 1:02d}:00",
+        })
+
+    def mes_reservations(numero):
+        client.get(reverse('reservation:mes_reservations'))
+
+    def admin_dashboard(numero):
+        client_admin.get(reverse('reservation:admin_dashboard'))
+
+    # Toujours le même lot de 50 réservations à venir, remis en attente avant chaque mesure
+    lot = list(
+        Reservation.objects.filter(date__gte=demain, statut__in=Reservation.STATUTS_ACTIFS)
+        .order_by('date', 'pk').values_list('pk', flat=True)[:50]
+    )
+
+    def remettre_en_attente(numero):
+        Reservation.objects.filter(pk__in=lot).update(statut='En attente', date_traitement=None)
+
+    def valider_reservations(numero):
+        client_admin.post(reverse('admin:reservation_reservation_changelist'), {
+            'action': 'valider_reservations',
+            '_selected_action': lot,
+        })
+
+    def verification_conflit(numero):
+        debut = alea.randint(Reservation.HEURE_OUVERTURE, Reservation.HEURE_FERMETURE - 1)
+        ReservationForm({
+            'salle': alea.choice(salles).pk,
+            'date': (demain + timedelta(days=alea.randint(0, 30))).isoformat(),
+            'heure_debut': f"{debut:02d}:00",
+            'heure_fin': f"{debut + 1:02d}:00",
+        }, utilisateur=gros_utilisateur).is_valid()
+
+    return {
+        'accueil_get': (None, accueil_get),
+        'accueil_post': (None, accueil_post),
+        'mes_reservations': (None, mes_reservations),
+        'admin_dashboard': (None, admin_dashboard),
+        'valider_reservations': (remettre_en_attente, valider_reservations),
+        'verification_conflit': (None, verification_conflit),
+    }
+
+
+# 📊 ANALYSES D'OCCUPATION
+def mesurer_analyses():
+    """📊 Débit de calculer_occupation sur tout l'historique généré (None sans historique)"""
+    bornes = Reservation.objects.aggregate(debut=Min('date'), fin=Max('date'))
+    if bornes['debut'] is None:
+        return None
+    depart = chrono.perf_counter()
+    resultat = calculer_occupation(bornes['debut'], bornes['fin'])
+    duree = chrono.perf_counter() - depart
+    return {
+        'lignes': resultat['reservations'],
+        'duree_s': round(duree, 3),
+        'lignes_par_seconde': round(resultat['reservations'] / duree) if duree else 0,
+    }
+
+
+# 🔐 SESSIONS ET AUTHENTIFICATION
+CONFIGURATIONS_SESSION = {
+    # Avant : sessions en base et utilisateur relu en base à chaque requête
+    'avant': ('django.contrib.sessions.backends.db', 'django.contrib.auth.backends.ModelBackend'),
+    'base': ('django.contrib.sessions.backends.db', 'reservation.backends.ApprobationBackend'),
+    'cache': ('django.contrib.sessions.backends.cached_db', 'reservation.backends.ApprobationBackend'),
+    'cookie': ('django.contrib.sessions.backends.signed_cookies', 'reservation.backends.ApprobationBackend'),
+}
+
+
+def comparer_sessions(utilisateur, iterations):
+    """🔐 Requêtes SQL d'une requête authentifiée selon la stratégie de session.
+
+    La vue mesurée (api_disponibilites) fait elle-même une requête : tout le
+    reste vient de la session et du chargement de l'utilisateur.
+    """
+    url = reverse('reservation:api_disponibilites')
+    resultats = {}
+    for nom, (moteur, backend) in CONFIGURATIONS_SESSION.items():
+        with override_settings(SESSION_ENGINE=moteur, AUTHENTICATION_BACKENDS=[backend]):
+            cache.clear()
+            client = Client()
+            client.force_login(utilisateur)
+            client.get(url)  # Échauffement : session et utilisateur en cache
+            resultats[nom] = mesurer(lambda numero: client.get(url), iterations)
+    return resultats
+
+
+# 🧩 PAGES : POIDS DES RÉPONSES ET FRAGMENTS EN CACHE
+PAGES = ['connexion', 'inscription', 'accueil', 'mes_reservations', 'admin_dashboard']
+
+
+def _poids(contenu):
+    return {'octets': len(contenu), 'octets_gzip': len(gzip.compress(contenu))}
+
+
+def peser_pages(utilisateur, admin):
+    """📦 Octets du HTML de chaque page (brut et gzip) et des CSS qu'il référence.
+
+    Les CSS, aux noms hachés, ne sont téléchargées qu'une fois puis servies
+    par le cache du navigateur.
+    """
+    anonyme, connecte, administrateur = Client(), Client(), Client()
+    connecte.force_login(utilisateur)
+    administrateur.force_login(admin)
+    clients = {'connexion': anonyme, 'inscription': anonyme, 'admin_dashboard': administrateur}
+    poids = {}
+    for page in PAGES:
+        contenu = clients.get(page, connecte).get(reverse(f'reservation:{page}')).content
+        feuilles = re.findall(rb'href="/static/([^"]+\.css)"', contenu)
+        css = b''.join(open(finders.find(feuille.decode()), 'rb').read() for feuille in feuilles)
+        poids[page] = {'html': _poids(contenu), 'css': _poids(css)}
+    return poids
+
+
+def comparer_fragments(utilisateur, iterations):
+    """🧩 Accueil avec les fragments (cartes des salles, dernières réservations) vides ou en cache"""
+    client = Client()
+    client.force_login(utilisateur)
+    url = reverse('reservation:accueil')
+
+    def vider(numero):
+        cache.delete_many([
+            make_template_fragment_key('cartes_salles', [version_salles()]),
+            make_template_fragment_key('reservations_recentes', [utilisateur.pk, version_reservations(utilisateur.pk)]),
+        ])
+
+    client.get(url)
+    return {
+        'froids': mesurer(lambda numero: client.get(url), iterations, vider),
+        'chauds': mesurer(lambda numero: client.get(url), iterations),
+    }
+
+
+# ⚡ CONCURRENCE : WSGI (threads) CONTRE ASGI (boucle asyncio)
+def _resumer_debit(mesures, ecoule):
+    resume = resumer([duree for duree, _ in mesures], [0])
+    del resume['requetes_moyenne'], resume['requetes_max']
+    resume['requetes_par_seconde'] = round(len(mesures) / ecoule, 1)
+    resume['erreurs'] = sum(1 for _, statut in mesures if statut != 200)
+    return resume
+
+
+def comparer_concurrence(utilisateur, concurrence, requetes_par_client):
+    """⚡ Même grille de disponibilité servie à `concurrence` clients simultanés.
+
+    WSGI : un thread par client, comme autant de workers synchrones.
+    ASGI : une seule boucle asyncio et la vue asynchrone (ORM asynchrone).
+    """
+    # Les sessions en base restent lisibles depuis tous les threads
+    with override_settings(SESSION_ENGINE='django.contrib.sessions.backends.db'):
+        return {
+            'wsgi': _concurrence_wsgi(utilisateur, concurrence, requetes_par_client),
+            'asgi': asyncio.run(_concurrence_asgi(utilisateur, concurrence, requetes_par_client)),
+        }
+
+
+def _concurrence_wsgi(utilisateur, concurrence, requetes_par_client):
+    url = reverse('reservation:api_disponibilites')
+    clients = []
+    for _ in range(concurrence):
+        client = Client()
+        client.force_login(utilisateur)
+        clients.append(client)
+
+    def client_wsgi(client):
+        durees = []
+        try:
+            for _ in range(requetes_par_client):
+                depart = chrono.perf_counter()
+                statut = client.get(url).status_code
+                durees.append(((chrono.perf_counter() - depart) * 1000, statut))
+        finally:
+            connections.close_all()
+        return durees
+
+    depart = chrono.perf_counter()
+    with ThreadPoolExecutor(concurrence) as pool:
+        mesures = [mesure for lot in pool.map(client_wsgi, clients) for mesure in lot]
+    return _resumer_debit(mesures, chrono.perf_counter() - depart)
+
+
+async def _concurrence_asgi(utilisateur, concurrence, requetes_par_client):
+    url = reverse('reservation:api_disponibilites_async')
+    clients = []
+    for _ in range(concurrence):
+        client = AsyncClient()
+        await client.aforce_login(utilisateur)
+        clients.append(client)
+
+    async def client_asgi(client):
+        durees = []
+        for _ in range(requetes_par_client):
+            depart = chrono.perf_counter()
+            statut = (await client.get(url)).status_code
+            durees.append(((chrono.perf_counter() - depart) * 1000, statut))
+        return durees
+
+    depart = chrono.perf_counter()
+    lots = await asyncio.gather(*[client_asgi(client) for client in clients])
+    return _resumer_debit([mesure for lot in lots for mesure in lot], chrono.perf_counter() - depart)
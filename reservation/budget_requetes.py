@@ -0,0 +1,49 @@
+from functools import wraps
+
+from django.db import connections, DEFAULT_DB_ALIAS
+from django.test.utils import CaptureQueriesContext
+
+
+class BudgetDepasse(AssertionError):
+    """🚨 Plus de requêtes SQL que le budget autorisé"""
+
+
+# 💰 BUDGET DE REQUÊTES
+class budget_requetes:
+    """💰 Échoue si le bloc (ou la fonction décorée) dépasse `maximum` requêtes.
+
+        with budget_requetes(5):
+            client.get('/')
+
+        @budget_requetes(3)
+        def ma_fonction(): ...
+    """
+
+    def __init__(self, maximum, using=DEFAULT_DB_ALIAS):
+        self.maximum = maximum
+        self.using = using
+        self.capture = None
+
+    def __enter__(self):
+        self.capture = CaptureQueriesContext(connections[self.using])
+        self.capture.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.capture.__exit__(exc_type, exc_value, traceback)
+        if exc_type is None and len(self) > self.maximum:
+            raise BudgetDepasse(
+                f"{len(self)} requêtes pour un budget de {self.maximum} :\n"
+                + "\n".join(f"{numero}. {requete['sql']}"
+                            for numero, requete in enumerate(self.capture.captured_queries, 1))
+            )
+
+    def __len__(self):
+        return len(self.capture) if self.capture else 0
+
+    def __call__(self, fonction):
+        @wraps(fonction)
+        def avec_budget(*args, **kwargs):
+            with budget_requetes(self.maximum, self.using):
+                return fonction(*args, **kwargs)
+        return avec_budget
@@ -0,0 +1,62 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Salle
+
+CLE_VERSION_SALLES = 'salles:version'
+
+
+# 🔑 VERSION DES SALLES
+def version_salles():
+    """🔑 Version courante ; changer la version rend obsolètes toutes les entrées"""
+    return cache.get_or_set(CLE_VERSION_SALLES, time.time_ns(), timeout=None)
+
+
+def invalider_salles():
+    """🧹 Invalide la liste des salles et les choix du formulaire"""
+    cache.set(CLE_VERSION_SALLES, time.time_ns(), timeout=None)
+
+
+# 🏢 SALLES DISPONIBLES
+def salles_disponibles():
+    """🏢 Salles disponibles (instances), partagées par la vue et le formulaire"""
+    cle = f"salles:disponibles:{version_salles()}"
+    salles = cache.get(cle)
+    if salles is None:
+        salles = list(Salle.objects.filter(est_disponible=True).order_by('nom', 'pk'))
+        cache.set(cle, salles, settings.CACHE_SALLES_TIMEOUT)
+    return salles
+
+
+def choix_salles():
+    """📋 Choix (pk, nom) du champ salle de ReservationForm"""
+    cle = f"salles:choix:{version_salles()}"
+    choix = cache.get(cle)
+    if choix is None:
+        choix = [('', '---------')] + [(salle.pk, str(salle)) for salle in salles_disponibles()]
+        cache.set(cle, choix, settings.CACHE_SALLES_TIMEOUT)
+    return choix
+
+
+# 🔑 VERSION DES RÉSERVATIONS D'UN UTILISATEUR (fragment « dernières réservations »)
+def cle_version_reservations(utilisateur_id):
+    return f"reservations:version:{utilisateur_id}"
+
+
+def version_reservations(utilisateur_id):
+    """🔑 Version courante des réservations de l'utilisateur"""
+    return cache.get_or_set(cle_version_reservations(utilisateur_id), time.time_ns(), timeout=None)
+
+
+def invalider_reservations(utilisateur_ids):
+    """🧹 Invalide le fragment des utilisateurs concernés, une fois la transaction validée.
+
+    Invalider avant le commit laisserait une requête concurrente remettre en
+    cache l'ancien état sous la nouvelle version.
+    """
+    cles = [cle_version_reservations(pk) for pk in set(utilisateur_ids)]
+    if cles:
+        transaction.on_commit(lambda: cache.delete_many(cles))
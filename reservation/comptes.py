@@ -0,0 +1,144 @@
+import csv
+import os
+import secrets
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.password_validation import validate_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.db.models.functions import Lower
+
+from .models import Utilisateur
+from .backends import invalider_utilisateurs
+from .utils import envoyer_emails_approbation
+from . import statistiques
+
+ResultatImport = namedtuple('ResultatImport', ['crees', 'erreurs', 'mots_de_passe_generes'])
+
+TAILLE_LOT_IMPORT = 500
+STATUTS = {code for code, _ in Utilisateur.STATUT_CHOICES}
+
+
+# ✅ APPROBATION EN MASSE
+def approuver(queryset):
+    """✅ Approuve les comptes en attente du queryset ; retourne leurs pk.
+
+    Les lignes visées sont verrouillées avant l'UPDATE : les pk retournés
+    sont exactement ceux que cet appel a fait passer à « approuvé », même si
+    un autre administrateur agit en même temps.
+    """
+    with transaction.atomic():
+        a_approuver = list(
+            Utilisateur.objects.filter(pk__in=queryset.values('pk'), est_approuve=False)
+            .select_for_update().order_by('pk').values_list('pk', 'username', 'email')
+        )
+        pks = [pk for pk, _, _ in a_approuver]
+        if not pks:
+            return []
+        Utilisateur.objects.filter(pk__in=pks).update(est_approuve=True)
+        # update() n'envoie pas de signaux : compteur, cache et emails à la main
+        statistiques.ajuster({statistiques.UTILISATEURS_EN_ATTENTE: -len(pks)})
+        envoyer_emails_approbation([(username, email) for _, username, email in a_approuver])
+        transaction.on_commit(lambda: invalider_utilisateurs(pks))
+    return pks
+
+
+# 📥 IMPORT D'UNE LISTE DE CLASSE (CSV)
+def lire_csv(fichier):
+    """📥 Lignes {username, email, statut, mot_de_passe, ...} d'un CSV à en-tête (',' ou ';')"""
+    contenu = fichier.read()
+    if isinstance(contenu, bytes):
+        contenu = contenu.decode('utf-8-sig')
+    dialecte = csv.Sniffer().sniff(contenu.splitlines()[0] if contenu else ',', delimiters=',;')
+    return [
+        {cle.strip().lower(): (valeur or '').strip() for cle, valeur in ligne.items() if cle}
+        for ligne in csv.DictReader(contenu.splitlines(), dialect=dialecte)
+    ]
+
+
+def _initialiser_processus():
+    # Processus lancés par « spawn » (macOS, Windows) : Django n'y est pas configuré
+    import django
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'monsitereservation.settings')
+    django.setup()
+
+
+def hacher_mots_de_passe(mots_de_passe, processus=None):
+    """🔑 make_password en parallèle : le hachage (PBKDF2) est lié au CPU"""
+    processus = processus or os.cpu_count() or 1
+    if processus == 1 or len(mots_de_passe) < 2:
+        return [make_password(mot) for mot in mots_de_passe]
+    with ProcessPoolExecutor(processus, initializer=_initialiser_processus) as pool:
+        return list(pool.map(make_password, mots_de_passe, chunksize=max(1, len(mots_de_passe) // (processus * 4))))
+
+
+def importer_utilisateurs(lignes, processus=None, taille_lot=TAILLE_LOT_IMPORT):
+    """📥 Crée des comptes déjà approuvés avec bulk_create.
+
+    Les lignes invalides ou déjà présentes (username ou email) sont écartées
+    et signalées par numéro de ligne du fichier (en-tête = ligne 1). Une ligne
+    sans mot de passe en reçoit un aléatoire, retourné dans
+    `mots_de_passe_generes` pour être transmis à l'intéressé.
+    """
+    erreurs, valides = [], []
+    usernames, emails = set(), set()
+    for numero, ligne in enumerate(lignes, 2):
+        username, email = ligne.get('username', ''), ligne.get('email', '').lower()
+        statut = ligne.get('statut') or 'delegue'
+        try:
+            if not username:
+                raise ValidationError("username manquant")
+            validate_email(email)
+            if statut not in STATUTS:
+                raise ValidationError(f"statut inconnu « {statut} »")
+            if username in usernames or email in emails:
+                raise ValidationError("doublon dans le fichier")
+            if ligne.get('mot_de_passe'):
+                validate_password(ligne['mot_de_passe'], Utilisateur(username=username, email=email))
+        except ValidationError as exc:
+            erreurs.append((numero, username, ' '.join(exc.messages)))
+            continue
+        usernames.add(username)
+        emails.add(email)
+        valides.append((numero, ligne, username, email, statut))
+
+    # Comptes déjà en base : deux requêtes pour tout le fichier
+    usernames_pris = set(Utilisateur.objects.filter(username__in=usernames).values_list('username', flat=True))
+    # Emails déjà en base comparés en minuscules : « Alice@Campus.test » est pris aussi
+    emails_pris = set(Utilisateur.objects.annotate(email_min=Lower('email'))
+                      .filter(email_min__in=emails).values_list('email_min', flat=True))
+    a_creer = []
+    for numero, ligne, username, email, statut in valides:
+        if username in usernames_pris or email in emails_pris:
+            erreurs.append((numero, username, "compte déjà existant"))
+        else:
+            a_creer.append((ligne, username, email, statut))
+
+    generes = {}
+    mots_de_passe = []
+    for ligne, username, _, _ in a_creer:
+        if not ligne.get('mot_de_passe'):
+            generes[username] = secrets.token_urlsafe(9)
+        mots_de_passe.append(ligne.get('mot_de_passe') or generes[username])
+    hashes = hacher_mots_de_passe(mots_de_passe, processus)
+
+    with transaction.atomic():
+        crees = Utilisateur.objects.bulk_create([
+            Utilisateur(
+                username=username,
+                email=email,
+                statut=statut,
+                first_name=ligne.get('prenom', ''),
+                last_name=ligne.get('nom', ''),
+                telephone=ligne.get('telephone', '')[:15],
+                est_approuve=True,
+                password=hashe,
+            )
+            for (ligne, username, email, statut), hashe in zip(a_creer, hashes)
+        ], batch_size=taille_lot)
+        # bulk_create n'envoie pas de signaux
+        statistiques.ajuster({statistiques.UTILISATEURS: len(crees)})
+    return ResultatImport(crees, sorted(erreurs), generes)
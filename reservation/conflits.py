@@ -0,0 +1,98 @@
+from bisect import bisect_left, bisect_right, insort
+
+from .models import Reservation
+
+
+# 🗂️ INDEX DES CRÉNEAUX D'UNE SALLE POUR UNE JOURNÉE
+class IndexCreneaux:
+    """🗂️ Créneaux triés par heure de début, avec le maximum cumulé des heures de fin.
+
+    Le maximum cumulé est croissant : une recherche dichotomique suffit pour
+    savoir si un créneau est libre, sans parcourir toutes les réservations.
+    """
+
+    def __init__(self, creneaux=()):
+        self._creneaux = sorted(creneaux, key=lambda c: (c[0], c[1]))
+        self._debuts = [c[0] for c in self._creneaux]
+        self._fins_max = []
+        self._recalculer(0)
+
+    def __len__(self):
+        return len(self._creneaux)
+
+    def _recalculer(self, depuis):
+        del self._fins_max[depuis:]
+        courant = self._fins_max[-1] if self._fins_max else None
+        for debut, fin, cle in self._creneaux[depuis:]:
+            courant = fin if courant is None or fin > courant else courant
+            self._fins_max.append(courant)
+
+    def _plage(self, heure_debut, heure_fin):
+        # Seuls les créneaux qui commencent avant heure_fin peuvent chevaucher,
+        # et parmi eux seuls ceux situés après le premier maximum > heure_debut.
+        fin = bisect_left(self._debuts, heure_fin)
+        debut = bisect_right(self._fins_max, heure_debut, 0, fin)
+        return debut, fin
+
+    def ajouter(self, heure_debut, heure_fin, cle=None):
+        position = bisect_right(self._debuts, heure_debut)
+        insort(self._debuts, heure_debut)
+        self._creneaux.insert(position, (heure_debut, heure_fin, cle))
+        self._recalculer(position)
+
+    def retirer(self, cle):
+        for position, creneau in enumerate(self._creneaux):
+            if creneau[2] == cle:
+                del self._creneaux[position]
+                del self._debuts[position]
+                self._recalculer(position)
+                return True
+        return False
+
+    def conflits(self, heure_debut, heure_fin, exclure=None):
+        """⚠️ Clés des créneaux qui chevauchent [heure_debut, heure_fin)"""
+        debut, fin = self._plage(heure_debut, heure_fin)
+        return [
+            cle
+            for creneau_debut, creneau_fin, cle in self._creneaux[debut:fin]
+            if creneau_fin > heure_debut and (exclure is None or cle != exclure)
+        ]
+
+    def est_libre(self, heure_debut, heure_fin, exclure=None):
+        """✅ Vrai si aucun créneau ne chevauche [heure_debut, heure_fin)"""
+        debut, fin = self._plage(heure_debut, heure_fin)
+        if debut >= fin:
+            return True
+        if exclure is None:
+            return False
+        return not self.conflits(heure_debut, heure_fin, exclure=exclure)
+
+
+# 📥 CHARGEMENT DEPUIS LA BASE
+def charger_index_par_paire(paires, statuts=Reservation.STATUTS_ACTIFS, using=None):
+    """📥 Un IndexCreneaux par (salle_id, date), chargés en une seule requête"""
+    paires = set(paires)
+    index = {paire: IndexCreneaux() for paire in paires}
+    if not paires:
+        return index
+
+    creneaux = {paire: [] for paire in paires}
+    lignes = Reservation.objects.using(using).filter(
+        salle_id__in={salle_id for salle_id, _ in paires},
+        date__in={date for _, date in paires},
+        statut__in=statuts,
+    ).values_list('salle_id', 'date', 'heure_debut', 'heure_fin', 'pk')
+
+    for salle_id, date, heure_debut, heure_fin, pk in lignes:
+        if (salle_id, date) in creneaux:
+            creneaux[(salle_id, date)].append((heure_debut, heure_fin, pk))
+
+    for paire, liste in creneaux.items():
+        index[paire] = IndexCreneaux(liste)
+    return index
+
+
+def charger_index(salle, date, statuts=Reservation.STATUTS_ACTIFS, using=None):
+    """📥 IndexCreneaux d'une salle pour une date"""
+    salle_id = getattr(salle, 'pk', salle)
+    return charger_index_par_paire([(salle_id, date)], statuts, using)[(salle_id, date)]
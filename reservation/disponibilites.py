@@ -0,0 +1,109 @@
+from collections import defaultdict
+from datetime import time, timedelta
+
+from django.db.models import FilteredRelation, Q
+
+from .models import Salle, Reservation, OccupationJour
+
+CRENEAUX = list(range(Reservation.HEURE_OUVERTURE, Reservation.HEURE_FERMETURE))
+MASQUE_JOURNEE = (1 << len(CRENEAUX)) - 1
+
+
+# 🟩 MASQUES D'OCCUPATION
+def masque_creneau(heure_debut, heure_fin):
+    """🟩 Bits des créneaux d'une heure touchés par [heure_debut, heure_fin)"""
+    masque = 0
+    for position, heure in enumerate(CRENEAUX):
+        if heure_debut < time(heure + 1) and heure_fin > time(heure):
+            masque |= 1 << position
+    return masque
+
+
+def creneaux_occupes(masque):
+    """📋 Liste de booléens, un par créneau de CRENEAUX"""
+    return [bool(masque >> position & 1) for position in range(len(CRENEAUX))]
+
+
+def recalculer_masques(paires=None):
+    """🔄 Recalcule les masques des (salle_id, date) donnés, ou de toutes les journées.
+
+    Une requête de lecture et une écriture groupée, quel que soit le nombre de paires.
+    """
+    reservations = Reservation.objects.filter(statut__in=Reservation.STATUTS_ACTIFS)
+    if paires is not None:
+        paires = set(paires)
+        if not paires:
+            return
+        reservations = reservations.filter(
+            salle_id__in={salle_id for salle_id, _ in paires},
+            date__in={date for _, date in paires},
+        )
+
+    masques = defaultdict(int)
+    for paire in paires or ():
+        masques[paire] = 0
+    for salle_id, date, heure_debut, heure_fin in reservations.values_list(
+        'salle_id', 'date', 'heure_debut', 'heure_fin'
+    ):
+        if paires is None or (salle_id, date) in paires:
+            masques[(salle_id, date)] |= masque_creneau(heure_debut, heure_fin)
+
+    if paires is None:
+        OccupationJour.objects.all().delete()
+    OccupationJour.objects.bulk_create(
+        [OccupationJour(salle_id=salle_id, date=date, masque=masque)
+         for (salle_id, date), masque in masques.items()],
+        update_conflicts=True,
+        unique_fields=['salle', 'date'],
+        update_fields=['masque'],
+    )
+
+
+# 📅 GRILLE DE DISPONIBILITÉ
+def _requete_grille(date_debut, date_fin):
+    return (
+        Salle.objects
+        .filter(est_disponible=True)
+        .annotate(occupation=FilteredRelation(
+            'occupationjour',
+            condition=Q(occupationjour__date__range=(date_debut, date_fin)),
+        ))
+        .order_by('nom', 'pk')
+        .values_list('pk', 'nom', 'capacite', 'occupation__date', 'occupation__masque')
+    )
+
+
+def _assembler_grille(date_debut, date_fin, lignes):
+    jours = [date_debut + timedelta(days=n) for n in range((date_fin - date_debut).days + 1)]
+    salles = {}
+    for pk, nom, capacite, date, masque in lignes:
+        if pk not in salles:
+            salles[pk] = {'id': pk, 'nom': nom, 'capacite': capacite, 'masques': {}}
+        if date is not None:
+            salles[pk]['masques'][date] = masque
+
+    return {
+        'creneaux': [f"{heure:02d}:00" for heure in CRENEAUX],
+        'jours': [jour.isoformat() for jour in jours],
+        'salles': [
+            {
+                'id': salle['id'],
+                'nom': salle['nom'],
+                'capacite': salle['capacite'],
+                'masques': [salle['masques'].get(jour, 0) for jour in jours],
+                'occupe': [creneaux_occupes(salle['masques'].get(jour, 0)) for jour in jours],
+            }
+            for salle in salles.values()
+        ],
+    }
+
+
+def grille(date_debut, date_fin):
+    """📅 Occupation de toutes les salles disponibles, jour par jour, en une requête"""
+    return _assembler_grille(date_debut, date_fin, _requete_grille(date_debut, date_fin))
+
+
+async def agrille(date_debut, date_fin):
+    """📅 grille() pour les vues asynchrones (ORM asynchrone)"""
+    lignes = [ligne async for ligne in _requete_grille(date_debut, date_fin)]
+    return _assembler_grille(date_debut, date_fin, lignes)
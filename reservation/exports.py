@@ -0,0 +1,121 @@
+import csv
+import heapq
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core import signing
+from django.utils import timezone
+
+TAILLE_LOT = 2000  # Lignes lues par aller-retour avec iterator()
+
+CHAMPS = ['pk', 'date', 'heure_debut', 'heure_fin', 'statut', 'salle__nom',
+          'salle__localisation', 'date_creation', 'date_traitement']
+
+
+def _lignes(*querysets):
+    # values_list + iterator : ni cache du queryset ni instances de modèles,
+    # la mémoire reste constante quelle que soit la taille de l'historique
+    flux = [queryset.values_list(*CHAMPS).iterator(chunk_size=TAILLE_LOT) for queryset in querysets]
+    if len(flux) == 1:
+        return flux[0]
+    # Plusieurs tables (vivante + archive) triées par date, début, pk décroissants
+    return heapq.merge(*flux, key=lambda ligne: (ligne[1], ligne[2], ligne[0]), reverse=True)
+
+
+# 📊 CSV
+class _Tampon:
+    """Pseudo-fichier : csv.writer renvoie directement la ligne écrite"""
+
+    def write(self, valeur):
+        return valeur
+
+
+def lignes_csv(*querysets):
+    """📊 Génère l'export CSV ligne par ligne"""
+    ecrivain = csv.writer(_Tampon(), delimiter=';')
+    yield '\ufeff'  # BOM pour qu'Excel détecte l'UTF-8
+    yield ecrivain.writerow(['Salle', 'Localisation', 'Date', 'Début', 'Fin', 'Statut',
+                             'Créée le', 'Traitée le'])
+    for pk, date, debut, fin, statut, salle, localisation, creation, traitement in _lignes(*querysets):
+        yield ecrivain.writerow([
+            salle, localisation, date.isoformat(), debut.strftime('%H:%M'), fin.strftime('%H:%M'),
+            statut, creation.isoformat(timespec='seconds'),
+            traitement.isoformat(timespec='seconds') if traitement else '',
+        ])
+
+
+# 🔗 ABONNEMENTS : URL secrète par utilisateur, lue par les clients de calendrier sans session
+SEL_CALENDRIER = 'reservation.calendrier'
+
+
+def jeton_calendrier(utilisateur):
+    """🔗 Jeton signé (SECRET_KEY) du paramètre ?jeton= des flux iCalendar.
+
+    Il porte la version_calendrier de l'utilisateur : l'incrémenter révoque
+    toutes les URL d'abonnement déjà distribuées.
+    """
+    return signing.Signer(salt=SEL_CALENDRIER).sign(f"{utilisateur.pk}:{utilisateur.version_calendrier}")
+
+
+def utilisateur_du_jeton(jeton):
+    """🔗 Compte approuvé et actif du jeton, s'il n'a pas été révoqué, ou None"""
+    from .models import Utilisateur
+    try:
+        pk, version = map(int, signing.Signer(salt=SEL_CALENDRIER).unsign(jeton).split(':'))
+    except (signing.BadSignature, ValueError):
+        return None
+    return Utilisateur.objects.filter(pk=pk, version_calendrier=version, est_approuve=True, is_active=True).first()
+
+
+# 📅 ICALENDAR (RFC 5545)
+STATUTS_ICAL = {'En attente': 'TENTATIVE', 'Validée': 'CONFIRMED', 'Refusée': 'CANCELLED'}
+
+
+def _echapper(texte):
+    return (texte.replace('\\', '\\\\').replace(';', '\\;')
+            .replace(',', '\\,').replace('\n', '\\n'))
+
+
+def _plier(ligne):
+    # Lignes limitées à 75 octets, suite préfixée d'une espace
+    octets = ligne.encode()
+    morceaux = []
+    while len(octets) > 75:
+        coupure = 75 if not morceaux else 74
+        while coupure and (octets[coupure] & 0xC0) == 0x80:  # Pas au milieu d'un caractère UTF-8
+            coupure -= 1
+        morceaux.append(octets[:coupure].decode())
+        octets = octets[coupure:]
+    morceaux.append(octets.decode())
+    return '\r\n '.join(morceaux) + '\r\n'
+
+
+def _horodatage_utc(valeur):
+    return valeur.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def lignes_ical(nom_calendrier, *querysets):
+    """📅 Génère un calendrier iCalendar, un VEVENT par réservation.
+
+    Les créneaux, saisis à l'heure locale (TIME_ZONE), sont écrits en UTC :
+    un TZID sans bloc VTIMEZONE n'est pas compris de tous les clients.
+    """
+    fuseau = timezone.get_default_timezone()
+    yield _plier('BEGIN:VCALENDAR')
+    yield _plier('VERSION:2.0')
+    yield _plier('PRODID:-//Campus Reservation//FR')
+    yield _plier(f'X-WR-CALNAME:{_echapper(nom_calendrier)}')
+    yield _plier(f'X-WR-TIMEZONE:{settings.TIME_ZONE}')
+    for pk, date, debut, fin, statut, salle, localisation, creation, traitement in _lignes(*querysets):
+        yield ''.join([
+            _plier('BEGIN:VEVENT'),
+            _plier(f'UID:reservation-{pk}@campus-reservation'),
+            _plier(f'DTSTAMP:{_horodatage_utc(traitement or creation)}'),
+            _plier(f'DTSTART:{_horodatage_utc(datetime.combine(date, debut, tzinfo=fuseau))}'),
+            _plier(f'DTEND:{_horodatage_utc(datetime.combine(date, fin, tzinfo=fuseau))}'),
+            _plier(f'SUMMARY:{_echapper(f"{salle} ({statut})")}'),
+            _plier(f'LOCATION:{_echapper(localisation)}'),
+            _plier(f'STATUS:{STATUTS_ICAL[statut]}') if statut in STATUTS_ICAL else '',
+            _plier('END:VEVENT'),
+        ])
+    yield _plier('END:VCALENDAR')
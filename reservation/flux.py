@@ -0,0 +1,181 @@
+import asyncio
+import json
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import Reservation, EvenementReservation
+
+TAILLE_LOT_FLUX = 100
+
+
+# 🔔 RÉVEIL DES FLUX DU PROCESSUS
+# Le journal en base est la source de vérité (reprise, plusieurs workers) ; ce
+# signal réveille tout de suite les flux du processus qui a écrit. Les écritures
+# des autres processus sont vues au prochain sondage (FLUX_INTERVALLE).
+class _Reveil:
+    def __init__(self):
+        self.version = 0
+        self.condition = threading.Condition()
+
+    def signaler(self):
+        with self.condition:
+            self.version += 1
+            self.condition.notify_all()
+
+    def attendre(self, version, delai):
+        with self.condition:
+            self.condition.wait_for(lambda: self.version != version, timeout=delai)
+            return self.version
+
+
+reveil = _Reveil()
+
+
+# ✍️ ÉCRITURE DU JOURNAL
+def publier(evenements):
+    """✍️ Enregistre [(reservation_id, type, statut, ancien_statut)] en une requête.
+
+    À appeler dans la transaction du changement : l'événement n'existe que si
+    le changement est validé, et les flux ne sont réveillés qu'au commit.
+    """
+    evenements = [
+        EvenementReservation(reservation_id=pk, type=type_, statut=statut or '', ancien_statut=ancien or '')
+        for pk, type_, statut, ancien in evenements
+    ]
+    if not evenements:
+        return
+    EvenementReservation.objects.bulk_create(evenements)
+    transaction.on_commit(reveil.signaler)
+
+
+def publier_statuts(lignes, statut):
+    """🔁 Changement de statut en masse : lignes = [(pk, ancien_statut)]"""
+    publier([(pk, 'statut', statut, ancien) for pk, ancien in lignes if ancien != statut])
+
+
+def purger(avant=None):
+    """🧹 Supprime les événements plus vieux que FLUX_RETENTION"""
+    avant = avant or timezone.now() - timedelta(seconds=settings.FLUX_RETENTION)
+    return EvenementReservation.objects.filter(date_creation__lt=avant).delete()[0]
+
+
+# 📖 LECTURE DU JOURNAL
+def dernier_identifiant():
+    return EvenementReservation.objects.aggregate(dernier=Max('pk'))['dernier'] or 0
+
+
+async def adernier_identifiant():
+    return (await EvenementReservation.objects.aaggregate(dernier=Max('pk')))['dernier'] or 0
+
+
+def _requetes(dernier, taille_lot):
+    evenements = EvenementReservation.objects.filter(pk__gt=dernier).order_by('pk')[:taille_lot]
+    return evenements, Reservation.objects.select_related('salle', 'utilisateur')
+
+
+def _delta(evenement, reservation):
+    delta = {
+        'reservation': evenement.reservation_id,
+        'type': evenement.type,
+        'statut': evenement.statut,
+        'ancien_statut': evenement.ancien_statut,
+    }
+    if reservation is not None:
+        delta.update({
+            'salle': reservation.salle.nom,
+            'utilisateur': reservation.utilisateur.username,
+            'date': reservation.date.isoformat(),
+            'heure_debut': reservation.heure_debut.strftime('%H:%M'),
+            'heure_fin': reservation.heure_fin.strftime('%H:%M'),
+        })
+    return delta
+
+
+def _message(evenement, delta):
+    return f"id: {evenement.pk}\nevent: reservation\ndata: {json.dumps(delta, ensure_ascii=False)}\n\n"
+
+
+def lire(dernier, taille_lot=TAILLE_LOT_FLUX):
+    """📖 Messages SSE des événements après `dernier` : deux requêtes par lot"""
+    evenements, reservations = _requetes(dernier, taille_lot)
+    evenements = list(evenements)
+    if not evenements:
+        return []
+    details = reservations.in_bulk({evenement.reservation_id for evenement in evenements})
+    return [(evenement.pk, _message(evenement, _delta(evenement, details.get(evenement.reservation_id))))
+            for evenement in evenements]
+
+
+async def alire(dernier, taille_lot=TAILLE_LOT_FLUX):
+    evenements, reservations = _requetes(dernier, taille_lot)
+    evenements = [evenement async for evenement in evenements]
+    if not evenements:
+        return []
+    details = await reservations.ain_bulk({evenement.reservation_id for evenement in evenements})
+    return [(evenement.pk, _message(evenement, _delta(evenement, details.get(evenement.reservation_id))))
+            for evenement in evenements]
+
+
+# 📡 FLUX SSE
+def _entete():
+    # retry : délai de reconnexion du navigateur (EventSource renvoie Last-Event-ID)
+    return f"retry: {int(settings.FLUX_INTERVALLE * 1000)}\n\n"
+
+
+def flux(dernier, duree_max=None):
+    """📡 Flux SSE (WSGI) à partir de l'événement `dernier`.
+
+    Le flux se ferme après duree_max secondes (FLUX_DUREE_MAX par défaut ; la
+    vue passe FLUX_INTERVALLE pour rendre vite le worker) ; le navigateur se
+    reconnecte seul et reprend au dernier id reçu.
+    """
+    duree_max = settings.FLUX_DUREE_MAX if duree_max is None else duree_max
+    fin = time.monotonic() + duree_max
+    dernier_envoi = time.monotonic()
+    yield _entete()
+    while True:
+        version = reveil.version
+        messages = lire(dernier)
+        for dernier, message in messages:
+            yield message
+        if messages:
+            dernier_envoi = time.monotonic()
+            continue
+        if time.monotonic() >= fin:
+            return
+        if time.monotonic() - dernier_envoi >= settings.FLUX_PULSATION:
+            yield ": pulsation\n\n"  # Garde la connexion ouverte derrière les proxys
+            dernier_envoi = time.monotonic()
+        reveil.attendre(version, min(settings.FLUX_INTERVALLE, max(fin - time.monotonic(), 0)))
+
+
+async def aflux(dernier, duree_max=None):
+    """📡 Flux SSE (ASGI) : une connexion ouverte ne coûte qu'une coroutine"""
+    duree_max = settings.FLUX_DUREE_MAX if duree_max is None else duree_max
+    boucle = asyncio.get_running_loop()
+    fin = boucle.time() + duree_max
+    dernier_envoi = boucle.time()
+    yield _entete()
+    while True:
+        version = reveil.version
+        messages = await alire(dernier)
+        for dernier, message in messages:
+            yield message
+        if messages:
+            dernier_envoi = boucle.time()
+            continue
+        if boucle.time() >= fin:
+            return
+        if boucle.time() - dernier_envoi >= settings.FLUX_PULSATION:
+            yield ": pulsation\n\n"
+            dernier_envoi = boucle.time()
+        # Réveil du processus : simple lecture d'un entier, sans requête ni thread
+        attente = boucle.time() + min(settings.FLUX_INTERVALLE, max(fin - boucle.time(), 0))
+        while reveil.version == version and boucle.time() < attente:
+            await asyncio.sleep(0.1)
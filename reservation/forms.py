@@ -1,8 +1,14 @@
+import csv
+import uuid
+from datetime import date
+
 from django import forms
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
-from django.db.models import Q
 from django.utils import timezone
-from .models import Utilisateur, Reservation, Salle
+from .models import Utilisateur, Reservation, Salle, Recurrence, DemandeAttente
+from .conflits import charger_index
+from .cache import choix_salles
+from .comptes import lire_csv
 
 # 📝 FORMULAIRE D'INSCRIPTION - À AJOUTER !
 class InscriptionForm(UserCreationForm):
@@ -31,6 +37,11 @@ class ConnexionForm(AuthenticationForm):
 
 # 📅 FORMULAIRE DE RÉSERVATION
 class ReservationForm(forms.ModelForm):
+    # 🔂 Nouvelle clé à chaque affichage, renvoyée telle quelle par un double clic ou un F5
+    cle_idempotence = forms.CharField(
+        widget=forms.HiddenInput, required=False, initial=lambda: uuid.uuid4().hex,
+    )
+    
     class Meta:
         model = Reservation
         fields = ['salle', 'date', 'heure_debut', 'heure_fin']
@@ -43,11 +54,13 @@ class ReservationForm(forms.ModelForm):
                 }
             ),
             'heure_debut': forms.Select(
-                choices=[(f"{h:02d}:00", f"{h:02d}:00") for h in range(8, 20)],
+                choices=[(f"{h:02d}:00", f"{h:02d}:00")
+                         for h in range(Reservation.HEURE_OUVERTURE, Reservation.HEURE_FERMETURE)],
                 attrs={'class': 'form-control'}
             ),
             'heure_fin': forms.Select(
-                choices=[(f"{h:02d}:00", f"{h:02d}:00") for h in range(9, 21)],
+                choices=[(f"{h:02d}:00", f"{h:02d}:00")
+                         for h in range(Reservation.HEURE_OUVERTURE + 1, Reservation.HEURE_FERMETURE + 1)],
                 attrs={'class': 'form-control'}
             ),
             'salle': forms.Select(attrs={'class': 'form-control'}),
@@ -63,6 +76,7 @@ class ReservationForm(forms.ModelForm):
         self.utilisateur = kwargs.pop('utilisateur', None)
         super().__init__(*args, **kwargs)
         self.fields['salle'].queryset = Salle.objects.filter(est_disponible=True)
+        self.fields['salle'].choices = choix_salles()  # ⚡ Rendu sans requête
     
     def clean(self):
         cleaned_data = super().clean()
@@ -78,17 +92,166 @@ class ReservationForm(forms.ModelForm):
             raise forms.ValidationError("❌ L'heure de fin doit être après l'heure de début.")
         
         if all([date, heure_debut, heure_fin, salle]):
-            conflits = Reservation.objects.filter(
-                salle=salle,
-                date=date,
-                statut__in=['En attente', 'Validée']
-            ).filter(
-                Q(heure_debut__lt=heure_fin, heure_fin__gt=heure_debut)
-            )
-            
-            if conflits.exists():
+            index = charger_index(salle, date)
+            if not index.est_libre(heure_debut, heure_fin):
                 raise forms.ValidationError(
-                    f"❌ La salle {salle.nom} est déjà réservée sur ce créneau."
+                    f"❌ La salle {salle.nom} est déjà réservée sur ce créneau.",
+                    code='conflit',  # ⏳ La page propose alors la liste d'attente
                 )
         
-        return cleaned_data
\ No newline at end of file
+        return cleaned_data
+
+# ⏳ FORMULAIRE DE LISTE D'ATTENTE (mêmes champs, créneau occupé)
+class ListeAttenteForm(forms.ModelForm):
+    class Meta:
+        model = DemandeAttente
+        fields = ['salle', 'date', 'heure_debut', 'heure_fin']
+    
+    def __init__(self, *args, **kwargs):
+        self.utilisateur = kwargs.pop('utilisateur', None)
+        super().__init__(*args, **kwargs)
+        self.fields['salle'].queryset = Salle.objects.filter(est_disponible=True)
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        date = cleaned_data.get('date')
+        heure_debut = cleaned_data.get('heure_debut')
+        heure_fin = cleaned_data.get('heure_fin')
+        salle = cleaned_data.get('salle')
+        
+        if date and date < timezone.now().date():
+            raise forms.ValidationError("❌ Vous ne pouvez pas attendre une date passée.")
+        
+        if heure_debut and heure_fin and heure_debut >= heure_fin:
+            raise forms.ValidationError("❌ L'heure de fin doit être après l'heure de début.")
+        
+        if all([date, heure_debut, heure_fin, salle]):
+            if charger_index(salle, date).est_libre(heure_debut, heure_fin):
+                raise forms.ValidationError("✅ Ce créneau est libre : réservez-le directement.")
+            if DemandeAttente.objects.filter(
+                utilisateur=self.utilisateur, salle=salle, date=date,
+                heure_debut=heure_debut, heure_fin=heure_fin, statut='En file',
+            ).exists():
+                raise forms.ValidationError("⏳ Vous êtes déjà dans la liste d'attente de ce créneau.")
+        
+        return cleaned_data
+
+# 👑 FORMULAIRE DE RÉSERVATION (ADMINISTRATION)
+class ReservationAdminForm(forms.ModelForm):
+    class Meta:
+        model = Reservation
+        fields = '__all__'
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        # En édition rapide (list_editable), seuls certains champs sont présents
+        valeurs = {
+            champ: cleaned_data.get(champ, getattr(self.instance, champ, None))
+            for champ in ['salle', 'date', 'heure_debut', 'heure_fin', 'statut']
+        }
+        
+        if valeurs['statut'] in Reservation.STATUTS_ACTIFS and all(valeurs.values()):
+            index = charger_index(valeurs['salle'], valeurs['date'])
+            if not index.est_libre(valeurs['heure_debut'], valeurs['heure_fin'], exclure=self.instance.pk):
+                raise forms.ValidationError(
+                    f"❌ La salle {valeurs['salle'].nom} est déjà réservée sur ce créneau."
+                )
+        
+        return cleaned_data
+
+# 🔁 FORMULAIRE DE RÉSERVATION RÉCURRENTE
+class RecurrenceForm(forms.ModelForm):
+    DUREE_MAX_JOURS = 366
+    
+    exceptions = forms.CharField(
+        required=False,
+        help_text="Dates sans occurrence, séparées par des virgules (AAAA-MM-JJ)",
+    )
+    
+    class Meta:
+        model = Recurrence
+        fields = ['salle', 'date_debut', 'date_fin', 'heure_debut', 'heure_fin', 'intervalle_semaines', 'exceptions']
+    
+    def __init__(self, *args, **kwargs):
+        self.utilisateur = kwargs.pop('utilisateur', None)
+        super().__init__(*args, **kwargs)
+        self.fields['salle'].queryset = Salle.objects.filter(est_disponible=True)
+    
+    def clean_exceptions(self):
+        valeurs = [v.strip() for v in self.cleaned_data.get('exceptions', '').split(',') if v.strip()]
+        try:
+            return sorted({date.fromisoformat(valeur).isoformat() for valeur in valeurs})
+        except ValueError:
+            raise forms.ValidationError("❌ Dates d'exception attendues au format AAAA-MM-JJ.")
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        date_debut = cleaned_data.get('date_debut')
+        date_fin = cleaned_data.get('date_fin')
+        heure_debut = cleaned_data.get('heure_debut')
+        heure_fin = cleaned_data.get('heure_fin')
+        
+        if date_debut and date_debut < timezone.now().date():
+            raise forms.ValidationError("❌ Vous ne pouvez pas réserver une date passée.")
+        
+        if date_debut and date_fin:
+            if date_fin < date_debut:
+                raise forms.ValidationError("❌ La date de fin doit être après la date de début.")
+            if (date_fin - date_debut).days > self.DUREE_MAX_JOURS:
+                raise forms.ValidationError("❌ Une série ne peut pas dépasser un an.")
+        
+        if heure_debut and heure_fin and heure_debut >= heure_fin:
+            raise forms.ValidationError("❌ L'heure de fin doit être après l'heure de début.")
+        
+        return cleaned_data
+    
+    def save(self, commit=True):
+        recurrence = super().save(commit=False)
+        recurrence.utilisateur = self.utilisateur
+        if commit:
+            recurrence.save()
+        return recurrence
+
+# 🔎 FORMULAIRE DE RECHERCHE DE SALLES
+class RechercheSalleForm(forms.Form):
+    date = forms.DateField()
+    heure_debut = forms.TimeField()
+    heure_fin = forms.TimeField()
+    capacite = forms.IntegerField(required=False, min_value=1)
+    equipements = forms.CharField(
+        required=False,
+        help_text="Équipements requis, séparés par des virgules",
+    )
+    
+    def clean_capacite(self):
+        return self.cleaned_data.get('capacite') or 1
+    
+    def clean_equipements(self):
+        return [libelle.strip() for libelle in self.cleaned_data.get('equipements', '').split(',') if libelle.strip()]
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        date = cleaned_data.get('date')
+        heure_debut = cleaned_data.get('heure_debut')
+        heure_fin = cleaned_data.get('heure_fin')
+        
+        if date and date < timezone.now().date():
+            raise forms.ValidationError("❌ Vous ne pouvez pas réserver une date passée.")
+        
+        if heure_debut and heure_fin and heure_debut >= heure_fin:
+            raise forms.ValidationError("❌ L'heure de fin doit être après l'heure de début.")
+        
+        return cleaned_data
+
+# 📥 FORMULAIRE D'IMPORT D'UNE LISTE DE CLASSE (admin)
+class ImportUtilisateursForm(forms.Form):
+    fichier = forms.FileField(
+        label="Fichier CSV",
+        help_text="En-tête : username, email[, statut, prenom, nom, telephone, mot_de_passe] ; séparateur ',' ou ';'",
+    )
+    
+    def clean_fichier(self):
+        try:
+            return lire_csv(self.cleaned_data['fichier'])
+        except (UnicodeDecodeError, csv.Error) as exc:
+            raise forms.ValidationError(f"❌ CSV illisible : {exc}")
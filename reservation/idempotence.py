@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.core.cache import cache
+
+EN_COURS = '⏳'
+
+
+def cle_idempotence(request):
+    """🔑 Clé envoyée par le client : champ caché du formulaire ou en-tête Idempotency-Key"""
+    return request.POST.get('cle_idempotence') or request.headers.get('Idempotency-Key') or None
+
+
+def _cle_cache(utilisateur_id, cle):
+    return f"idempotence:{utilisateur_id}:{cle[:64]}"
+
+
+# 🔂 EXÉCUTION UNIQUE
+def une_seule_fois(utilisateur_id, cle, action):
+    """🔂 Exécute action() une seule fois par clé ; retourne (résultat, rejoué).
+
+    Le premier appel réserve la clé (cache.add, atomique) puis mémorise le
+    résultat IDEMPOTENCE_TIMEOUT secondes. Un appel répété reçoit ce résultat
+    sans rien exécuter ; un appel concurrent reçoit tout de suite (None, True)
+    (« en cours »), sans bloquer le worker. Un action() qui échoue (None ou
+    exception) libère la clé : corriger le formulaire et le renvoyer reste
+    possible. Sans cache partagé (CACHE_PARTAGE), un doublon arrivé sur un
+    autre worker passerait quand même : action() est alors simplement exécutée.
+    """
+    if not cle or not settings.CACHE_PARTAGE:
+        return action(), False
+
+    cle_cache = _cle_cache(utilisateur_id, cle)
+    if not cache.add(cle_cache, EN_COURS, settings.IDEMPOTENCE_TIMEOUT):
+        resultat = cache.get(cle_cache)
+        if resultat == EN_COURS:
+            resultat = None  # Premier envoi toujours en cours : ne rien écrire deux fois
+        return resultat, True
+
+    try:
+        resultat = action()
+    except BaseException:
+        cache.delete(cle_cache)
+        raise
+    if resultat is None:
+        cache.delete(cle_cache)
+    else:
+        cache.set(cle_cache, resultat, settings.IDEMPOTENCE_TIMEOUT)
+    return resultat, False
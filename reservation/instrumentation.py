@@ -0,0 +1,274 @@
+import bisect
+import cProfile
+import heapq
+import logging
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.backends import django as backend_django
+
+logger = logging.getLogger(__name__)
+
+# 📏 Bornes (secondes) de l'histogramme des durées de requête
+BORNES_DUREE = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+_mesure_courante = ContextVar('mesure_courante', default=None)
+
+
+class Mesure:
+    """⏱️ Ce que coûte une requête HTTP en cours"""
+
+    def __init__(self):
+        self.debut = time.perf_counter()
+        self.duree = 0.0
+        self.duree_db = 0.0
+        self.duree_templates = 0.0
+        self.requetes = Counter()  # (alias, sql, paramètres) → exécutions
+
+    @property
+    def nb_requetes(self):
+        return sum(self.requetes.values())
+
+    @property
+    def doublons(self):
+        return {cle: nombre for cle, nombre in self.requetes.items() if nombre > 1}
+
+    def __call__(self, execute, sql, params, many, context):
+        # execute_wrapper : chronomètre chaque requête SQL
+        depart = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duree_db += time.perf_counter() - depart
+            try:
+                cle = (context['connection'].alias, sql, repr(params))
+            except Exception:
+                cle = (context['connection'].alias, sql, None)
+            self.requetes[cle] += 1
+
+
+# 📊 MÉTRIQUES AGRÉGÉES PAR VUE
+class Metriques:
+    """📊 Cumuls par vue, propres au processus (un jeu par worker gunicorn)"""
+
+    def __init__(self):
+        self.verrou = threading.Lock()
+        self.reinitialiser()
+
+    def reinitialiser(self):
+        with self.verrou:
+            self.vues = defaultdict(lambda: {
+                'requetes_http': 0,
+                'duree': 0.0,
+                'duree_db': 0.0,
+                'duree_templates': 0.0,
+                'requetes_sql': 0,
+                'requetes_dupliquees': 0,
+                'histogramme': [0] * (len(BORNES_DUREE) + 1),
+            })
+
+    def enregistrer(self, vue, mesure):
+        doublons = sum(nombre - 1 for nombre in mesure.doublons.values())
+        with self.verrou:
+            cumul = self.vues[vue]
+            cumul['requetes_http'] += 1
+            cumul['duree'] += mesure.duree
+            cumul['duree_db'] += mesure.duree_db
+            cumul['duree_templates'] += mesure.duree_templates
+            cumul['requetes_sql'] += mesure.nb_requetes
+            cumul['requetes_dupliquees'] += doublons
+            cumul['histogramme'][bisect.bisect_left(BORNES_DUREE, mesure.duree)] += 1
+
+    def prometheus(self):
+        """📈 Format texte d'exposition Prometheus (version 0.0.4)"""
+        with self.verrou:
+            vues = {vue: dict(cumul, histogramme=list(cumul['histogramme']))
+                    for vue, cumul in self.vues.items()}
+
+        lignes = []
+
+        def famille(nom, type_, aide, valeurs):
+            lignes.append(f"# HELP {nom} {aide}")
+            lignes.append(f"# TYPE {nom} {type_}")
+            for etiquettes, valeur in valeurs:
+                lignes.append(f"{nom}{{{etiquettes}}} {valeur:g}")
+
+        famille('campus_http_requetes_total', 'counter', "Requêtes HTTP traitées",
+                [(f'vue="{vue}"', c['requetes_http']) for vue, c in vues.items()])
+
+        seaux = []
+        for vue, c in vues.items():
+            cumul = 0
+            for borne, nombre in zip(BORNES_DUREE + ('+Inf',), c['histogramme']):
+                cumul += nombre
+                seaux.append((f'vue="{vue}",le="{borne}"', cumul))
+        lignes.append("# HELP campus_http_duree_secondes Durée totale des requêtes HTTP")
+        lignes.append("# TYPE campus_http_duree_secondes histogram")
+        for etiquettes, valeur in seaux:
+            lignes.append(f"campus_http_duree_secondes_bucket{{{etiquettes}}} {valeur}")
+        for vue, c in vues.items():
+            lignes.append(f'campus_http_duree_secondes_sum{{vue="{vue}"}} {c["duree"]:g}')
+            lignes.append(f'campus_http_duree_secondes_count{{vue="{vue}"}} {c["requetes_http"]}')
+
+        famille('campus_db_duree_secondes_total', 'counter', "Temps passé en base de données",
+                [(f'vue="{vue}"', c['duree_db']) for vue, c in vues.items()])
+        famille('campus_db_requetes_total', 'counter', "Requêtes SQL exécutées",
+                [(f'vue="{vue}"', c['requetes_sql']) for vue, c in vues.items()])
+        famille('campus_db_requetes_dupliquees_total', 'counter',
+                "Requêtes SQL identiques répétées dans une même requête HTTP",
+                [(f'vue="{vue}"', c['requetes_dupliquees']) for vue, c in vues.items()])
+        famille('campus_template_duree_secondes_total', 'counter', "Temps de rendu des templates",
+                [(f'vue="{vue}"', c['duree_templates']) for vue, c in vues.items()])
+        return '\n'.join(lignes) + '\n'
+
+
+metriques = Metriques()
+
+
+# 🎨 RENDU DES TEMPLATES
+# Remplacé une seule fois, par ReservationConfig.ready() si INSTRUMENTATION est actif
+_rendu_original = backend_django.Template.render
+
+
+def _rendu_chronometre(self, context=None, request=None):
+    mesure = _mesure_courante.get()
+    if mesure is None:
+        return _rendu_original(self, context, request)
+    depart = time.perf_counter()
+    try:
+        return _rendu_original(self, context, request)
+    finally:
+        mesure.duree_templates += time.perf_counter() - depart
+
+
+def installer_chronometre():
+    """🎨 Chronomètre le rendu des templates (sans mesure en cours : simple appel)"""
+    backend_django.Template.render = _rendu_chronometre
+
+
+def retirer_chronometre():
+    backend_django.Template.render = _rendu_original
+
+
+# ⏱️ MESURE D'UN BLOC DE CODE (vue, puis itération d'une réponse en flux)
+@contextmanager
+def _mesurer(mesure, profil=None):
+    jeton = _mesure_courante.set(mesure)
+    try:
+        with ExitStack() as pile:
+            for connexion in connections.all():
+                pile.enter_context(connexion.execute_wrapper(mesure))
+            if profil:
+                profil.enable()
+            try:
+                yield mesure
+            finally:
+                if profil:
+                    profil.disable()
+    finally:
+        _mesure_courante.reset(jeton)
+
+
+# 🔬 PROFILS cProfile DES REQUÊTES LES PLUS LENTES
+class Profileur:
+    """🔬 Profile un échantillon des requêtes et garde les `nombre` plus lentes sur disque"""
+
+    def __init__(self, taux, nombre, dossier):
+        self.taux = taux
+        self.nombre = nombre
+        self.dossier = Path(dossier)
+        self.verrou = threading.Lock()
+        self.plus_lentes = []  # Tas (durée, chemin) : la plus rapide en tête
+
+    def echantillonner(self):
+        return self.taux > 0 and self.nombre > 0 and random.random() < self.taux
+
+    def conserver(self, profil, vue, duree):
+        with self.verrou:
+            if len(self.plus_lentes) >= self.nombre and duree <= self.plus_lentes[0][0]:
+                return None
+            self.dossier.mkdir(parents=True, exist_ok=True)
+            chemin = self.dossier / f"{duree * 1000:010.1f}ms-{vue.replace(':', '-')}-{time.time_ns()}.prof"
+            profil.dump_stats(chemin)
+            heapq.heappush(self.plus_lentes, (duree, str(chemin)))
+            if len(self.plus_lentes) > self.nombre:
+                _, ecarte = heapq.heappop(self.plus_lentes)
+                Path(ecarte).unlink(missing_ok=True)
+            return chemin
+
+
+# 🛰️ MIDDLEWARE
+class InstrumentationMiddleware:
+    """🛰️ Temps total, base de données et templates par vue (settings.INSTRUMENTATION).
+
+    Ajoute un en-tête Server-Timing à chaque réponse et alimente `metriques`,
+    exposé au format Prometheus par la vue `metriques`. Pour une réponse en
+    flux (exports, SSE), le travail et le SQL ont lieu pendant l'itération :
+    streaming_content est enveloppé et la mesure enregistrée à la fin du flux ;
+    l'en-tête, envoyé avant, ne couvre que la vue.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'INSTRUMENTATION', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.profileur = Profileur(
+            getattr(settings, 'INSTRUMENTATION_ECHANTILLON', 0),
+            getattr(settings, 'INSTRUMENTATION_PROFILS', 10),
+            getattr(settings, 'INSTRUMENTATION_DOSSIER_PROFILS', settings.BASE_DIR / 'profils'),
+        )
+
+    def __call__(self, request):
+        mesure = Mesure()
+        profil = cProfile.Profile() if self.profileur.echantillonner() else None
+        with _mesurer(mesure, profil):
+            response = self.get_response(request)
+
+        correspondance = getattr(request, 'resolver_match', None)
+        vue = correspondance.view_name if correspondance else 'non_resolue'
+        en_tete = ', '.join([
+            f"{'vue' if response.streaming else 'total'};dur={(time.perf_counter() - mesure.debut) * 1000:.1f}",
+            f'db;dur={mesure.duree_db * 1000:.1f};desc="{mesure.nb_requetes} SQL"',
+            f"tpl;dur={mesure.duree_templates * 1000:.1f}",
+        ])
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = self._flux_asynchrone(response.streaming_content, mesure, vue, profil)
+            else:
+                response.streaming_content = self._flux(response.streaming_content, mesure, vue, profil)
+        else:
+            self._terminer(mesure, vue, profil)
+        response['Server-Timing'] = en_tete
+        return response
+
+    def _flux(self, contenu, mesure, vue, profil):
+        try:
+            with _mesurer(mesure, profil):
+                yield from contenu
+        finally:
+            self._terminer(mesure, vue, profil)
+
+    async def _flux_asynchrone(self, contenu, mesure, vue, profil):
+        # ORM asynchrone exécuté dans d'autres threads : durée totale seulement
+        try:
+            async for morceau in contenu:
+                yield morceau
+        finally:
+            self._terminer(mesure, vue, profil)
+
+    def _terminer(self, mesure, vue, profil):
+        mesure.duree = time.perf_counter() - mesure.debut
+        metriques.enregistrer(vue, mesure)
+        for (alias, sql, params), nombre in mesure.doublons.items():
+            logger.warning("🔁 %s : requête exécutée %d fois sur %s : %s %s",
+                           vue, nombre, alias, sql, params or '')
+        if profil:
+            self.profileur.conserver(profil, vue, mesure.duree)
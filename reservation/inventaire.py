@@ -0,0 +1,103 @@
+import json
+from collections import namedtuple
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .models import Salle
+from .cache import invalider_salles
+from .comptes import lire_csv
+from .recherche import synchroniser_equipements
+from . import statistiques
+
+ResultatImportSalles = namedtuple('ResultatImportSalles', ['crees', 'mises_a_jour', 'erreurs'])
+
+TAILLE_LOT_SALLES = 500
+CHAMPS_MODIFIABLES = ('capacite', 'localisation', 'equipements', 'est_disponible')
+VRAI, FAUX = {'1', 'true', 'vrai', 'oui', 'o'}, {'0', 'false', 'faux', 'non', 'n'}
+
+
+# 📥 LECTURE DU FICHIER
+def lire_json(fichier):
+    """📥 Liste d'objets {nom, capacite, localisation, ...}"""
+    contenu = json.load(fichier)
+    if not isinstance(contenu, list) or not all(isinstance(ligne, dict) for ligne in contenu):
+        raise ValueError("liste d'objets attendue")
+    return [{str(cle).strip().lower(): valeur for cle, valeur in ligne.items()} for ligne in contenu]
+
+
+def lire_salles(fichier, format):
+    """📥 Lignes d'un fichier 'csv' (même lecture que les listes de classe) ou 'json'"""
+    return lire_json(fichier) if format == 'json' else lire_csv(fichier)
+
+
+def _booleen(valeur):
+    if isinstance(valeur, bool):
+        return valeur
+    texte = str(valeur).strip().lower()
+    if texte in VRAI:
+        return True
+    if texte in FAUX:
+        return False
+    raise ValidationError(f"est_disponible invalide « {valeur} »")
+
+
+def _salle(ligne):
+    nom = str(ligne.get('nom') or '').strip()
+    if not nom:
+        raise ValidationError("nom manquant")
+    try:
+        capacite = int(ligne.get('capacite'))
+    except (TypeError, ValueError):
+        raise ValidationError(f"capacité invalide « {ligne.get('capacite')} »")
+    if capacite < 1:
+        raise ValidationError("capacité nulle ou négative")
+    salle = Salle(
+        nom=nom, capacite=capacite,
+        localisation=str(ligne.get('localisation') or '').strip(),
+        equipements=str(ligne.get('equipements') or '').strip(),
+        est_disponible=_booleen(ligne['est_disponible']) if ligne.get('est_disponible') not in (None, '') else True,
+    )
+    salle.full_clean(exclude=['nom', 'equipements'], validate_unique=False)
+    return salle
+
+
+# 🏢 IMPORT EN MASSE
+def importer_salles(lignes, taille_lot=TAILLE_LOT_SALLES):
+    """🏢 Crée ou met à jour les salles en une transaction (bulk_create, upsert sur le nom).
+
+    Seules les colonnes présentes dans toutes les lignes sont mises à jour sur
+    une salle existante : un fichier sans est_disponible ne réactive pas une
+    salle désactivée. Les lignes invalides sont écartées et signalées par
+    numéro de ligne du fichier (en-tête = ligne 1).
+    """
+    erreurs, salles = [], {}
+    colonnes = set(CHAMPS_MODIFIABLES)
+    for numero, ligne in enumerate(lignes, 2):
+        try:
+            salle = _salle(ligne)
+        except ValidationError as exc:
+            erreurs.append((numero, str(ligne.get('nom') or ''), ' '.join(exc.messages)))
+            continue
+        if salle.nom in salles:
+            erreurs.append((numero, salle.nom, "doublon dans le fichier"))
+            continue
+        colonnes &= set(ligne)
+        salles[salle.nom] = salle
+    if not salles:
+        return ResultatImportSalles([], [], sorted(erreurs))
+
+    with transaction.atomic():
+        existantes = set(Salle.objects.filter(nom__in=salles).values_list('nom', flat=True))
+        Salle.objects.bulk_create(
+            salles.values(), batch_size=taille_lot,
+            update_conflicts=True, unique_fields=['nom'],
+            update_fields=[champ for champ in CHAMPS_MODIFIABLES if champ in colonnes],  # capacite, localisation au moins
+        )
+        # bulk_create n'envoie pas de signaux : pk relus, puis jetons, compteur et cache
+        importees = list(Salle.objects.filter(nom__in=salles).order_by('nom'))
+        synchroniser_equipements(importees)
+        crees = [salle for salle in importees if salle.nom not in existantes]
+        statistiques.ajuster({statistiques.SALLES: len(crees)})
+        transaction.on_commit(invalider_salles)
+    return ResultatImportSalles(crees, [salle for salle in importees if salle.nom in existantes], sorted(erreurs))
@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.db import connections
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+ALIAS_REPLIQUE = 'replique'
+
+
+class LanceurTests(DiscoverRunner):
+    """🧪 Les tests tournent sans collectstatic, donc sans manifeste des noms hachés :
+    les CSS sont servis par le stockage simple le temps des tests.
+
+    Une réplique SQLite distincte (alias 'replique', en mémoire) remplace celle
+    de l'environnement : les tests qui la demandent (databases) y voient
+    d'autres données que sur la base principale. Aucun autre test ne la lit
+    (REPLIQUE_ALIAS=None, à réactiver avec override_settings) ; le routeur ne
+    l'écarte donc pas de migrate et elle reçoit le même schéma."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        settings.DATABASES[ALIAS_REPLIQUE] = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'}
+        connections.configure_settings(settings.DATABASES)  # Valeurs par défaut de la nouvelle base
+        self.reglages = override_settings(
+            STORAGES={
+                **settings.STORAGES,
+                'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+            },
+            REPLIQUE_ALIAS=None,
+        )
+        self.reglages.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.reglages.disable()
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,45 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from reservation.archives import archiver, archivables, date_limite, TAILLE_LOT, JOURS_CONSERVES
+
+
+class Command(BaseCommand):
+    help = "🗄️ Déplace par lots les réservations passées et closes vers l'archive"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--avant', help="Archive les réservations antérieures à cette date (AAAA-MM-JJ)")
+        parser.add_argument('--jours', type=int, default=JOURS_CONSERVES,
+                            help="Sans --avant : archive ce qui date de plus de N jours")
+        parser.add_argument('--lot', type=int, default=TAILLE_LOT,
+                            help="Réservations déplacées par transaction")
+        parser.add_argument('--simuler', action='store_true',
+                            help="Parcourt les lots sans rien déplacer")
+
+    def handle(self, *args, **options):
+        try:
+            avant = date.fromisoformat(options['avant']) if options['avant'] else date_limite(options['jours'])
+        except ValueError:
+            raise CommandError("--avant attend une date au format AAAA-MM-JJ")
+        if options['lot'] < 1:
+            raise CommandError("--lot doit être positif")
+
+        simuler = options['simuler']
+        self.stdout.write(
+            f"{'🔎 Simulation' if simuler else '🗄️ Archivage'} avant le {avant.isoformat()} "
+            f"({archivables(avant).count()} réservation(s))"
+        )
+        total, depart = 0, time.perf_counter()
+        for numero, (nombre, duree) in enumerate(archiver(avant, options['lot'], simuler), 1):
+            total += nombre
+            self.stdout.write(f"  lot {numero} : {nombre} ligne(s) en {duree:.2f} s "
+                              f"({nombre / duree if duree else 0:.0f} lignes/s)")
+
+        ecoule = time.perf_counter() - depart
+        verbe = "seraient archivée(s)" if simuler else "archivée(s)"
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {total} réservation(s) {verbe} en {ecoule:.2f} s "
+            f"({total / ecoule if ecoule else 0:.0f} lignes/s)"
+        ))
@@ -0,0 +1,125 @@
+import json
+import platform
+from pathlib import Path
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (
+    override_settings, setup_test_environment, teardown_test_environment,
+)
+from django.utils import timezone
+
+from reservation import benchmark
+
+
+class Command(BaseCommand):
+    help = "⏱️ Mesure les chemins critiques sur une base de test SQLite jetable"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--salles', type=int, default=50)
+        parser.add_argument('--utilisateurs', type=int, default=500)
+        parser.add_argument('--reservations', type=int, default=20000)
+        parser.add_argument('--iterations', type=int, default=50,
+                            help="Appels mesurés par scénario")
+        parser.add_argument('--graine', type=int, default=42)
+        parser.add_argument('--concurrence', type=int, default=20,
+                            help="Clients simultanés de la comparaison WSGI / ASGI")
+        parser.add_argument('--scenario', action='append', dest='scenarios',
+                            help="Limite aux scénarios nommés (option répétable)")
+        parser.add_argument('--sortie', default='benchmark.json',
+                            help="Fichier JSON des résultats")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError("Le banc d'essai tourne sur SQLite (base de test jetable)")
+
+        # 🧪 Base de test : les données réelles ne sont jamais touchées
+        setup_test_environment()
+        nom_base = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            # Pas de manifeste sans collectstatic : stockage statique simple
+            with override_settings(STORAGES={
+                'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+                'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+            }):
+                resultats = self.executer(options)
+        finally:
+            connection.creation.destroy_test_db(nom_base, verbosity=0)
+            teardown_test_environment()
+
+        Path(options['sortie']).write_text(json.dumps(resultats, indent=2, ensure_ascii=False),
+                                           encoding='utf-8')
+        self.stdout.write(self.style.SUCCESS(f"📁 Résultats écrits dans {options['sortie']}"))
+
+    def executer(self, options):
+        self.stdout.write(
+            f"🏭 Génération : {options['salles']} salles, {options['utilisateurs']} utilisateurs, "
+            f"{options['reservations']} réservations"
+        )
+        donnees = benchmark.generer_donnees(
+            options['salles'], options['utilisateurs'], options['reservations'], options['graine'],
+        )
+        actions = benchmark.scenarios(donnees, options['graine'])
+        inconnus = set(options['scenarios'] or []) - set(actions)
+        if inconnus:
+            raise CommandError(f"Scénario(s) inconnu(s) : {', '.join(sorted(inconnus))}")
+
+        mesures = {}
+        for nom, (preparer, action) in actions.items():
+            if options['scenarios'] and nom not in options['scenarios']:
+                continue
+            if preparer:
+                preparer(-1)
+            action(-1)  # Échauffement : caches et connexions prêts
+            mesures[nom] = benchmark.mesurer(action, options['iterations'], preparer)
+            m = mesures[nom]
+            self.stdout.write(
+                f"⏱️ {nom:<22} p50 {m['p50_ms']:>8.2f} ms  p90 {m['p90_ms']:>8.2f} ms  "
+                f"p99 {m['p99_ms']:>8.2f} ms  {m['requetes_moyenne']:>6.1f} requêtes"
+            )
+
+        pages = benchmark.peser_pages(donnees['utilisateurs'][0], donnees['admin'])
+        for nom, poids in pages.items():
+            self.stdout.write(f"📦 {nom:<22} HTML {poids['html']['octets']:>8} o ({poids['html']['octets_gzip']:>6} o gzip)  "
+                              f"CSS en cache {poids['css']['octets']:>6} o")
+        fragments = benchmark.comparer_fragments(donnees['utilisateurs'][0], options['iterations'])
+        for nom, m in fragments.items():
+            self.stdout.write(f"🧩 accueil, fragments {nom:<7} p50 {m['p50_ms']:>8.2f} ms  "
+                              f"{m['requetes_moyenne']:>6.1f} requêtes")
+
+        analyses = benchmark.mesurer_analyses()
+        if analyses:
+            self.stdout.write(f"📊 analyses d'occupation {analyses['lignes']} lignes en {analyses['duree_s']:.2f} s "
+                              f"({analyses['lignes_par_seconde']} lignes/s)")
+        else:
+            self.stdout.write("📊 analyses d'occupation : aucune réservation, mesure ignorée")
+
+        sessions = benchmark.comparer_sessions(donnees['utilisateurs'][0], options['iterations'])
+        for nom, m in sessions.items():
+            self.stdout.write(f"🔐 session {nom:<14} p50 {m['p50_ms']:>8.2f} ms  "
+                              f"{m['requetes_moyenne']:>6.1f} requêtes par requête authentifiée")
+
+        concurrence = benchmark.comparer_concurrence(
+            donnees['utilisateurs'][0], options['concurrence'], options['iterations'],
+        )
+        for nom, m in concurrence.items():
+            self.stdout.write(f"⚡ {nom} x{options['concurrence']:<4} {m['requetes_par_seconde']:>8.1f} req/s  "
+                              f"p50 {m['p50_ms']:>8.2f} ms  p99 {m['p99_ms']:>8.2f} ms  {m['erreurs']} erreur(s)")
+
+        return {
+            'date': timezone.now().isoformat(timespec='seconds'),
+            'environnement': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'base': connection.vendor,
+            },
+            'parametres': {cle: options[cle] for cle in
+                           ['salles', 'utilisateurs', 'reservations', 'iterations', 'graine', 'concurrence']},
+            'scenarios': mesures,
+            'pages': pages,
+            'fragments': fragments,
+            'analyses': analyses,
+            'sessions': sessions,
+            'concurrence': concurrence,
+        }
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = "🪞 Recopie la base SQLite principale dans la réplique (essais locaux de RouteurReplique)"
+
+    def handle(self, *args, **options):
+        alias = settings.REPLIQUE_ALIAS
+        if not alias:
+            raise CommandError("Aucune réplique configurée (SQLITE_REPLIQUE ou DATABASE_REPLICA_URL)")
+        source, cible = connections[DEFAULT_DB_ALIAS], connections[alias]
+        if source.vendor != 'sqlite' or cible.vendor != 'sqlite':
+            raise CommandError("Réservé à SQLite : ailleurs, la réplication est assurée par la base")
+
+        # Instantané cohérent : jusqu'au prochain appel, la réplique « prend du retard »
+        source.ensure_connection()
+        cible.ensure_connection()
+        source.connection.backup(cible.connection)
+        self.stdout.write(self.style.SUCCESS(f"✅ {source.settings_dict['NAME']} → {cible.settings_dict['NAME']}"))
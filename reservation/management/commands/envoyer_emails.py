@@ -0,0 +1,38 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from reservation.utils import envoyer_file_emails
+
+
+class Command(BaseCommand):
+    help = "📤 Envoie les emails en attente par lots (worker de la file EmailSortant)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lot', type=int,
+                            help="Nombre d'emails envoyés par connexion SMTP (défaut : EMAIL_TAILLE_LOT)")
+        parser.add_argument('--max-tentatives', type=int,
+                            help="Nombre d'échecs avant de passer un email en « Abandonné » "
+                                 "(défaut : EMAIL_MAX_TENTATIVES)")
+        parser.add_argument('--boucle', action='store_true',
+                            help="Tourne en continu (worker du Procfile) au lieu de vider la file puis s'arrêter")
+        parser.add_argument('--pause', type=float, default=5.0,
+                            help="Secondes d'attente quand la file est vide (avec --boucle)")
+
+    def handle(self, *args, **options):
+        lot = options['lot'] or settings.EMAIL_TAILLE_LOT
+        while True:
+            resultat = envoyer_file_emails(lot, options['max_tentatives'])
+            traites = sum(resultat.values())
+            if traites:
+                self.stdout.write(
+                    f"✅ {resultat['envoyes']} envoyé(s), "
+                    f"⏳ {resultat['reportes']} reporté(s), "
+                    f"☠️ {resultat['abandonnes']} abandonné(s)"
+                )
+            # Un lot plein signifie sans doute qu'il en reste : on enchaîne
+            if traites < lot:
+                if not options['boucle']:
+                    break
+                time.sleep(options['pause'])
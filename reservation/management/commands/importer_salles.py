@@ -0,0 +1,42 @@
+import csv
+import json
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from reservation.inventaire import lire_salles, importer_salles, TAILLE_LOT_SALLES
+
+
+class Command(BaseCommand):
+    help = "🏢 Crée ou met à jour des salles depuis un CSV ou un JSON (upsert sur le nom)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('fichier', help="Colonnes : nom, capacite, localisation[, equipements, est_disponible]")
+        parser.add_argument('--format', choices=['csv', 'json'],
+                            help="Format du fichier (défaut : d'après l'extension)")
+        parser.add_argument('--lot', type=int, default=TAILLE_LOT_SALLES,
+                            help="Salles insérées par requête")
+
+    def handle(self, *args, **options):
+        format = options['format'] or ('json' if Path(options['fichier']).suffix.lower() == '.json' else 'csv')
+        if options['lot'] < 1:
+            raise CommandError("--lot doit être positif")
+        try:
+            with open(options['fichier'], 'rb') as fichier:
+                lignes = lire_salles(fichier, format)
+        except OSError as exc:
+            raise CommandError(f"Lecture impossible : {exc}")
+        except (UnicodeDecodeError, csv.Error, ValueError) as exc:
+            raise CommandError(f"{format.upper()} illisible : {exc}")
+
+        depart = time.perf_counter()
+        resultat = importer_salles(lignes, options['lot'])
+        duree = time.perf_counter() - depart
+
+        for numero, nom, erreur in resultat.erreurs:
+            self.stderr.write(f"❌ ligne {numero} ({nom or '?'}) : {erreur}")
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {len(resultat.crees)} salle(s) créée(s), {len(resultat.mises_a_jour)} mise(s) à jour, "
+            f"{len(resultat.erreurs)} ligne(s) écartée(s) en {duree:.2f} s"
+        ))
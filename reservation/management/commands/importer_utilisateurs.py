@@ -0,0 +1,51 @@
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from reservation.comptes import lire_csv, importer_utilisateurs, TAILLE_LOT_IMPORT
+
+
+class Command(BaseCommand):
+    help = "📥 Importe une liste de classe (CSV) en comptes déjà approuvés"
+
+    def add_arguments(self, parser):
+        parser.add_argument('fichier', help="CSV à en-tête : username, email[, statut, prenom, nom, telephone, mot_de_passe]")
+        parser.add_argument('--processus', type=int, default=None,
+                            help="Processus de hachage des mots de passe (défaut : nombre de CPU)")
+        parser.add_argument('--lot', type=int, default=TAILLE_LOT_IMPORT,
+                            help="Comptes insérés par requête")
+        parser.add_argument('--sortie',
+                            help="CSV où écrire les mots de passe générés (sinon : sortie standard)")
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['fichier'], 'rb') as fichier:
+                lignes = lire_csv(fichier)
+        except OSError as exc:
+            raise CommandError(f"Lecture impossible : {exc}")
+        except (UnicodeDecodeError, csv.Error) as exc:
+            raise CommandError(f"CSV illisible : {exc}")
+
+        depart = time.perf_counter()
+        resultat = importer_utilisateurs(lignes, options['processus'], options['lot'])
+        duree = time.perf_counter() - depart
+
+        for numero, username, erreur in resultat.erreurs:
+            self.stderr.write(f"❌ ligne {numero} ({username or '?'}) : {erreur}")
+        if resultat.mots_de_passe_generes:
+            if options['sortie']:
+                with open(options['sortie'], 'w', newline='', encoding='utf-8') as sortie:
+                    ecrivain = csv.writer(sortie, delimiter=';')
+                    ecrivain.writerow(['username', 'mot_de_passe'])
+                    ecrivain.writerows(resultat.mots_de_passe_generes.items())
+                self.stdout.write(f"🔑 {len(resultat.mots_de_passe_generes)} mot(s) de passe généré(s) "
+                                  f"dans {options['sortie']}")
+            else:
+                self.stdout.write("🔑 Mots de passe générés (username;mot_de_passe) :")
+                for username, mot_de_passe in resultat.mots_de_passe_generes.items():
+                    self.stdout.write(f"{username};{mot_de_passe}")
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {len(resultat.crees)} compte(s) créé(s), {len(resultat.erreurs)} ligne(s) écartée(s) "
+            f"en {duree:.2f} s"
+        ))
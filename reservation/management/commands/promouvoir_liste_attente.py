@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from reservation.attente import promouvoir, expirer, TAILLE_LOT_ATTENTE
+
+
+class Command(BaseCommand):
+    help = "⏳ Transforme en réservations les demandes de liste d'attente dont le créneau s'est libéré"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lot', type=int, default=TAILLE_LOT_ATTENTE,
+                            help="Demandes examinées par passage")
+        parser.add_argument('--boucle', action='store_true',
+                            help="Tourne en continu (worker du Procfile) au lieu d'un seul passage (cron)")
+        parser.add_argument('--pause', type=float, default=30.0,
+                            help="Secondes entre deux passages (avec --boucle)")
+
+    def handle(self, *args, **options):
+        if options['lot'] < 1:
+            raise CommandError("--lot doit être positif")
+
+        while True:
+            expirees = expirer()
+            promues = 0
+            while True:
+                resultat = promouvoir(options['lot'])
+                promues += len(resultat.promues)
+                if resultat.examinees < options['lot']:
+                    break
+            if promues or expirees or not options['boucle']:
+                self.stdout.write(f"⏫ {promues} demande(s) promue(s), ⌛ {expirees} expirée(s)")
+            if not options['boucle']:
+                break
+            time.sleep(options['pause'])
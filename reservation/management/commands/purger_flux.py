@@ -0,0 +1,25 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from reservation import flux
+
+
+class Command(BaseCommand):
+    help = "🧹 Supprime les événements du flux SSE plus vieux que FLUX_RETENTION"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--boucle', action='store_true',
+                            help="Tourne en continu (worker du Procfile) au lieu d'un seul passage (cron)")
+        parser.add_argument('--pause', type=float, default=3600.0,
+                            help="Secondes entre deux passages (avec --boucle)")
+
+    def handle(self, *args, **options):
+        while True:
+            supprimes = flux.purger()
+            if supprimes or not options['boucle']:
+                self.stdout.write(f"🧹 {supprimes} événement(s) de plus de {settings.FLUX_RETENTION} s supprimé(s)")
+            if not options['boucle']:
+                break
+            time.sleep(options['pause'])
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from reservation.disponibilites import recalculer_masques
+from reservation.models import OccupationJour
+
+
+class Command(BaseCommand):
+    help = ("🔄 Reconstruit les masques d'occupation (OccupationJour) depuis les réservations "
+            "(après un update() brut, un archivage ou une correction SQL à la main)")
+
+    def handle(self, *args, **options):
+        recalculer_masques()
+        self.stdout.write(f"🔄 {OccupationJour.objects.count()} journée(s) de salle recalculée(s)")
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from reservation import statistiques
+
+
+class Command(BaseCommand):
+    help = "📊 Reconstruit (ou vérifie avec --verifier) les compteurs du dashboard"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verifier', action='store_true',
+                            help="Compare les compteurs aux données sans rien modifier")
+
+    def handle(self, *args, **options):
+        if options['verifier']:
+            ecarts = statistiques.verifier()
+            for nom, (stocke, exact) in ecarts.items():
+                self.stderr.write(f"❌ {nom} : {stocke} stocké, {exact} attendu")
+            if ecarts:
+                raise CommandError(f"{len(ecarts)} compteur(s) incohérent(s)")
+            self.stdout.write("✅ Compteurs cohérents")
+            return
+
+        for nom, valeur in statistiques.recalculer().items():
+            self.stdout.write(f"🔄 {nom} = {valeur}")
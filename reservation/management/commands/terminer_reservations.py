@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from reservation.services import terminer_expirees, TAILLE_LOT_TERMINAISON
+
+
+class Command(BaseCommand):
+    help = "🏁 Passe en « Terminée » les réservations validées dont le créneau est passé"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lot', type=int, default=TAILLE_LOT_TERMINAISON,
+                            help="Réservations mises à jour par requête UPDATE")
+        parser.add_argument('--boucle', action='store_true',
+                            help="Tourne en continu (worker du Procfile) au lieu d'un seul passage (cron)")
+        parser.add_argument('--pause', type=float, default=900.0,
+                            help="Secondes entre deux passages (avec --boucle)")
+
+    def handle(self, *args, **options):
+        if options['lot'] < 1:
+            raise CommandError("--lot doit être positif")
+
+        while True:
+            total = sum(terminer_expirees(options['lot']))
+            if total or not options['boucle']:
+                self.stdout.write(f"🏁 {total} réservation(s) terminée(s)")
+            if not options['boucle']:
+                break
+            time.sleep(options['pause'])
@@ -0,0 +1,17 @@
+# Generated by Django 6.0.2 on 2026-10-18 10:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['salle', 'date', 'statut'], name='resa_salle_date_statut_idx'),
+        ),
+    ]
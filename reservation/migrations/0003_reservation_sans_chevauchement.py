@@ -0,0 +1,61 @@
+from django.db import migrations
+
+# 🔒 Contrainte d'exclusion PostgreSQL : deux réservations actives d'une même
+# salle ne peuvent pas se chevaucher. Sans effet sur les autres bases, où
+# reservation.services.reserver() prend un verrou à la place.
+CREER_CONTRAINTE = """
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+ALTER TABLE reservation_reservation
+    ADD CONSTRAINT resa_sans_chevauchement
+    EXCLUDE USING gist (
+        salle_id WITH =,
+        tsrange(date + heure_debut, date + heure_fin, '[)') WITH &&
+    )
+    WHERE (statut IN ('En attente', 'Validée'));
+"""
+
+SUPPRIMER_CONTRAINTE = """
+ALTER TABLE reservation_reservation DROP CONSTRAINT IF EXISTS resa_sans_chevauchement;
+"""
+
+
+def refuser_chevauchements(apps, schema_editor):
+    # 🧹 La contrainte échouerait sur des chevauchements déjà en base : dans
+    # chaque groupe, la demande la plus ancienne reste active, les autres sont refusées
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Reservation = apps.get_model('reservation', 'Reservation')
+    actives = Reservation.objects.filter(statut__in=('En attente', 'Validée')).order_by(
+        'salle_id', 'date', 'date_creation', 'pk',
+    ).values_list('pk', 'salle_id', 'date', 'heure_debut', 'heure_fin')
+    gardees, refusees = {}, []
+    for pk, salle_id, jour, debut, fin in actives.iterator(chunk_size=2000):
+        creneaux = gardees.setdefault((salle_id, jour), [])
+        if any(debut < autre_fin and autre_debut < fin for autre_debut, autre_fin in creneaux):
+            refusees.append(pk)
+        else:
+            creneaux.append((debut, fin))
+    for i in range(0, len(refusees), 1000):
+        Reservation.objects.filter(pk__in=refusees[i:i + 1000]).update(statut='Refusée')
+
+
+def creer_contrainte(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(CREER_CONTRAINTE)
+
+
+def supprimer_contrainte(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(SUPPRIMER_CONTRAINTE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation', '0002_reservation_salle_date_statut_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(refuser_chevauchements, migrations.RunPython.noop),
+        migrations.RunPython(creer_contrainte, supprimer_contrainte),
+    ]
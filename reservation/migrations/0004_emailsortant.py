@@ -0,0 +1,33 @@
+# Generated by Django 6.0.2 on 2026-10-18 10:13
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation', '0003_reservation_sans_chevauchement'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmailSortant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sujet', models.CharField(max_length=255)),
+                ('message', models.TextField()),
+                ('expediteur', models.CharField(blank=True, max_length=254)),
+                ('destinataires', models.JSONField(default=list)),
+                ('statut', models.CharField(choices=[('En attente', 'En attente'), ('Envoyé', 'Envoyé'), ('Abandonné', 'Abandonné')], default='En attente', max_length=20)),
+                ('tentatives', models.PositiveIntegerField(default=0)),
+                ('prochain_essai', models.DateTimeField(default=django.utils.timezone.now)),
+                ('derniere_erreur', models.TextField(blank=True)),
+                ('date_creation', models.DateTimeField(auto_now_add=True)),
+                ('date_envoi', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['statut', 'prochain_essai'], name='email_statut_essai_idx')],
+            },
+        ),
+    ]
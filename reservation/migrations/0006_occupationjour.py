@@ -0,0 +1,47 @@
+# Generated by Django 6.0.2 on 2026-10-18 10:15
+
+import datetime
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def calculer_masques(apps, schema_editor):
+    # 🟩 Copie figée de reservation.disponibilites.masque_creneau (créneaux 8h-20h)
+    Reservation = apps.get_model('reservation', 'Reservation')
+    OccupationJour = apps.get_model('reservation', 'OccupationJour')
+    masques = {}
+    reservations = Reservation.objects.filter(statut__in=['En attente', 'Validée'])
+    for salle_id, date, debut, fin in reservations.values_list('salle_id', 'date', 'heure_debut', 'heure_fin'):
+        for position, heure in enumerate(range(8, 20)):
+            if debut < datetime.time(heure + 1) and fin > datetime.time(heure):
+                masques[(salle_id, date)] = masques.get((salle_id, date), 0) | 1 << position
+    OccupationJour.objects.bulk_create(
+        [OccupationJour(salle_id=salle_id, date=date, masque=masque)
+         for (salle_id, date), masque in masques.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation', '0005_compteur'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OccupationJour',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('masque', models.IntegerField(default=0)),
+                ('salle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='reservation.salle')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date', 'salle'], name='occupation_date_salle_idx')],
+                'constraints': [models.UniqueConstraint(fields=('salle', 'date'), name='occupation_salle_date_unique')],
+            },
+        ),
+        migrations.RunPython(calculer_masques, migrations.RunPython.noop),
+    ]
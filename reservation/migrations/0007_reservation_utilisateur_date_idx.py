@@ -0,0 +1,17 @@
+# Generated by Django 6.0.2 on 2026-10-18 10:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation', '0006_occupationjour'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['utilisateur', '-date', '-heure_debut', '-id'], name='resa_utilisateur_date_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 6.0.2 on 2026-10-18 10:19
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation', '0007_reservation_utilisateur_date_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Recurrence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date_debut', models.DateField()),
+                ('date_fin', models.DateField()),
+                ('heure_debut', models.TimeField()),
+                ('heure_fin', models.TimeField()),
+                ('intervalle_semaines', models.PositiveSmallIntegerField(choices=[(1, 'Chaque semaine'), (2, 'Une semaine sur deux')], default=1)),
+                ('exceptions', models.JSONField(blank=True, default=list)),
+                ('date_creation', models.DateTimeField(auto_now_add=True)),
+                ('salle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='reservation.salle')),
+                ('utilisateur', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='reservation',
+            name='recurrence',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reservations', to='reservation.recurrence'),
+        ),
+    ]
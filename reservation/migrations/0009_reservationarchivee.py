@@ -0,0 +1,36 @@
+# Generated by Django 6.0.2 on 2026-10-18 10:25
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation', '0008_recurrence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReservationArchivee',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('date', models.DateField()),
+                ('heure_debut', models.TimeField()),
+                ('heure_fin', models.TimeField()),
+                ('statut', models.CharField(choices=[('En attente', 'En attente'), ('Validée', 'Validée'), ('Refusée', 'Refusée'), ('Terminée', 'Terminée')], max_length=20)),
+                ('date_creation', models.DateTimeField()),
+                ('date_traitement', models.DateTimeField(blank=True, null=True)),
+                ('date_archivage', models.DateTimeField(auto_now_add=True)),
+                ('recurrence', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='reservation.recurrence')),
+                ('salle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='reservation.salle')),
+                ('utilisateur', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'réservation archivée',
+                'verbose_name_plural': 'réservations archivées',
+                'indexes': [models.Index(fields=['utilisateur', '-date', '-heure_debut', '-id'], name='archive_utilisateur_date_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 6.0.2 on 2026-10-18 10:27
+
+import re
+import unicodedata
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def creer_jetons(apps, schema_editor):
+    # 🔧 Copie figée de reservation.models.decouper_equipements / normaliser_equipement
+    Salle = apps.get_model('reservation', 'Salle')
+    EquipementSalle = apps.get_model('reservation', 'EquipementSalle')
+    jetons = []
+    for salle_id, texte in Salle.objects.values_list('pk', 'equipements'):
+        separateur = r'[,;\n]+' if re.search(r'[,;\n]', texte or '') else r'\s+'
+        vus = set()
+        for libelle in re.split(separateur, texte or ''):
+            sans_accents = unicodedata.normalize('NFKD', libelle.strip()).encode('ascii', 'ignore').decode()
+            jeton = re.sub(r'[^a-z0-9]+', '-', sans_accents.lower()).strip('-')
+            if jeton and jeton not in vus:
+                vus.add(jeton)
+                jetons.append(EquipementSalle(salle_id=salle_id, jeton=jeton))
+    EquipementSalle.objects.bulk_create(jetons, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation', '0009_reservationarchivee'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EquipementSalle',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('jeton', models.CharField(max_length=100)),
+                ('salle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='jetons', to='reservation.salle')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['jeton', 'salle'], name='equipement_jeton_salle_idx')],
+                'constraints': [models.UniqueConstraint(fields=('salle', 'jeton'), name='equipement_salle_jeton_unique')],
+            },
+        ),
+        migrations.RunPython(creer_jetons, migrations.RunPython.noop),
+    ]
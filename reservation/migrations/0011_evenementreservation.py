@@ -0,0 +1,28 @@
+# Generated by Django 6.0.2 on 2026-10-18 10:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation', '0010_equipementsalle'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EvenementReservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reservation_id', models.BigIntegerField()),
+                ('type', models.CharField(choices=[('creation', 'Création'), ('statut', 'Changement de statut'), ('suppression', 'Suppression')], max_length=20)),
+                ('statut', models.CharField(blank=True, max_length=20)),
+                ('ancien_statut', models.CharField(blank=True, max_length=20)),
+                ('date_creation', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'événement de réservation',
+                'verbose_name_plural': 'événements de réservations',
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 6.0.2 on 2026-10-18 10:43
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation', '0011_evenementreservation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DemandeAttente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('heure_debut', models.TimeField()),
+                ('heure_fin', models.TimeField()),
+                ('statut', models.CharField(choices=[('En file', 'En file'), ('Promue', 'Promue'), ('Expirée', 'Expirée'), ('Annulée', 'Annulée')], default='En file', max_length=20)),
+                ('a_examiner', models.BooleanField(default=True)),
+                ('date_creation', models.DateTimeField(auto_now_add=True)),
+                ('reservation', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='reservation.reservation')),
+                ('salle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='reservation.salle')),
+                ('utilisateur', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': "demande en liste d'attente",
+                'verbose_name_plural': "demandes en liste d'attente",
+                'indexes': [models.Index(fields=['salle', 'date', 'statut', 'date_creation'], name='attente_salle_date_idx'), models.Index(condition=models.Q(('a_examiner', True), ('statut', 'En file')), fields=['date_creation'], name='attente_a_examiner_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('statut', 'En file')), fields=('utilisateur', 'salle', 'date', 'heure_debut', 'heure_fin'), name='attente_unique_en_file')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 6.0.2 on 2026-10-18 10:51
+
+from django.db import migrations, models
+
+
+def renommer_doublons(apps, schema_editor):
+    # 🏷️ Les homonymes existants gardent leur nom suivi de leur pk : « Salle A (12) »
+    Salle = apps.get_model('reservation', 'Salle')
+    vus = set()
+    renommees = []
+    for salle in Salle.objects.order_by('pk').only('pk', 'nom'):
+        if salle.nom in vus:
+            salle.nom = f"{salle.nom[:90]} ({salle.pk})"
+            renommees.append(salle)
+        vus.add(salle.nom)
+    Salle.objects.bulk_update(renommees, ['nom'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation', '0012_demandeattente'),
+    ]
+
+    operations = [
+        migrations.RunPython(renommer_doublons, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='salle',
+            name='nom',
+            field=models.CharField(max_length=100, unique=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-18 11:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation', '0013_salle_nom_unique'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='emailsortant',
+            name='statut',
+            field=models.CharField(choices=[('En attente', 'En attente'), ('En cours', 'En cours'), ('Envoyé', 'Envoyé'), ('Abandonné', 'Abandonné')], default='En attente', max_length=20),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-18 11:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation', '0014_emailsortant_en_cours'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='utilisateur',
+            name='version_calendrier',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -2,6 +2,9 @@ from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import EmailValidator
 from django.utils import timezone
+from datetime import timedelta
+import re
+import unicodedata
 
 # 👑 MODÈLE UTILISATEUR PERSONNALISÉ
 class Utilisateur(AbstractUser):
@@ -15,13 +18,27 @@ class Utilisateur(AbstractUser):
     email = models.EmailField(unique=True, validators=[EmailValidator()])
     telephone = models.CharField(max_length=15, blank=True)
     est_approuve = models.BooleanField(default=False)  # 🔐 Compte en attente
+    version_calendrier = models.PositiveIntegerField(default=0)  # 🔗 +1 révoque l'URL d'abonnement
     date_inscription = models.DateTimeField(auto_now_add=True)
     
     def __str__(self):
         return f"{self.username} ({self.get_statut_display()}) - {'✅ Approuvé' if self.est_approuve else '⏳ En attente'}"
 
+# 🔧 ÉQUIPEMENTS : « Projecteur, Vidéo conférence » ou « Projecteur Wifi » (séparés par des espaces)
+def decouper_equipements(texte):
+    """🔧 Libellés d'équipements d'un texte libre"""
+    separateur = r'[,;\n]+' if re.search(r'[,;\n]', texte or '') else r'\s+'
+    return [libelle.strip() for libelle in re.split(separateur, texte or '') if libelle.strip()]
+
+
+def normaliser_equipement(libelle):
+    """🔧 Jeton comparable : minuscules, sans accents, tirets (« Vidéo conférence » → video-conference)"""
+    sans_accents = unicodedata.normalize('NFKD', libelle).encode('ascii', 'ignore').decode()
+    return re.sub(r'[^a-z0-9]+', '-', sans_accents.lower()).strip('-')
+
+
 class Salle(models.Model):
-    nom = models.CharField(max_length=100)
+    nom = models.CharField(max_length=100, unique=True)  # 🔑 Clé de l'import en masse (importer_salles)
     capacite = models.IntegerField()
     localisation = models.CharField(max_length=200)
     equipements = models.TextField()
@@ -30,6 +47,13 @@ class Salle(models.Model):
     def __str__(self):
         return self.nom
 
+    @property
+    def liste_equipements(self):
+        return decouper_equipements(self.equipements)
+
+    def jetons_equipements(self):
+        return {normaliser_equipement(libelle) for libelle in self.liste_equipements} - {''}
+
 class Reservation(models.Model):
     STATUT_CHOIX = [
         ('En attente', 'En attente'),
@@ -37,6 +61,9 @@ class Reservation(models.Model):
         ('Refusée', 'Refusée'),
         ('Terminée', 'Terminée'),  # ✅ Pour l'historique
     ]
+    STATUTS_ACTIFS = ('En attente', 'Validée')  # 🔒 Statuts qui occupent un créneau
+    HEURE_OUVERTURE = 8   # 🕗 Premier créneau d'une heure
+    HEURE_FERMETURE = 20  # 🕗 Fin du dernier créneau
 
     salle = models.ForeignKey(Salle, on_delete=models.CASCADE)
     utilisateur = models.ForeignKey(Utilisateur, on_delete=models.CASCADE)  # 🔥 Utilisateur personnalisé
@@ -50,6 +77,218 @@ class Reservation(models.Model):
     )
     date_creation = models.DateTimeField(auto_now_add=True)
     date_traitement = models.DateTimeField(null=True, blank=True)
+    recurrence = models.ForeignKey(
+        'Recurrence', on_delete=models.SET_NULL, null=True, blank=True, related_name='reservations'
+    )  # 🔁 Série dont la réservation est issue
+
+    class Meta:
+        indexes = [
+            # ⚡ Détection des conflits : salle + date + statut
+            models.Index(fields=['salle', 'date', 'statut'], name='resa_salle_date_statut_idx'),
+            # 📄 Pagination par clé de mes_reservations
+            models.Index(fields=['utilisateur', '-date', '-heure_debut', '-id'], name='resa_utilisateur_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.salle.nom} - {self.date} ({self.statut})"
+
+
+# 🗄️ RÉSERVATION ARCHIVÉE (passée et close, sortie de la table Reservation)
+class ReservationArchivee(models.Model):
+    id = models.BigIntegerField(primary_key=True)  # 🔑 Même identifiant que dans Reservation
+    salle = models.ForeignKey(Salle, on_delete=models.CASCADE, related_name='+')
+    utilisateur = models.ForeignKey(Utilisateur, on_delete=models.CASCADE, related_name='+')
+    date = models.DateField()
+    heure_debut = models.TimeField()
+    heure_fin = models.TimeField()
+    statut = models.CharField(max_length=20, choices=Reservation.STATUT_CHOIX)
+    date_creation = models.DateTimeField()
+    date_traitement = models.DateTimeField(null=True, blank=True)
+    recurrence = models.ForeignKey(
+        'Recurrence', on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    date_archivage = models.DateTimeField(auto_now_add=True)
+
+    STATUTS_ARCHIVABLES = ('Refusée', 'Terminée')
+
+    class Meta:
+        verbose_name = 'réservation archivée'
+        verbose_name_plural = 'réservations archivées'
+        indexes = [
+            # 📄 Même ordre que resa_utilisateur_date_idx pour l'historique fusionné
+            models.Index(fields=['utilisateur', '-date', '-heure_debut', '-id'], name='archive_utilisateur_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.salle.nom} - {self.date} ({self.statut}, archivée)"
+
+
+# 🔁 RÉSERVATION RÉCURRENTE (ex. « tous les mardis 10h-12h du semestre »)
+class Recurrence(models.Model):
+    INTERVALLE_CHOIX = [
+        (1, 'Chaque semaine'),
+        (2, 'Une semaine sur deux'),
+    ]
+
+    salle = models.ForeignKey(Salle, on_delete=models.CASCADE)
+    utilisateur = models.ForeignKey(Utilisateur, on_delete=models.CASCADE)
+    date_debut = models.DateField()  # 📅 Première occurrence, fixe le jour de la semaine
+    date_fin = models.DateField()
+    heure_debut = models.TimeField()
+    heure_fin = models.TimeField()
+    intervalle_semaines = models.PositiveSmallIntegerField(choices=INTERVALLE_CHOIX, default=1)
+    exceptions = models.JSONField(default=list, blank=True)  # 🚫 Dates ISO sans occurrence
+    date_creation = models.DateTimeField(auto_now_add=True)
+
+    def occurrences(self):
+        """📅 Dates de la série, exceptions retirées"""
+        exclues = set(self.exceptions)
+        pas = timedelta(weeks=self.intervalle_semaines)
+        dates = []
+        jour = self.date_debut
+        while jour <= self.date_fin:
+            if jour.isoformat() not in exclues:
+                dates.append(jour)
+            jour += pas
+        return dates
+
+    def __str__(self):
+        return f"{self.salle.nom} - {self.get_intervalle_semaines_display()} du {self.date_debut} au {self.date_fin}"
+
+# ⏳ LISTE D'ATTENTE (créneau occupé : promue en réservation dès qu'il se libère)
+class DemandeAttente(models.Model):
+    STATUT_CHOIX = [
+        ('En file', 'En file'),
+        ('Promue', 'Promue'),      # ✅ Réservation créée (en attente de validation)
+        ('Expirée', 'Expirée'),    # ⌛ Date passée sans place libérée
+        ('Annulée', 'Annulée'),
+    ]
+
+    salle = models.ForeignKey(Salle, on_delete=models.CASCADE)
+    utilisateur = models.ForeignKey(Utilisateur, on_delete=models.CASCADE)
+    date = models.DateField()
+    heure_debut = models.TimeField()
+    heure_fin = models.TimeField()
+    statut = models.CharField(max_length=20, choices=STATUT_CHOIX, default='En file')
+    a_examiner = models.BooleanField(default=True)  # 🔔 Créneau libéré depuis le dernier passage
+    reservation = models.ForeignKey(
+        Reservation, on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    date_creation = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "demande en liste d'attente"
+        verbose_name_plural = "demandes en liste d'attente"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['utilisateur', 'salle', 'date', 'heure_debut', 'heure_fin'],
+                condition=models.Q(statut='En file'),
+                name='attente_unique_en_file',
+            ),
+        ]
+        indexes = [
+            # ⚡ Créneau libéré : demandes de la même salle et du même jour, dans l'ordre d'arrivée
+            models.Index(fields=['salle', 'date', 'statut', 'date_creation'], name='attente_salle_date_idx'),
+            # 🔔 Demandes à examiner par le prochain passage
+            models.Index(fields=['date_creation'], condition=models.Q(a_examiner=True, statut='En file'),
+                         name='attente_a_examiner_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.salle.nom} - {self.date} {self.heure_debut}-{self.heure_fin} ({self.statut})"
+
+
+# 📡 JOURNAL DES CHANGEMENTS DE RÉSERVATIONS (alimente le flux SSE du dashboard)
+class EvenementReservation(models.Model):
+    TYPE_CHOIX = [
+        ('creation', 'Création'),
+        ('statut', 'Changement de statut'),
+        ('suppression', 'Suppression'),
+    ]
+
+    # 🔑 id auto-incrémenté = identifiant SSE (Last-Event-ID) ; pas de clé étrangère :
+    # l'événement survit à l'archivage ou à la suppression de la réservation
+    reservation_id = models.BigIntegerField()
+    type = models.CharField(max_length=20, choices=TYPE_CHOIX)
+    statut = models.CharField(max_length=20, blank=True)
+    ancien_statut = models.CharField(max_length=20, blank=True)
+    date_creation = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'événement de réservation'
+        verbose_name_plural = 'événements de réservations'
+
+    def __str__(self):
+        return f"#{self.pk} {self.get_type_display()} de la réservation {self.reservation_id} ({self.statut})"
+
+# 📧 FILE D'ATTENTE DES EMAILS SORTANTS
+class EmailSortant(models.Model):
+    STATUT_CHOIX = [
+        ('En attente', 'En attente'),
+        ('En cours', 'En cours'),  # 📤 Lot réservé par un worker (prochain_essai = fin du bail)
+        ('Envoyé', 'Envoyé'),
+        ('Abandonné', 'Abandonné'),  # ☠️ Trop d'échecs, à traiter à la main
+    ]
+
+    sujet = models.CharField(max_length=255)
+    message = models.TextField()
+    expediteur = models.CharField(max_length=254, blank=True)
+    destinataires = models.JSONField(default=list)
+    statut = models.CharField(max_length=20, choices=STATUT_CHOIX, default='En attente')
+    tentatives = models.PositiveIntegerField(default=0)
+    prochain_essai = models.DateTimeField(default=timezone.now)
+    derniere_erreur = models.TextField(blank=True)
+    date_creation = models.DateTimeField(auto_now_add=True)
+    date_envoi = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # ⚡ Sélection du prochain lot à envoyer
+            models.Index(fields=['statut', 'prochain_essai'], name='email_statut_essai_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.sujet} → {', '.join(self.destinataires)} ({self.statut})"
+
+# 📊 COMPTEURS DU DASHBOARD (tenus à jour par reservation.statistiques)
+class Compteur(models.Model):
+    nom = models.CharField(max_length=50, unique=True)
+    valeur = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.nom} = {self.valeur}"
+
+# 🟩 OCCUPATION D'UNE SALLE SUR UNE JOURNÉE (un bit par créneau d'une heure)
+class OccupationJour(models.Model):
+    salle = models.ForeignKey(Salle, on_delete=models.CASCADE)
+    date = models.DateField()
+    masque = models.IntegerField(default=0)  # bit i = créneau HEURE_OUVERTURE + i
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['salle', 'date'], name='occupation_salle_date_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['date', 'salle'], name='occupation_date_salle_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.salle_id} - {self.date} : {self.masque:012b}"
+
+
+# 🔧 ÉQUIPEMENT D'UNE SALLE (jeton indexé, tenu à jour depuis Salle.equipements)
+class EquipementSalle(models.Model):
+    salle = models.ForeignKey(Salle, on_delete=models.CASCADE, related_name='jetons')
+    jeton = models.CharField(max_length=100)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['salle', 'jeton'], name='equipement_salle_jeton_unique'),
+        ]
+        indexes = [
+            # 🔎 Recherche « salles ayant tel équipement »
+            models.Index(fields=['jeton', 'salle'], name='equipement_jeton_salle_idx'),
+        ]
 
     def __str__(self):
-        return f"{self.salle.nom} - {self.date} ({self.statut})"
\ No newline at end of file
+        return f"{self.salle_id} - {self.jeton}"
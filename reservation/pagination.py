@@ -0,0 +1,91 @@
+import base64
+import heapq
+import json
+from operator import attrgetter
+
+from django.db.models import Q
+
+TAILLE_PAGE = 50
+
+
+class CurseurInvalide(ValueError):
+    """❌ Curseur de pagination illisible ou falsifié"""
+
+
+# 🔖 CURSEURS
+def encoder_curseur(objet, champs):
+    valeurs = [str(getattr(objet, champ)) for champ in champs]
+    return base64.urlsafe_b64encode(json.dumps(valeurs).encode()).decode().rstrip('=')
+
+
+def decoder_curseur(curseur, modele, champs):
+    try:
+        brut = base64.urlsafe_b64decode(curseur + '=' * (-len(curseur) % 4))
+        valeurs = json.loads(brut)
+        if len(valeurs) != len(champs):
+            raise CurseurInvalide(curseur)
+        return [
+            modele._meta.get_field(champ).to_python(valeur)
+            for champ, valeur in zip(champs, valeurs)
+        ]
+    except (ValueError, TypeError) as exc:
+        raise CurseurInvalide(curseur) from exc
+
+
+# 📄 PAGINATION PAR CLÉ (KEYSET)
+def apres(champs, valeurs):
+    """🔖 Q des lignes strictement après `valeurs` dans l'ordre décroissant de `champs`"""
+    condition = Q()
+    egalites = {}
+    for champ, valeur in zip(champs, valeurs):
+        condition |= Q(**egalites, **{f"{champ}__lt": valeur})
+        egalites[champ] = valeur
+    return condition
+
+
+def paginer(queryset, champs, curseur=None, taille=TAILLE_PAGE):
+    """📄 Une page triée par `champs` décroissants et le curseur de la suivante.
+
+    Chaque page coûte une requête indexée, quelle que soit sa profondeur :
+    pas d'OFFSET qui relit les lignes déjà affichées.
+    """
+    queryset = queryset.order_by(*[f"-{champ}" for champ in champs])
+    if curseur:
+        queryset = queryset.filter(apres(champs, decoder_curseur(curseur, queryset.model, champs)))
+
+    lignes = list(queryset[:taille + 1])
+    suivant = encoder_curseur(lignes[taille - 1], champs) if len(lignes) > taille else None
+    return lignes[:taille], suivant
+
+
+def _requetes_fusion(querysets, champs, curseur, taille):
+    valeurs = decoder_curseur(curseur, querysets[0].model, champs) if curseur else None
+    for queryset in querysets:
+        queryset = queryset.order_by(*[f"-{champ}" for champ in champs])
+        if valeurs:
+            queryset = queryset.filter(apres(champs, valeurs))
+        yield queryset[:taille + 1]
+
+
+def _fusionner(morceaux, champs, taille):
+    lignes = list(heapq.merge(*morceaux, key=attrgetter(*champs), reverse=True))[:taille + 1]
+    suivant = encoder_curseur(lignes[taille - 1], champs) if len(lignes) > taille else None
+    return lignes[:taille], suivant
+
+
+def paginer_fusion(querysets, champs, curseur=None, taille=TAILLE_PAGE):
+    """📚 paginer() sur plusieurs tables aux clés disjointes, fusionnées dans le même ordre.
+
+    Une requête indexée par table et par page : chacune fournit au plus
+    taille + 1 lignes, la fusion garde les `taille` premières.
+    """
+    morceaux = [list(requete) for requete in _requetes_fusion(querysets, champs, curseur, taille)]
+    return _fusionner(morceaux, champs, taille)
+
+
+async def apaginer_fusion(querysets, champs, curseur=None, taille=TAILLE_PAGE):
+    """📚 paginer_fusion() pour les vues asynchrones"""
+    morceaux = []
+    for requete in _requetes_fusion(querysets, champs, curseur, taille):
+        morceaux.append([ligne async for ligne in requete])
+    return _fusionner(morceaux, champs, taille)
@@ -0,0 +1,58 @@
+from functools import reduce
+from operator import or_
+
+from django.db.models import Count, Exists, F, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Salle, Reservation, EquipementSalle, normaliser_equipement
+
+
+# 🔧 JETONS D'ÉQUIPEMENTS
+def synchroniser_equipements(salles):
+    """🔧 Aligne les jetons indexés sur le texte libre Salle.equipements"""
+    attendus = {(salle.pk, jeton) for salle in salles for jeton in salle.jetons_equipements()}
+    existants = set(
+        EquipementSalle.objects.filter(salle__in=[salle.pk for salle in salles]).values_list('salle_id', 'jeton')
+    )
+    obsoletes = existants - attendus
+    if obsoletes:
+        EquipementSalle.objects.filter(
+            reduce(or_, [Q(salle_id=salle_id, jeton=jeton) for salle_id, jeton in obsoletes])
+        ).delete()
+    EquipementSalle.objects.bulk_create(
+        [EquipementSalle(salle_id=salle_id, jeton=jeton) for salle_id, jeton in attendus - existants],
+        ignore_conflicts=True,
+    )
+
+
+# 🔎 RECHERCHE DE SALLES LIBRES
+def rechercher_salles(date, heure_debut, heure_fin, capacite=1, equipements=()):
+    """🔎 Salles libres sur le créneau, la mieux adaptée d'abord, en une requête.
+
+    Une salle convient si elle a au moins `capacite` places et tous les
+    `equipements` demandés. Le créneau est libre si aucune réservation active
+    ne le chevauche (NOT EXISTS, servi par resa_salle_date_statut_idx).
+    Classement : le moins de places perdues, puis le moins d'équipements
+    superflus, puis le nom.
+    """
+    requis = sorted({normaliser_equipement(libelle) for libelle in equipements} - {''})
+
+    occupee = Reservation.objects.filter(
+        salle=OuterRef('pk'),
+        date=date,
+        statut__in=Reservation.STATUTS_ACTIFS,
+        heure_debut__lt=heure_fin,
+        heure_fin__gt=heure_debut,
+    )
+    nb_jetons = (
+        EquipementSalle.objects.filter(salle=OuterRef('pk'))
+        .order_by().values('salle').annotate(nombre=Count('pk')).values('nombre')
+    )
+    salles = Salle.objects.filter(est_disponible=True, capacite__gte=capacite).filter(~Exists(occupee))
+    for jeton in requis:
+        salles = salles.filter(Exists(EquipementSalle.objects.filter(salle=OuterRef('pk'), jeton=jeton)))
+
+    return salles.annotate(
+        places_perdues=F('capacite') - capacite,
+        equipements_superflus=Coalesce(Subquery(nb_jetons, output_field=IntegerField()), 0) - len(requis),
+    ).order_by('places_perdues', 'equipements_superflus', 'nom', 'pk')
@@ -0,0 +1,120 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+
+COOKIE_EPINGLE = 'primaire'
+METHODES_LECTURE = ('GET', 'HEAD')
+
+_etat_courant = ContextVar('etat_routage', default=None)
+
+
+class EtatRoutage:
+    """🧭 Ce que la requête HTTP en cours autorise pour la réplique"""
+
+    def __init__(self, epingle=False):
+        self.epingle = epingle  # Écriture récente : tout reste sur la base principale
+        self.lecture_seule = False  # Vue marquée @lecture_replique, en GET/HEAD
+        self.ecriture = False  # Une écriture est partie pendant la requête
+
+
+@contextmanager
+def routage(etat):
+    jeton = _etat_courant.set(etat)
+    try:
+        yield etat
+    finally:
+        _etat_courant.reset(jeton)
+
+
+# 🪞 ROUTEUR
+class RouteurReplique:
+    """🪞 Envoie les lectures des vues en lecture seule vers la réplique (settings.REPLIQUE_ALIAS).
+
+    Tout le reste va à la base principale : écritures, lectures hors de ces vues,
+    lectures dans une transaction (réservation sous verrou) et lectures d'un
+    utilisateur qui vient d'écrire (cookie posé pour REPLIQUE_EPINGLE secondes).
+    Sans réplique configurée, RepliqueMiddleware est retiré et rien ne change.
+    """
+
+    def db_for_read(self, model, **hints):
+        etat = _etat_courant.get()
+        if etat is None or not etat.lecture_seule or etat.epingle:
+            return None
+        if model._meta.app_label != 'reservation':
+            return None  # Sessions, cache en base… jamais en retard
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return settings.REPLIQUE_ALIAS
+
+    def db_for_write(self, model, **hints):
+        etat = _etat_courant.get()
+        if etat is not None and model._meta.app_label == 'reservation':
+            etat.ecriture = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        bases = {DEFAULT_DB_ALIAS, settings.REPLIQUE_ALIAS}
+        if obj1._state.db in bases and obj2._state.db in bases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == settings.REPLIQUE_ALIAS:
+            return False  # Remplie par la réplication, pas par migrate
+        return None
+
+
+# 📖 VUES EN LECTURE SEULE
+@contextmanager
+def _lecture(request):
+    etat = _etat_courant.get()
+    if etat is None or request.method not in METHODES_LECTURE:
+        yield
+        return
+    etat.lecture_seule = True
+    try:
+        yield
+    finally:
+        etat.lecture_seule = False
+
+
+def lecture_replique(vue):
+    """📖 Décorateur : les GET de cette vue lisent sur la réplique"""
+    if iscoroutinefunction(vue):
+        @wraps(vue)
+        async def enveloppe(request, *args, **kwargs):
+            with _lecture(request):
+                return await vue(request, *args, **kwargs)
+    else:
+        @wraps(vue)
+        def enveloppe(request, *args, **kwargs):
+            with _lecture(request):
+                return vue(request, *args, **kwargs)
+    return enveloppe
+
+
+# 📌 LIRE SES PROPRES ÉCRITURES
+class RepliqueMiddleware:
+    """📌 Épingle sur la base principale, quelques secondes, qui vient d'écrire.
+
+    Un cookie plutôt que la session : rien à écrire en base, et chaque worker
+    le voit. Retiré (MiddlewareNotUsed) sans réplique configurée.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REPLIQUE_ALIAS', None):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with routage(EtatRoutage(epingle=COOKIE_EPINGLE in request.COOKIES)) as etat:
+            response = self.get_response(request)
+        if etat.ecriture:
+            response.set_cookie(COOKIE_EPINGLE, '1', max_age=settings.REPLIQUE_EPINGLE,
+                                httponly=True, samesite='Lax')
+        return response
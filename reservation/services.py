@@ -0,0 +1,261 @@
+import threading
+from collections import defaultdict, namedtuple
+from contextlib import ExitStack
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import BooleanField, ExpressionWrapper, F, Q
+from django.utils import timezone
+
+from .models import Salle, Reservation
+from .conflits import IndexCreneaux, charger_index, charger_index_par_paire
+from .disponibilites import recalculer_masques
+from .cache import invalider_reservations
+from . import statistiques
+from . import flux
+
+# 🔒 Nom de la contrainte d'exclusion créée sur PostgreSQL (migration 0003)
+CONTRAINTE_CHEVAUCHEMENT = 'resa_sans_chevauchement'
+
+ResultatValidation = namedtuple('ResultatValidation', ['acceptees', 'rejetees'])
+ResultatSerie = namedtuple('ResultatSerie', ['creees', 'conflits'])
+
+TAILLE_LOT_TERMINAISON = 1000
+
+_verrous = {}
+_verrous_creation = threading.Lock()
+
+
+class ConflitReservation(ValidationError):
+    """❌ Le créneau demandé est déjà occupé"""
+
+    def __init__(self, reservation):
+        super().__init__(
+            f"❌ La salle {reservation.salle.nom} est déjà réservée sur ce créneau.",
+            code='conflit',
+        )
+        self.reservation = reservation
+
+
+def _verrou(alias, salle_id):
+    # SQLite n'accepte qu'un écrivain à la fois : un verrou par base suffit et
+    # évite les erreurs « database table is locked » entre threads.
+    cle = alias if connections[alias].vendor == 'sqlite' else (alias, salle_id)
+    with _verrous_creation:
+        return _verrous.setdefault(cle, threading.Lock())
+
+
+def _verrouiller_salle(alias, salle_id):
+    """🔒 Verrou de ligne sur la salle pendant la transaction en cours"""
+    salles = Salle.objects.using(alias).filter(pk=salle_id)
+    if connections[alias].features.has_select_for_update:
+        list(salles.select_for_update().values_list('pk', flat=True))
+    else:
+        # Une écriture factice prend le verrou d'écriture SQLite dès maintenant,
+        # ce qui sérialise aussi les autres processus (gunicorn).
+        salles.update(est_disponible=F('est_disponible'))
+
+
+def _sauvegarder_postgresql(reservation, alias):
+    try:
+        with transaction.atomic(using=alias):
+            reservation.save(using=alias)
+    except IntegrityError as exc:
+        if CONTRAINTE_CHEVAUCHEMENT not in str(exc):
+            raise
+        raise ConflitReservation(reservation) from exc
+
+
+def _sauvegarder_avec_verrou(reservation, alias):
+    with _verrou(alias, reservation.salle_id):
+        with transaction.atomic(using=alias):
+            _verrouiller_salle(alias, reservation.salle_id)
+            index = charger_index(reservation.salle_id, reservation.date, using=alias)
+            if not index.est_libre(reservation.heure_debut, reservation.heure_fin, exclure=reservation.pk):
+                raise ConflitReservation(reservation)
+            reservation.save(using=alias)
+
+
+# 📅 POINT D'ENTRÉE UNIQUE DES RÉSERVATIONS
+def reserver(reservation, statut=None):
+    """📅 Enregistre la réservation, ou lève ConflitReservation si le créneau est pris.
+
+    Sur PostgreSQL la contrainte d'exclusion rejette les chevauchements ; ailleurs
+    la vérification et l'écriture se font sous verrou dans une même transaction.
+    """
+    if statut is not None:
+        reservation.statut = statut
+
+    alias = router.db_for_write(Reservation, instance=reservation)
+    if reservation.statut not in Reservation.STATUTS_ACTIFS:
+        reservation.save(using=alias)
+    elif connections[alias].vendor == 'postgresql':
+        _sauvegarder_postgresql(reservation, alias)
+    else:
+        _sauvegarder_avec_verrou(reservation, alias)
+    return reservation
+
+
+
+# ✅ VALIDATION EN LOT
+def valider_en_lot(queryset):
+    """✅ Valide un lot de réservations, la plus ancienne demande d'abord.
+
+    Seules les réservations « En attente » du lot sont candidates : une
+    réservation refusée ou terminée n'est pas réactivée, et compteurs comme
+    journal du flux partent bien de « En attente ». Comme reserver_serie, la
+    validation verrouille d'abord chaque salle concernée, puis charge en une
+    requête les candidates et les réservations déjà validées des mêmes
+    (salle, date) ; les conflits sont résolus en mémoire et les acceptées
+    écrites avec un seul bulk_update, avant de relâcher les verrous.
+    """
+    alias = router.db_for_write(Reservation)
+    candidates = queryset.filter(statut='En attente').values('pk')
+    salle_ids = sorted(set(candidates.values_list('salle_id', flat=True)))
+    if not salle_ids:
+        return ResultatValidation([], [])
+
+    with ExitStack() as verrous:
+        # Salles dans l'ordre des pk ; sous SQLite, un seul verrou pour toute la base
+        for verrou in dict.fromkeys(_verrou(alias, salle_id) for salle_id in salle_ids):
+            verrous.enter_context(verrou)
+        with transaction.atomic(using=alias):
+            for salle_id in salle_ids:
+                _verrouiller_salle(alias, salle_id)
+            lignes = (
+                Reservation.objects.using(alias)
+                .filter(
+                    salle_id__in=queryset.values('salle_id'),
+                    date__in=queryset.values('date'),
+                )
+                .filter(Q(pk__in=candidates) | Q(statut='Validée'))
+                .annotate(est_candidate=ExpressionWrapper(Q(pk__in=candidates), output_field=BooleanField()))
+                .select_related('salle')
+                .order_by('date_creation', 'pk')
+            )
+
+            validees = defaultdict(list)
+            a_traiter = []
+            for resa in lignes:
+                if resa.statut == 'Validée':
+                    validees[(resa.salle_id, resa.date)].append((resa.heure_debut, resa.heure_fin, resa.pk))
+                elif resa.est_candidate:
+                    a_traiter.append(resa)
+
+            index = {}
+            acceptees, rejetees = [], []
+            maintenant = timezone.now()
+            for resa in a_traiter:
+                paire = (resa.salle_id, resa.date)
+                if paire not in index:
+                    index[paire] = IndexCreneaux(validees.get(paire, ()))
+                if index[paire].est_libre(resa.heure_debut, resa.heure_fin):
+                    index[paire].ajouter(resa.heure_debut, resa.heure_fin, resa.pk)
+                    resa.statut = 'Validée'
+                    resa.date_traitement = maintenant
+                    acceptees.append(resa)
+                else:
+                    rejetees.append(resa)
+
+            if acceptees:
+                Reservation.objects.using(alias).bulk_update(acceptees, ['statut', 'date_traitement'])
+                statistiques.ajuster_statuts({'En attente': len(acceptees)}, 'Validée')
+                flux.publier_statuts([(resa.pk, 'En attente') for resa in acceptees], 'Validée')
+                invalider_reservations(resa.utilisateur_id for resa in acceptees)
+                recalculer_masques({(resa.salle_id, resa.date) for resa in acceptees})
+    return ResultatValidation(acceptees, rejetees)
+
+
+
+# 🔁 SÉRIES RÉCURRENTES
+def reserver_serie(recurrence):
+    """🔁 Crée les occurrences libres d'une série, en une transaction.
+
+    Toutes les occurrences sont vérifiées avec une seule requête et les libres
+    créées par un seul bulk_create. Retourne les réservations créées et, pour
+    chaque occurrence refusée, les pk des réservations en conflit.
+    """
+    alias = router.db_for_write(Reservation)
+    dates = recurrence.occurrences()
+    with _verrou(alias, recurrence.salle_id):
+        with transaction.atomic(using=alias):
+            if recurrence.pk is None:
+                recurrence.save(using=alias)
+            _verrouiller_salle(alias, recurrence.salle_id)
+            index = charger_index_par_paire(
+                [(recurrence.salle_id, date) for date in dates], using=alias
+            )
+
+            nouvelles, conflits = [], {}
+            for date in dates:
+                en_conflit = index[(recurrence.salle_id, date)].conflits(
+                    recurrence.heure_debut, recurrence.heure_fin
+                )
+                if en_conflit:
+                    conflits[date] = en_conflit
+                else:
+                    nouvelles.append(Reservation(
+                        salle_id=recurrence.salle_id,
+                        utilisateur_id=recurrence.utilisateur_id,
+                        date=date,
+                        heure_debut=recurrence.heure_debut,
+                        heure_fin=recurrence.heure_fin,
+                        statut='En attente',
+                        recurrence=recurrence,
+                    ))
+
+            # bulk_create n'envoie pas de signaux : compteurs, masques et journal à la main
+            creees = Reservation.objects.using(alias).bulk_create(nouvelles)
+            statistiques.ajuster({statistiques.compteur_reservations('En attente'): len(creees)})
+            flux.publier([(resa.pk, 'creation', resa.statut, None) for resa in creees])
+            invalider_reservations([recurrence.utilisateur_id] if creees else [])
+            recalculer_masques({(recurrence.salle_id, resa.date) for resa in creees})
+    return ResultatSerie(creees, conflits)
+
+
+
+# 🏁 TERMINAISON DES RÉSERVATIONS PASSÉES
+def reservations_expirees(maintenant=None):
+    """🏁 Réservations validées dont le créneau est terminé (heure locale)"""
+    maintenant = timezone.localtime(maintenant)
+    return Reservation.objects.filter(
+        Q(date__lt=maintenant.date()) | Q(date=maintenant.date(), heure_fin__lte=maintenant.time()),
+        statut='Validée',
+    )
+
+
+def terminer_expirees(taille_lot=TAILLE_LOT_TERMINAISON, maintenant=None):
+    """🏁 Passe les réservations expirées en « Terminée », un UPDATE par lot.
+
+    Les lots sont parcourus par clé primaire croissante. Le filtre sur
+    « Validée » est répété dans l'UPDATE : relancer la commande, ou la faire
+    tourner pendant qu'un administrateur modifie une ligne, ne touche jamais
+    deux fois la même réservation. Génère le nombre de lignes passées par lot.
+    """
+    maintenant = maintenant or timezone.now()
+    dernier = 0
+    while True:
+        lot = list(
+            reservations_expirees(maintenant).filter(pk__gt=dernier)
+            .order_by('pk').values_list('pk', 'salle_id', 'date', 'utilisateur_id')[:taille_lot]
+        )
+        if not lot:
+            return
+        dernier = lot[-1][0]
+        with transaction.atomic(savepoint=False):
+            terminees = Reservation.objects.filter(
+                pk__in=[pk for pk, _, _, _ in lot], statut='Validée',
+            ).update(statut='Terminée', date_traitement=maintenant)
+            # update() n'envoie pas de signaux : compteurs, masques et journal à la main
+            statistiques.ajuster_statuts({'Validée': terminees}, 'Terminée')
+            recalculer_masques({(salle_id, date) for _, salle_id, date, _ in lot})
+            invalider_reservations(utilisateur_id for _, _, _, utilisateur_id in lot)
+            if terminees == len(lot):
+                flux.publier_statuts([(pk, 'Validée') for pk, _, _, _ in lot], 'Terminée')
+            else:
+                # Lignes modifiées entre la lecture et l'UPDATE : ne journaliser que les nôtres
+                nos_lignes = Reservation.objects.filter(
+                    pk__in=[pk for pk, _, _, _ in lot], statut='Terminée', date_traitement=maintenant,
+                ).values_list('pk', flat=True)
+                flux.publier_statuts([(pk, 'Validée') for pk in nos_lignes], 'Terminée')
+        yield terminees
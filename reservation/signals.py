@@ -0,0 +1,146 @@
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Utilisateur, Salle, Reservation
+from . import statistiques
+from .disponibilites import recalculer_masques
+from .cache import invalider_salles, invalider_reservations
+from .recherche import synchroniser_equipements
+from .backends import invalider_utilisateurs
+from . import flux
+from .attente import signaler_liberations
+
+
+# 📸 Valeurs chargées depuis la base, pour connaître l'ancien état au post_save.
+# On lit __dict__ pour ne jamais déclencher de requête sur un champ différé.
+@receiver(post_init, sender=Reservation)
+def memoriser_statut(sender, instance, **kwargs):
+    instance._statut_initial = instance.__dict__.get('statut')
+    instance._creneau_initial = _creneau(instance)
+
+
+def _creneau(reservation):
+    valeurs = reservation.__dict__
+    return (
+        valeurs.get('salle_id'), valeurs.get('date'),
+        valeurs.get('heure_debut'), valeurs.get('heure_fin'),
+        valeurs.get('statut') in Reservation.STATUTS_ACTIFS,
+    )
+
+
+@receiver(post_init, sender=Utilisateur)
+def memoriser_approbation(sender, instance, **kwargs):
+    instance._approuve_initial = instance.__dict__.get('est_approuve')
+
+
+# 📡 JOURNAL DU FLUX SSE (avant compter_reservation, qui remet _statut_initial à jour)
+@receiver(post_save, sender=Reservation)
+def journaliser_reservation(sender, instance, created, **kwargs):
+    if created:
+        flux.publier([(instance.pk, 'creation', instance.statut, None)])
+    elif instance._statut_initial not in (None, instance.statut):
+        flux.publier([(instance.pk, 'statut', instance.statut, instance._statut_initial)])
+
+
+@receiver(post_delete, sender=Reservation)
+def journaliser_suppression(sender, instance, **kwargs):
+    flux.publier([(instance.pk, 'suppression', None, instance.statut)])
+
+
+# 🧩 FRAGMENT « DERNIÈRES RÉSERVATIONS » DE L'ACCUEIL
+@receiver(post_save, sender=Reservation)
+@receiver(post_delete, sender=Reservation)
+def invalider_fragment_reservations(sender, instance, **kwargs):
+    invalider_reservations([instance.utilisateur_id])
+
+
+# 📊 COMPTEURS DU DASHBOARD
+@receiver(post_save, sender=Reservation)
+def compter_reservation(sender, instance, created, **kwargs):
+    if created:
+        statistiques.ajuster({statistiques.compteur_reservations(instance.statut): 1})
+    elif instance._statut_initial not in (None, instance.statut):
+        statistiques.ajuster({
+            statistiques.compteur_reservations(instance._statut_initial): -1,
+            statistiques.compteur_reservations(instance.statut): 1,
+        })
+    instance._statut_initial = instance.statut
+
+
+@receiver(post_delete, sender=Reservation)
+def decompter_reservation(sender, instance, **kwargs):
+    statistiques.ajuster({statistiques.compteur_reservations(instance.statut): -1})
+
+
+# 🟩 MASQUES D'OCCUPATION DE LA GRILLE DE DISPONIBILITÉ
+@receiver(post_save, sender=Reservation)
+def occuper_creneau(sender, instance, created, **kwargs):
+    avant, apres = instance._creneau_initial, _creneau(instance)
+    if created or avant != apres:
+        recalculer_masques({avant[:2], apres[:2]} - {(None, None)})
+    if not created and avant[4] and avant != apres:
+        signaler_liberations([avant[:2]])  # ⏳ Ancien créneau rendu à la liste d'attente
+    instance._creneau_initial = apres
+
+
+@receiver(post_delete, sender=Reservation)
+def liberer_creneau(sender, instance, origin=None, **kwargs):
+    # La suppression d'une salle emporte aussi ses masques : rien à recalculer
+    if isinstance(origin, Salle) or getattr(origin, 'model', None) is Salle:
+        return
+    recalculer_masques({(instance.salle_id, instance.date)})
+    if instance.statut in Reservation.STATUTS_ACTIFS:
+        signaler_liberations([(instance.salle_id, instance.date)])
+
+
+@receiver(post_save, sender=Utilisateur)
+def compter_utilisateur(sender, instance, created, **kwargs):
+    if created:
+        statistiques.ajuster({
+            statistiques.UTILISATEURS: 1,
+            statistiques.UTILISATEURS_EN_ATTENTE: 0 if instance.est_approuve else 1,
+        })
+    elif instance._approuve_initial not in (None, instance.est_approuve):
+        statistiques.ajuster({statistiques.UTILISATEURS_EN_ATTENTE: -1 if instance.est_approuve else 1})
+    instance._approuve_initial = instance.est_approuve
+
+
+@receiver(post_delete, sender=Utilisateur)
+def decompter_utilisateur(sender, instance, **kwargs):
+    statistiques.ajuster({
+        statistiques.UTILISATEURS: -1,
+        statistiques.UTILISATEURS_EN_ATTENTE: 0 if instance.est_approuve else -1,
+    })
+
+
+@receiver(post_save, sender=Salle)
+def compter_salle(sender, instance, created, **kwargs):
+    if created:
+        statistiques.ajuster({statistiques.SALLES: 1})
+
+
+@receiver(post_delete, sender=Salle)
+def decompter_salle(sender, instance, **kwargs):
+    statistiques.ajuster({statistiques.SALLES: -1})
+
+
+
+# 🧹 CACHE DES SALLES (y compris les bascules list_editable de SalleAdmin)
+@receiver(post_save, sender=Salle)
+@receiver(post_delete, sender=Salle)
+def invalider_cache_salles(sender, **kwargs):
+    invalider_salles()
+
+
+# 🔧 JETONS D'ÉQUIPEMENTS DE LA RECHERCHE DE SALLES
+@receiver(post_save, sender=Salle)
+def indexer_equipements(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or 'equipements' in update_fields:
+        synchroniser_equipements([instance])
+
+
+# 🔐 UTILISATEUR DE LA SESSION EN CACHE (ApprobationBackend)
+@receiver(post_save, sender=Utilisateur)
+@receiver(post_delete, sender=Utilisateur)
+def invalider_cache_utilisateur(sender, instance, **kwargs):
+    invalider_utilisateurs([instance.pk])
@@ -0,0 +1,119 @@
+from asgiref.sync import sync_to_async
+from django.db.models import Case, Count, F, Q, Value, When
+
+from .models import Utilisateur, Salle, Reservation, Compteur
+
+UTILISATEURS = 'utilisateurs'
+UTILISATEURS_EN_ATTENTE = 'utilisateurs_en_attente'
+SALLES = 'salles'
+
+
+def compteur_reservations(statut):
+    """🏷️ Nom du compteur des réservations d'un statut"""
+    return f"reservations:{statut}"
+
+
+NOMS = [UTILISATEURS, UTILISATEURS_EN_ATTENTE, SALLES] + [
+    compteur_reservations(statut) for statut, _ in Reservation.STATUT_CHOIX
+]
+
+
+# 🧮 CALCUL COMPLET
+def calculer():
+    """🧮 Valeurs exactes, une requête d'agrégat par table"""
+    utilisateurs = Utilisateur.objects.aggregate(
+        total=Count('pk'),
+        en_attente=Count('pk', filter=Q(est_approuve=False)),
+    )
+    statuts = [statut for statut, _ in Reservation.STATUT_CHOIX]
+    reservations = Reservation.objects.aggregate(**{
+        f"statut_{position}": Count('pk', filter=Q(statut=statut))
+        for position, statut in enumerate(statuts)
+    })
+    valeurs = {
+        UTILISATEURS: utilisateurs['total'],
+        UTILISATEURS_EN_ATTENTE: utilisateurs['en_attente'],
+        SALLES: Salle.objects.count(),
+    }
+    for position, statut in enumerate(statuts):
+        valeurs[compteur_reservations(statut)] = reservations[f"statut_{position}"]
+    return valeurs
+
+
+def recalculer():
+    """🔄 Reconstruit la table des compteurs à partir des données"""
+    valeurs = calculer()
+    Compteur.objects.bulk_create(
+        [Compteur(nom=nom, valeur=valeur) for nom, valeur in valeurs.items()],
+        update_conflicts=True,
+        unique_fields=['nom'],
+        update_fields=['valeur'],
+    )
+    return valeurs
+
+
+def verifier():
+    """🔍 Écarts entre les compteurs stockés et les valeurs exactes : {nom: (stocké, exact)}"""
+    stockees = dict(Compteur.objects.values_list('nom', 'valeur'))
+    return {
+        nom: (stockees.get(nom), exacte)
+        for nom, exacte in calculer().items()
+        if stockees.get(nom) != exacte
+    }
+
+
+# ➕ MISE À JOUR INCRÉMENTALE
+def ajuster(deltas):
+    """➕ Applique {nom: delta} en une seule requête UPDATE"""
+    deltas = {nom: delta for nom, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    Compteur.objects.filter(nom__in=deltas).update(
+        valeur=F('valeur') + Case(
+            *[When(nom=nom, then=Value(delta)) for nom, delta in deltas.items()],
+            default=Value(0),
+        )
+    )
+
+
+def ajuster_statuts(avant, apres):
+    """🔁 Ajuste les compteurs de réservations après un changement de statut en masse.
+
+    `avant` est un {statut: nombre} des lignes modifiées, toutes passées à `apres`.
+    """
+    deltas = {compteur_reservations(statut): -nombre for statut, nombre in avant.items()}
+    nom_apres = compteur_reservations(apres)
+    deltas[nom_apres] = deltas.get(nom_apres, 0) + sum(avant.values())
+    ajuster(deltas)
+
+
+def compter_par_statut(queryset):
+    """📋 {statut: nombre} pour un queryset de réservations"""
+    return dict(queryset.order_by().values_list('statut').annotate(nombre=Count('pk')))
+
+
+# 📊 LECTURE POUR LE DASHBOARD
+def _contexte_dashboard(valeurs):
+    return {
+        'total_utilisateurs': valeurs[UTILISATEURS],
+        'utilisateurs_en_attente': valeurs[UTILISATEURS_EN_ATTENTE],
+        'reservations_en_attente': valeurs[compteur_reservations('En attente')],
+        'reservations_validees': valeurs[compteur_reservations('Validée')],
+        'total_salles': valeurs[SALLES],
+    }
+
+
+def lire_statistiques():
+    """📊 Compteurs du dashboard en une requête (reconstruits s'il en manque)"""
+    valeurs = dict(Compteur.objects.values_list('nom', 'valeur'))
+    if any(nom not in valeurs for nom in NOMS):
+        valeurs = recalculer()
+    return _contexte_dashboard(valeurs)
+
+
+async def alire_statistiques():
+    """📊 lire_statistiques() pour les vues asynchrones"""
+    valeurs = {nom: valeur async for nom, valeur in Compteur.objects.values_list('nom', 'valeur')}
+    if any(nom not in valeurs for nom in NOMS):
+        valeurs = await sync_to_async(recalculer)()
+    return _contexte_dashboard(valeurs)
@@ -1,3 +1,1676 @@
-from django.test import TestCase
+import re
+import tempfile
+from io import StringIO
+from pathlib import Path
+import threading
+from time import monotonic
+from datetime import date, time, timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth import authenticate
+from django.contrib.messages import get_messages
+from django.contrib.sessions.models import Session
+from django.core import mail
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command, CommandError
+from django.db import connection
+from django.http import HttpResponse
+from django.test import TestCase, SimpleTestCase, TransactionTestCase, RequestFactory, override_settings
+from django.template.backends import django as backend_django
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .models import (
+    Utilisateur, Salle, Reservation, ReservationArchivee, EmailSortant, Compteur, OccupationJour, Recurrence,
+    EquipementSalle, EvenementReservation, DemandeAttente,
+)
+from .forms import ReservationForm
+from .conflits import IndexCreneaux, charger_index_par_paire
+from .services import reserver, reserver_serie, valider_en_lot, terminer_expirees, ConflitReservation
+from .utils import mettre_en_file, envoyer_file_emails
+from . import statistiques
+from .disponibilites import masque_creneau, creneaux_occupes, recalculer_masques, grille
+from .cache import salles_disponibles, choix_salles, cle_version_reservations
+from .pagination import paginer, paginer_fusion, CurseurInvalide
+from .budget_requetes import budget_requetes, BudgetDepasse
+from .backends import cle_utilisateur
+from . import benchmark
+from .instrumentation import Mesure, metriques, InstrumentationMiddleware, installer_chronometre, retirer_chronometre
+from .archives import archiver, historique
+from .recherche import rechercher_salles
+from .comptes import approuver, importer_utilisateurs, lire_csv
+from . import flux
+from .attente import signaler_liberations, promouvoir, expirer
+from .idempotence import une_seule_fois
+from .routage import RouteurReplique, RepliqueMiddleware, EtatRoutage, routage, lecture_replique
+from .inventaire import lire_json, importer_salles
+from .exports import jeton_calendrier
+from .analyses import calculer_occupation, occupation, HEURES
+
+
+def creer_utilisateur(username='etudiant', **kwargs):
+    kwargs.setdefault('email', f'{username}@campus.test')
+    kwargs.setdefault('est_approuve', True)
+    return Utilisateur.objects.create_user(username=username, password='motdepasse123', **kwargs)
+
+
+def creer_salle(nom='Salle A', **kwargs):
+    kwargs.setdefault('capacite', 30)
+    kwargs.setdefault('localisation', 'Bâtiment A')
+    kwargs.setdefault('equipements', 'Projecteur Wifi')
+    return Salle.objects.create(nom=nom, **kwargs)
+
+
+def demain():
+    return timezone.now().date() + timedelta(days=1)
+
+
+# 🗂️ INDEX DES CRÉNEAUX
+class IndexCreneauxTests(SimpleTestCase):
+    def setUp(self):
+        self.index = IndexCreneaux([
+            (time(8), time(10), 1),
+            (time(12), time(13), 2),
+            (time(9), time(18), 3),
+        ])
+
+    def test_conflits(self):
+        self.assertEqual(sorted(self.index.conflits(time(10), time(11))), [3])
+        self.assertEqual(sorted(self.index.conflits(time(8), time(20))), [1, 2, 3])
+        self.assertEqual(self.index.conflits(time(18), time(19)), [])
+
+    def test_bornes_exclusives(self):
+        self.assertTrue(self.index.est_libre(time(18), time(20)))
+        self.assertFalse(self.index.est_libre(time(17), time(18)))
+
+    def test_ajouter_retirer(self):
+        self.index.ajouter(time(18), time(19), 4)
+        self.assertFalse(self.index.est_libre(time(18), time(20)))
+        self.assertTrue(self.index.retirer(3))
+        self.assertTrue(self.index.est_libre(time(10), time(12)))
+        self.assertFalse(self.index.retirer(99))
+
+    def test_exclure(self):
+        self.assertFalse(self.index.est_libre(time(10), time(11)))
+        self.assertTrue(self.index.est_libre(time(10), time(11), exclure=3))
+
+
+class ChargementIndexTests(TestCase):
+    def test_une_requete_pour_plusieurs_paires(self):
+        utilisateur = creer_utilisateur()
+        salle_a, salle_b = creer_salle('A'), creer_salle('B')
+        jour = demain()
+        Reservation.objects.create(salle=salle_a, utilisateur=utilisateur, date=jour,
+                                   heure_debut=time(8), heure_fin=time(10))
+        Reservation.objects.create(salle=salle_b, utilisateur=utilisateur, date=jour,
+                                   heure_debut=time(8), heure_fin=time(10), statut='Refusée')
+
+        with self.assertNumQueries(1):
+            index = charger_index_par_paire([(salle_a.pk, jour), (salle_b.pk, jour)])
+        self.assertFalse(index[(salle_a.pk, jour)].est_libre(time(9), time(11)))
+        self.assertTrue(index[(salle_b.pk, jour)].est_libre(time(9), time(11)))
+
+
+# 📅 FORMULAIRE DE RÉSERVATION
+class ReservationFormTests(TestCase):
+    def setUp(self):
+        self.utilisateur = creer_utilisateur()
+        self.salle = creer_salle()
+        self.jour = demain()
+        Reservation.objects.create(salle=self.salle, utilisateur=self.utilisateur, date=self.jour,
+                                   heure_debut=time(10), heure_fin=time(12))
+
+    def formulaire(self, debut, fin):
+        return ReservationForm({
+            'salle': self.salle.pk,
+            'date': self.jour.isoformat(),
+            'heure_debut': debut,
+            'heure_fin': fin,
+        }, utilisateur=self.utilisateur)
+
+    def test_creneau_en_conflit(self):
+        form = self.formulaire('11:00', '13:00')
+        self.assertFalse(form.is_valid())
+        self.assertIn('déjà réservée', str(form.non_field_errors()))
+
+    def test_creneau_libre(self):
+        self.assertTrue(self.formulaire('12:00', '14:00').is_valid())
+
+
+# 👑 ADMINISTRATION
+class ValiderReservationsTests(TestCase):
+    def setUp(self):
+        self.admin = creer_utilisateur('admin', is_staff=True, is_superuser=True)
+        self.salle = creer_salle()
+        self.jour = demain()
+
+    def creer(self, debut, fin, **kwargs):
+        return Reservation.objects.create(salle=self.salle, utilisateur=self.admin, date=self.jour,
+                                          heure_debut=time(debut), heure_fin=time(fin), **kwargs)
+
+    def test_premier_arrive_premier_servi(self):
+        deja_validee = self.creer(8, 9, statut='Validée')
+        premiere = self.creer(9, 11)
+        seconde = self.creer(10, 12)
+        troisieme = self.creer(8, 10)
+        libre = self.creer(14, 15)
+
+        # Salles du lot, savepoint (2), verrou de la salle, lecture, bulk_update, compteurs,
+        # journal du flux, masques (2)
+        with self.assertNumQueries(10):
+            resultat = valider_en_lot(Reservation.objects.exclude(pk=deja_validee.pk))
+
+        self.assertEqual([r.pk for r in resultat.acceptees], [premiere.pk, libre.pk])
+        self.assertEqual([r.pk for r in resultat.rejetees], [seconde.pk, troisieme.pk])
+        premiere.refresh_from_db()
+        seconde.refresh_from_db()
+        self.assertEqual(premiere.statut, 'Validée')
+        self.assertIsNotNone(premiere.date_traitement)
+        self.assertEqual(seconde.statut, 'En attente')
+        self.assertIsNone(seconde.date_traitement)
+
+    def test_action_admin(self):
+        premiere = self.creer(8, 10)
+        seconde = self.creer(9, 11)
+
+        self.client.force_login(self.admin)
+        reponse = self.client.post('/admin/reservation/reservation/', {
+            'action': 'valider_reservations',
+            '_selected_action': [premiere.pk, seconde.pk],
+        })
+
+        statuts = sorted(Reservation.objects.values_list('statut', flat=True))
+        self.assertEqual(statuts, ['En attente', 'Validée'])
+        textes = [str(message) for message in get_messages(reponse.wsgi_request)]
+        self.assertIn('1 réservation(s) en conflit', textes[-1])
+
+    def test_seules_les_demandes_en_attente_sont_validees(self):
+        refusee = self.creer(8, 9, statut='Refusée')
+        terminee = self.creer(9, 10, statut='Terminée')
+        attente = self.creer(10, 11)
+        statistiques.recalculer()
+
+        resultat = valider_en_lot(Reservation.objects.all())
+        self.assertEqual([r.pk for r in resultat.acceptees], [attente.pk])
+        self.assertEqual(Reservation.objects.get(pk=refusee.pk).statut, 'Refusée')
+        self.assertEqual(Reservation.objects.get(pk=terminee.pk).statut, 'Terminée')
+        self.assertEqual(statistiques.verifier(), {})
+        self.assertEqual(EvenementReservation.objects.filter(type='statut').get().ancien_statut, 'En attente')
+        masque = OccupationJour.objects.get(salle=self.salle, date=self.jour).masque
+        self.assertEqual(masque, masque_creneau(time(10), time(11)))
+
+
+# 🔒 SERVICE DE RÉSERVATION
+class ReserverTests(TestCase):
+    def setUp(self):
+        self.utilisateur = creer_utilisateur()
+        self.salle = creer_salle()
+        self.jour = demain()
+
+    def nouvelle(self, debut, fin):
+        return Reservation(salle=self.salle, utilisateur=self.utilisateur, date=self.jour,
+                           heure_debut=time(debut), heure_fin=time(fin))
+
+    def test_refuse_un_chevauchement(self):
+        reserver(self.nouvelle(8, 10))
+        with self.assertRaises(ConflitReservation):
+            reserver(self.nouvelle(9, 11))
+        self.assertEqual(Reservation.objects.count(), 1)
+
+    def test_statut_inactif_sans_verification(self):
+        reserver(self.nouvelle(8, 10))
+        reserver(self.nouvelle(8, 10), statut='Refusée')
+        self.assertEqual(Reservation.objects.count(), 2)
+
+    def test_vue_accueil_affiche_le_conflit(self):
+        reserver(self.nouvelle(10, 12))
+        self.client.force_login(self.utilisateur)
+        reponse = self.client.post('/', {
+            'salle': self.salle.pk,
+            'date': self.jour.isoformat(),
+            'heure_debut': '11:00',
+            'heure_fin': '12:00',
+        })
+        self.assertContains(reponse, 'déjà réservée')
+        self.assertEqual(Reservation.objects.count(), 1)
+
+
+class ReserverConcurrenceTests(TransactionTestCase):
+    NB_THREADS = 16
+
+    def test_un_seul_gagnant_par_creneau(self):
+        utilisateur = creer_utilisateur()
+        salles = [creer_salle('A'), creer_salle('B')]
+        jour = demain()
+        depart = threading.Barrier(self.NB_THREADS)
+        resultats = []
+
+        def tenter(numero):
+            try:
+                depart.wait()
+                reserver(Reservation(salle=salles[numero % 2], utilisateur=utilisateur, date=jour,
+                                     heure_debut=time(8 + numero // 2 % 3), heure_fin=time(11)))
+                resultats.append('ok')
+            except ConflitReservation:
+                resultats.append('conflit')
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=tenter, args=(n,)) for n in range(self.NB_THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(resultats), self.NB_THREADS)
+        self.assertEqual(resultats.count('ok'), 2)
+        for salle in salles:
+            self.assertEqual(Reservation.objects.filter(salle=salle).count(), 1)
+
+    def test_validations_en_lot_concurrentes(self):
+        utilisateur = creer_utilisateur()
+        salle = creer_salle()
+        demandes = [
+            Reservation.objects.create(salle=salle, utilisateur=utilisateur, date=demain(),
+                                       heure_debut=time(9 + n % 2), heure_fin=time(11))
+            for n in range(self.NB_THREADS)
+        ]
+        depart = threading.Barrier(self.NB_THREADS)
+        acceptees, erreurs = [], []
+
+        def valider(demande):
+            try:
+                depart.wait()
+                acceptees.extend(valider_en_lot(Reservation.objects.filter(pk=demande.pk)).acceptees)
+            except Exception as exc:  # « database table is locked » sans verrou
+                erreurs.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=valider, args=(demande,)) for demande in demandes]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(erreurs, [])
+        self.assertEqual(len(acceptees), 1)
+        self.assertEqual(Reservation.objects.filter(statut='Validée').count(), 1)
+
+
+
+# 📧 FILE D'ATTENTE DES EMAILS
+class BackendEnPanne(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise ConnectionRefusedError("SMTP indisponible")
+
+
+class BackendTemoin(BaseEmailBackend):
+    # Note, à chaque envoi, la profondeur de transaction et les statuts en base
+    envois = []
+
+    def send_messages(self, email_messages):
+        BackendTemoin.envois.append((len(connection.atomic_blocks),
+                                     list(EmailSortant.objects.values_list('statut', flat=True))))
+        return len(email_messages)
+
+
+class EmailSortantTests(TestCase):
+    def test_inscription_met_en_file_sans_envoyer(self):
+        self.client.post('/inscription/', {
+            'username': 'nouveau',
+            'email': 'nouveau@campus.test',
+            'first_name': 'Nina',
+            'last_name': 'Durand',
+            'statut': 'delegue',
+            'password1': 'Tr3s-Solide-2026',
+            'password2': 'Tr3s-Solide-2026',
+        })
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(EmailSortant.objects.get().destinataires, ['nouveau@campus.test'])
+
+    def test_envoi_par_lot(self):
+        for numero in range(5):
+            mettre_en_file(f"Sujet {numero}", "Message", [f"u{numero}@campus.test"])
+
+        call_command('envoyer_emails', lot=2, stdout=StringIO())
+
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(EmailSortant.objects.filter(statut='Envoyé').count(), 5)
+
+    @override_settings(EMAIL_BACKEND='reservation.tests.BackendEnPanne')
+    def test_reessais_puis_abandon(self):
+        email = mettre_en_file("Sujet", "Message", ["u@campus.test"])
+
+        resultat = envoyer_file_emails(max_tentatives=2)
+        self.assertEqual(resultat['reportes'], 1)
+        email.refresh_from_db()
+        self.assertEqual(email.tentatives, 1)
+        self.assertGreater(email.prochain_essai, timezone.now())
+        self.assertIn('SMTP indisponible', email.derniere_erreur)
+
+        # Pas encore l'heure du prochain essai
+        self.assertEqual(sum(envoyer_file_emails(max_tentatives=2).values()), 0)
+
+        EmailSortant.objects.update(prochain_essai=timezone.now())
+        resultat = envoyer_file_emails(max_tentatives=2)
+        self.assertEqual(resultat['abandonnes'], 1)
+        email.refresh_from_db()
+        self.assertEqual(email.statut, 'Abandonné')
+
+    @override_settings(EMAIL_BACKEND='reservation.tests.BackendTemoin')
+    def test_envoi_hors_transaction(self):
+        for numero in range(2):
+            mettre_en_file(f"Sujet {numero}", "Message", [f"u{numero}@campus.test"])
+        BackendTemoin.envois = []
+        niveau = len(connection.atomic_blocks)  # Transactions du TestCase
+        self.assertEqual(envoyer_file_emails()['envoyes'], 2)
+        self.assertEqual(BackendTemoin.envois, [(niveau, ['En cours', 'En cours'])] * 2)
+        self.assertEqual(set(EmailSortant.objects.values_list('statut', flat=True)), {'Envoyé'})
+
+    @override_settings(EMAIL_TAILLE_LOT=1)
+    def test_lot_en_cours_repris_apres_le_bail(self):
+        perdu = mettre_en_file("Perdu", "Message", ["u@campus.test"])
+        en_cours = mettre_en_file("En cours", "Message", ["u@campus.test"])
+        mettre_en_file("Suivant", "Message", ["u@campus.test"])
+        maintenant = timezone.now()
+        EmailSortant.objects.filter(pk=perdu.pk).update(statut='En cours', prochain_essai=maintenant - timedelta(minutes=1))
+        EmailSortant.objects.filter(pk=en_cours.pk).update(statut='En cours', prochain_essai=maintenant + timedelta(minutes=5))
+
+        self.assertEqual(envoyer_file_emails()['envoyes'], 1)  # EMAIL_TAILLE_LOT lu à l'appel
+        self.assertEqual([m.subject for m in mail.outbox], ['Perdu'])
+        self.assertEqual(EmailSortant.objects.get(pk=en_cours.pk).statut, 'En cours')
+
+
+
+# 📊 COMPTEURS DU DASHBOARD
+class StatistiquesTests(TestCase):
+    def setUp(self):
+        statistiques.recalculer()
+        self.admin = creer_utilisateur('admin', statut='administrateur', is_staff=True, is_superuser=True)
+        self.salle = creer_salle()
+
+    def creer(self, debut, fin, **kwargs):
+        return Reservation.objects.create(salle=self.salle, utilisateur=self.admin, date=demain(),
+                                          heure_debut=time(debut), heure_fin=time(fin), **kwargs)
+
+    def test_signaux_et_mises_a_jour_en_masse(self):
+        creer_utilisateur('en_attente', est_approuve=False)
+        premiere = self.creer(8, 9)
+        self.creer(9, 10)
+        self.creer(10, 11)
+        premiere.statut = 'Terminée'
+        premiere.save()
+
+        valider_en_lot(Reservation.objects.filter(statut='En attente'))
+        self.client.force_login(self.admin)
+        self.client.post('/admin/reservation/reservation/', {
+            'action': 'refuser_reservations',
+            '_selected_action': [premiere.pk],
+        })
+        self.client.post('/admin/reservation/utilisateur/', {
+            'action': 'approuver_comptes',
+            '_selected_action': list(Utilisateur.objects.values_list('pk', flat=True)),
+        })
+        Reservation.objects.filter(statut='Validée').first().delete()
+        creer_salle('B').delete()
+
+        self.assertEqual(statistiques.verifier(), {})
+
+    def test_dashboard_sans_count(self):
+        self.creer(8, 9)
+        self.client.force_login(self.admin)
+        with CaptureQueriesContext(connection) as requetes:
+            reponse = self.client.get('/admin-dashboard/')
+        self.assertFalse([q for q in requetes.captured_queries if 'COUNT(' in q['sql']])
+        self.assertEqual(reponse.context['reservations_en_attente'], 1)
+        self.assertEqual(reponse.context['total_utilisateurs'], 1)
+
+    def test_commande_verifier(self):
+        Compteur.objects.filter(nom=statistiques.SALLES).update(valeur=42)
+        with self.assertRaises(CommandError):
+            call_command('recalculer_statistiques', verifier=True, stdout=StringIO(), stderr=StringIO())
+        call_command('recalculer_statistiques', stdout=StringIO())
+        self.assertEqual(statistiques.verifier(), {})
+
+
+
+# 🟩 GRILLE DE DISPONIBILITÉ
+class DisponibilitesTests(TestCase):
+    def setUp(self):
+        self.utilisateur = creer_utilisateur()
+        self.salle = creer_salle('A')
+        self.autre = creer_salle('B')
+        self.jour = demain()
+
+    def creer(self, debut, fin, **kwargs):
+        return Reservation.objects.create(salle=self.salle, utilisateur=self.utilisateur, date=self.jour,
+                                          heure_debut=debut, heure_fin=fin, **kwargs)
+
+    def masque(self):
+        return OccupationJour.objects.get(salle=self.salle, date=self.jour).masque
+
+    def test_masque_creneau(self):
+        self.assertEqual(masque_creneau(time(8), time(10)), 0b11)
+        self.assertEqual(masque_creneau(time(9, 30), time(10, 30)), 0b110)
+        self.assertEqual(creneaux_occupes(0b101)[:4], [True, False, True, False])
+
+    def test_masque_suit_les_changements_de_statut(self):
+        resa = self.creer(time(8), time(10))
+        self.creer(time(12), time(13), statut='Refusée')
+        self.assertEqual(self.masque(), 0b11)
+
+        resa.statut = 'Terminée'
+        resa.save()
+        self.assertEqual(self.masque(), 0)
+
+        resa.statut = 'Validée'
+        resa.save()
+        resa.delete()
+        self.assertEqual(self.masque(), 0)
+
+    def test_suppression_d_une_salle(self):
+        self.creer(time(10), time(11))
+        self.salle.delete()
+        self.assertFalse(OccupationJour.objects.exists())
+
+    def test_recalcul_complet(self):
+        self.creer(time(10), time(11))
+        OccupationJour.objects.update(masque=0)
+        recalculer_masques()
+        self.assertEqual(self.masque(), 0b100)
+
+    def test_commande_de_reconstruction(self):
+        self.creer(time(10), time(11))
+        OccupationJour.objects.update(masque=0b1)  # Dérive : update() brut, SQL à la main…
+        OccupationJour.objects.create(salle=self.autre, date=self.jour, masque=0b11)  # Journée sans réservation
+        sortie = StringIO()
+        call_command('recalculer_disponibilites', stdout=sortie)
+        self.assertIn('1 journée(s)', sortie.getvalue())
+        self.assertEqual(self.masque(), 0b100)
+        self.assertFalse(OccupationJour.objects.filter(salle=self.autre).exists())
+
+    def test_grille_une_requete(self):
+        self.creer(time(19), time(20))
+        with self.assertNumQueries(1):
+            resultat = grille(self.jour, self.jour + timedelta(days=6))
+        self.assertEqual(len(resultat['jours']), 7)
+        self.assertEqual(len(resultat['creneaux']), 12)
+        salle_a, salle_b = resultat['salles']
+        self.assertEqual(salle_a['masques'][0], 1 << 11)
+        self.assertEqual(salle_b['masques'], [0] * 7)
+
+    def test_api(self):
+        self.client.force_login(self.utilisateur)
+        reponse = self.client.get('/api/disponibilites/', {'debut': self.jour.isoformat()})
+        self.assertEqual(reponse.status_code, 200)
+        self.assertEqual(len(reponse.json()['salles']), 2)
+        reponse = self.client.get('/api/disponibilites/', {'debut': 'demain'})
+        self.assertEqual(reponse.status_code, 400)
+
+
+
+# ⚡ CACHE DES SALLES
+class CacheSallesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.utilisateur = creer_utilisateur()
+        self.salle = creer_salle('A')
+
+    def test_lecture_sans_requete(self):
+        salles_disponibles()
+        choix_salles()
+        with self.assertNumQueries(0):
+            self.assertEqual([s.nom for s in salles_disponibles()], ['A'])
+            self.assertEqual(choix_salles()[1:], [(self.salle.pk, 'A')])
+            ReservationForm(utilisateur=self.utilisateur).as_p()
+
+    def test_invalidation(self):
+        salles_disponibles()
+        creer_salle('B')
+        self.assertEqual([s.nom for s in salles_disponibles()], ['A', 'B'])
+
+        self.salle.est_disponible = False
+        self.salle.save()
+        self.assertEqual([s.nom for s in salles_disponibles()], ['B'])
+        self.assertEqual([nom for _, nom in choix_salles()[1:]], ['B'])
+
+    def test_bascule_list_editable(self):
+        admin = creer_utilisateur('admin', is_staff=True, is_superuser=True)
+        salles_disponibles()
+        self.client.force_login(admin)
+        self.client.post('/admin/reservation/salle/', {
+            'form-TOTAL_FORMS': 1, 'form-INITIAL_FORMS': 1,
+            'form-0-id': self.salle.pk, 'form-0-est_disponible': '',
+            '_save': 'Enregistrer',
+        })
+        self.assertEqual(salles_disponibles(), [])
+
+
+# 🧩 FRAGMENTS EN CACHE DE L'ACCUEIL
+class FragmentsAccueilTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.utilisateur = creer_utilisateur()
+        self.salle = creer_salle('A')
+        self.client.force_login(self.utilisateur)
+
+    def reserver(self, debut, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Reservation.objects.create(salle=self.salle, utilisateur=self.utilisateur, date=demain(),
+                                              heure_debut=time(debut), heure_fin=time(debut + 1), **kwargs)
+
+    def test_css_en_fichier_statique(self):
+        contenu = self.client.get('/').content.decode()
+        self.assertIn('href="/static/reservation/css/accueil.css"', contenu)
+        self.assertNotIn('<style>', contenu)
+
+    @override_settings(CACHE_PARTAGE=True)
+    def test_dernieres_reservations_en_cache_puis_invalidees(self):
+        self.reserver(8)
+        self.client.get('/')
+        with CaptureQueriesContext(connection) as capture:
+            self.client.get('/')
+        self.assertFalse([q for q in capture.captured_queries if 'reservation_reservation' in q['sql']])
+
+        resa = self.reserver(10)
+        self.assertContains(self.client.get('/'), '10:00 - 11:00')
+        with self.captureOnCommitCallbacks(execute=True):
+            valider_en_lot(Reservation.objects.filter(pk=resa.pk))
+        self.assertContains(self.client.get('/'), 'statut-validee')
+
+    @override_settings(CACHE_PARTAGE=False)
+    def test_pas_de_cache_par_utilisateur_sans_cache_partage(self):
+        self.reserver(8)
+        self.client.get('/')
+        with CaptureQueriesContext(connection) as capture:
+            self.client.get('/')
+        self.assertTrue([q for q in capture.captured_queries if 'reservation_reservation' in q['sql']])
+        self.assertIsNone(cache.get(cle_version_reservations(self.utilisateur.pk)))
+
+    def test_cartes_des_salles_invalidees(self):
+        self.client.get('/')
+        creer_salle('Amphi Z')
+        self.assertContains(self.client.get('/'), 'Amphi Z')
+
+
+# 📄 MES RÉSERVATIONS : PAGINATION ET EXPORTS
+class MesReservationsTests(TestCase):
+    def setUp(self):
+        self.utilisateur = creer_utilisateur()
+        self.salle = creer_salle('Amphi, Nord')
+        base = timezone.now().date()
+        Reservation.objects.bulk_create([
+            Reservation(salle=self.salle, utilisateur=self.utilisateur,
+                        date=base - timedelta(days=n // 3), heure_debut=time(8 + n % 3),
+                        heure_fin=time(9 + n % 3), statut='Terminée')
+            for n in range(7)
+        ])
+        self.ordre = list(Reservation.objects.order_by('-date', '-heure_debut', '-id').values_list('pk', flat=True))
+
+    def test_parcours_complet_sans_doublon(self):
+        vus, curseur = [], None
+        while True:
+            page, curseur = paginer(Reservation.objects.all(), ('date', 'heure_debut', 'id'), curseur, taille=3)
+            vus += [resa.pk for resa in page]
+            if curseur is None:
+                break
+        self.assertEqual(vus, self.ordre)
+
+    def test_curseur_invalide(self):
+        with self.assertRaises(CurseurInvalide):
+            paginer(Reservation.objects.all(), ('date', 'heure_debut', 'id'), 'pas-un-curseur')
+        self.client.force_login(self.utilisateur)
+        self.assertRedirects(self.client.get('/mes-reservations/', {'apres': '%%%'}), '/mes-reservations/')
+
+    def test_vue(self):
+        self.client.force_login(self.utilisateur)
+        reponse = self.client.get('/mes-reservations/')
+        self.assertEqual([r.pk for r in reponse.context['reservations']], self.ordre)
+        self.assertIsNone(reponse.context['curseur_suivant'])
+
+    def test_export_csv(self):
+        self.client.force_login(self.utilisateur)
+        reponse = self.client.get('/mes-reservations/export.csv')
+        contenu = b''.join(reponse.streaming_content).decode()
+        lignes = contenu.lstrip('\ufeff').splitlines()
+        self.assertEqual(len(lignes), 8)
+        self.assertTrue(lignes[1].startswith('Amphi, Nord;'))
+
+    def test_export_ical(self):
+        self.client.force_login(self.utilisateur)
+        reponse = self.client.get('/mes-reservations/export.ics')
+        contenu = b''.join(reponse.streaming_content).decode()
+        self.assertTrue(contenu.startswith('BEGIN:VCALENDAR\r\n'))
+        self.assertEqual(contenu.count('BEGIN:VEVENT'), 7)
+        self.assertIn('SUMMARY:Amphi\\, Nord (Terminée)', contenu)
+
+
+
+# 💰 BUDGET DE REQUÊTES PAR VUE (10, 100 et 10 000 lignes)
+@override_settings(STORAGES={
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+})
+class BudgetRequetesTests(TestCase):
+    TAILLES = [10, 100, 10_000]
+    BUDGETS = {
+        '/': 4,
+        '/mes-reservations/': 4,  # Page courante + page archivée
+        '/admin-dashboard/': 5,
+        '/admin/reservation/reservation/': 8,
+        '/api/disponibilites/': 3,
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = creer_utilisateur('admin', statut='administrateur', is_staff=True, is_superuser=True)
+        cls.salles = [creer_salle(f"Salle {n}") for n in range(20)]
+
+    def peupler(self, nombre):
+        base = timezone.now().date()
+        utilisateurs = Utilisateur.objects.bulk_create([
+            Utilisateur(username=f"u{n}", email=f"u{n}@campus.test", est_approuve=n % 2 == 0)
+            for n in range(min(nombre, 200))
+        ])
+        Reservation.objects.bulk_create([
+            Reservation(salle=self.salles[n % 20], utilisateur=self.admin if n % 2 else utilisateurs[n % len(utilisateurs)],
+                        date=base + timedelta(days=n // 240), heure_debut=time(8 + n // 20 % 12),
+                        heure_fin=time(9 + n // 20 % 12), statut=Reservation.STATUT_CHOIX[n % 4][0])
+            for n in range(nombre)
+        ], batch_size=1000)
+        statistiques.recalculer()
+        recalculer_masques()
+        cache.clear()
+
+    def test_budget_constant_quel_que_soit_le_volume(self):
+        self.client.force_login(self.admin)
+        for taille in self.TAILLES:
+            with self.subTest(taille=taille):
+                Reservation.objects.all().delete()
+                Utilisateur.objects.exclude(pk=self.admin.pk).delete()
+                self.peupler(taille)
+                for url, budget in self.BUDGETS.items():
+                    with budget_requetes(budget):
+                        reponse = self.client.get(url)
+                    self.assertEqual(reponse.status_code, 200, url)
+
+    def test_depassement(self):
+        with self.assertRaises(BudgetDepasse):
+            with budget_requetes(1):
+                list(Salle.objects.all())
+                list(Salle.objects.all())
+
+        @budget_requetes(1)
+        def une_requete():
+            return Salle.objects.count()
+        self.assertEqual(une_requete(), 20)
+
+
+
+# 🔁 RÉSERVATIONS RÉCURRENTES
+class RecurrenceTests(TestCase):
+    def setUp(self):
+        statistiques.recalculer()
+        self.utilisateur = creer_utilisateur('prof', statut='enseignant')
+        self.salle = creer_salle()
+        self.debut = demain()
+
+    def serie(self, **kwargs):
+        kwargs.setdefault('date_debut', self.debut)
+        kwargs.setdefault('date_fin', self.debut + timedelta(weeks=14))
+        return Recurrence(salle=self.salle, utilisateur=self.utilisateur,
+                          heure_debut=time(10), heure_fin=time(12), **kwargs)
+
+    def test_occurrences(self):
+        self.assertEqual(len(self.serie().occurrences()), 15)
+        self.assertEqual(len(self.serie(intervalle_semaines=2).occurrences()), 8)
+        exception = (self.debut + timedelta(weeks=1)).isoformat()
+        self.assertNotIn(exception, [d.isoformat() for d in self.serie(exceptions=[exception]).occurrences()])
+
+    def test_conflits_par_occurrence(self):
+        semaine_3 = self.debut + timedelta(weeks=3)
+        existante = Reservation.objects.create(salle=self.salle, utilisateur=self.utilisateur, date=semaine_3,
+                                               heure_debut=time(11), heure_fin=time(13))
+
+        resultat = reserver_serie(self.serie())
+
+        self.assertEqual(len(resultat.creees), 14)
+        self.assertEqual(resultat.conflits, {semaine_3: [existante.pk]})
+        self.assertEqual(Reservation.objects.filter(recurrence__isnull=False).count(), 14)
+        self.assertEqual(statistiques.verifier(), {})
+        self.assertEqual(OccupationJour.objects.get(salle=self.salle, date=self.debut).masque, 0b1100)
+
+    def test_requetes_independantes_du_nombre_d_occurrences(self):
+        with CaptureQueriesContext(connection) as courte:
+            reserver_serie(self.serie(date_fin=self.debut + timedelta(weeks=1)))
+        with CaptureQueriesContext(connection) as longue:
+            reserver_serie(self.serie(date_debut=self.debut + timedelta(weeks=2)))
+        self.assertEqual(len(courte), len(longue))
+
+    def test_api(self):
+        self.client.force_login(self.utilisateur)
+        reponse = self.client.post('/api/recurrences/', {
+            'salle': self.salle.pk,
+            'date_debut': self.debut.isoformat(),
+            'date_fin': (self.debut + timedelta(weeks=3)).isoformat(),
+            'heure_debut': '10:00',
+            'heure_fin': '12:00',
+            'intervalle_semaines': 1,
+            'exceptions': (self.debut + timedelta(weeks=2)).isoformat(),
+        })
+        self.assertEqual(reponse.status_code, 201)
+        self.assertEqual(len(reponse.json()['creees']), 3)
+        self.assertEqual(reponse.json()['conflits'], [])
+
+        reponse = self.client.post('/api/recurrences/', {'salle': self.salle.pk})
+        self.assertEqual(reponse.status_code, 400)
+
+
+# ⏱️ BANC D'ESSAI
+class BenchmarkTests(TestCase):
+    def test_donnees_generees_sans_chevauchement_actif(self):
+        benchmark.generer_donnees(3, 20, 500, graine=1)
+        self.assertEqual(Reservation.objects.count(), 500)
+        actives = Reservation.objects.filter(statut__in=Reservation.STATUTS_ACTIFS)
+        for resa in actives:
+            index = charger_index_par_paire([(resa.salle_id, resa.date)])[(resa.salle_id, resa.date)]
+            self.assertEqual(index.conflits(resa.heure_debut, resa.heure_fin, exclure=resa.pk), [])
+        self.assertEqual(statistiques.verifier(), {})
+
+    def test_scenarios_mesures(self):
+        donnees = benchmark.generer_donnees(2, 10, 200, graine=1)
+        for nom, (preparer, action) in benchmark.scenarios(donnees).items():
+            with self.subTest(nom):
+                mesure = benchmark.mesurer(action, 2, preparer)
+                self.assertEqual(mesure['iterations'], 2)
+                self.assertLessEqual(mesure['p50_ms'], mesure['max_ms'])
+                self.assertGreater(mesure['requetes_max'], 0)
+
+
+# 🛰️ INSTRUMENTATION
+class InstrumentationTests(TestCase):
+    def setUp(self):
+        metriques.reinitialiser()
+        self.utilisateur = creer_utilisateur()
+        self.client.force_login(self.utilisateur)
+
+    def test_inactive_par_defaut(self):
+        reponse = self.client.get('/')
+        self.assertNotIn('Server-Timing', reponse.headers)
+        self.assertEqual(dict(metriques.vues), {})
+
+    @override_settings(INSTRUMENTATION=True, INSTRUMENTATION_JETON='secret')
+    def test_server_timing_et_prometheus(self):
+        installer_chronometre()  # Fait par ReservationConfig.ready() quand INSTRUMENTATION est actif
+        self.addCleanup(retirer_chronometre)
+        reponse = self.client.get('/')
+        self.assertRegex(reponse['Server-Timing'],
+                         r'^total;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ SQL", tpl;dur=[\d.]+$')
+
+        self.client.logout()
+        self.assertEqual(self.client.get('/metriques/').status_code, 403)
+        reponse = self.client.get('/metriques/', headers={'Authorization': 'Bearer secret'})
+        self.assertEqual(reponse.status_code, 200)
+        texte = reponse.content.decode()
+        self.assertIn('campus_http_requetes_total{vue="reservation:accueil"} 1', texte)
+        self.assertIn('campus_http_duree_secondes_bucket{vue="reservation:accueil",le="+Inf"} 1', texte)
+        self.assertIn('campus_db_requetes_total{vue="reservation:accueil"}', texte)
+        self.assertIn('campus_template_duree_secondes_total{vue="reservation:accueil"}', texte)
+        self.assertGreater(metriques.vues['reservation:accueil']['duree_templates'], 0)
+
+    @override_settings(INSTRUMENTATION=True)
+    def test_middleware_ne_remplace_pas_le_rendu(self):
+        rendu = backend_django.Template.render
+        InstrumentationMiddleware(lambda request: HttpResponse())
+        self.assertIs(backend_django.Template.render, rendu)
+
+    @override_settings(INSTRUMENTATION=True)
+    def test_reponse_en_flux_mesuree_a_la_fin(self):
+        Reservation.objects.create(salle=creer_salle(), utilisateur=self.utilisateur, date=demain(),
+                                   heure_debut=time(10), heure_fin=time(11))
+        reponse = self.client.get('/mes-reservations/export.csv')
+        self.assertTrue(reponse['Server-Timing'].startswith('vue;dur='))
+        requetes_vue = int(re.search(r'"(\d+) SQL"', reponse['Server-Timing']).group(1))
+        self.assertNotIn('reservation:exporter_reservations_csv', metriques.vues)  # Flux pas encore lu
+
+        b''.join(reponse.streaming_content)
+        cumul = metriques.vues['reservation:exporter_reservations_csv']
+        self.assertEqual(cumul['requetes_http'], 1)
+        # Réservations vivantes et archivées, lues pendant le flux
+        self.assertEqual(cumul['requetes_sql'], requetes_vue + 2)
+
+    def test_requetes_dupliquees(self):
+        mesure = Mesure()
+        with connection.execute_wrapper(mesure):
+            for _ in range(3):
+                list(Salle.objects.filter(nom='Salle A'))
+            list(Salle.objects.filter(nom='Salle B'))
+        self.assertEqual(mesure.nb_requetes, 4)
+        self.assertEqual(list(mesure.doublons.values()), [3])
+
+    def test_profils_des_requetes_les_plus_lentes(self):
+        with tempfile.TemporaryDirectory() as dossier:
+            with override_settings(INSTRUMENTATION=True, INSTRUMENTATION_ECHANTILLON=1,
+                                   INSTRUMENTATION_PROFILS=2, INSTRUMENTATION_DOSSIER_PROFILS=dossier):
+                for _ in range(4):
+                    self.client.get('/')
+            self.assertEqual(len(list(Path(dossier).glob('*.prof'))), 2)
+
+
+# 🗄️ ARCHIVAGE
+class ArchivageTests(TestCase):
+    def setUp(self):
+        self.utilisateur = creer_utilisateur()
+        self.salle = creer_salle()
+        aujourd_hui = timezone.now().date()
+        anciennes = [('Terminée', 400 + n) for n in range(5)] + [('Refusée', 500), ('Refusée', 501)]
+        recentes = [('Validée', 450), ('Terminée', 30), ('En attente', -3)]
+        for statut, jours in anciennes + recentes:
+            Reservation.objects.create(salle=self.salle, utilisateur=self.utilisateur,
+                                       date=aujourd_hui - timedelta(days=jours), heure_debut=time(10),
+                                       heure_fin=time(11), statut=statut)
+        statistiques.recalculer()
+        self.ordre = list(Reservation.objects.order_by('-date', '-heure_debut', '-id').values_list('pk', flat=True))
+
+    def test_simulation(self):
+        sortie = StringIO()
+        call_command('archiver_reservations', '--simuler', '--lot', '3', stdout=sortie)
+        self.assertIn('7 réservation(s) seraient archivée(s)', sortie.getvalue())
+        self.assertEqual(ReservationArchivee.objects.count(), 0)
+        self.assertEqual(Reservation.objects.count(), 10)
+
+    def test_archivage_par_lots_idempotent(self):
+        sortie = StringIO()
+        call_command('archiver_reservations', '--lot', '3', stdout=sortie)
+        self.assertIn('lot 3 : 1 ligne(s)', sortie.getvalue())
+        self.assertEqual(ReservationArchivee.objects.count(), 7)
+        self.assertEqual(set(Reservation.objects.values_list('statut', flat=True)),
+                         {'Validée', 'Terminée', 'En attente'})
+        self.assertEqual(statistiques.verifier(), {})
+        self.assertEqual(list(archiver(timezone.now().date() - timedelta(days=365))), [])
+
+    def test_reservation_issue_d_une_promotion(self):
+        promue = Reservation.objects.filter(statut='Terminée').order_by('date').first()
+        demande = DemandeAttente.objects.create(
+            salle=self.salle, utilisateur=self.utilisateur, date=promue.date, heure_debut=time(10),
+            heure_fin=time(11), statut='Promue', a_examiner=False, reservation=promue,
+        )
+        call_command('archiver_reservations', '--lot', '3', stdout=StringIO())
+        self.assertTrue(ReservationArchivee.objects.filter(pk=promue.pk).exists())
+        demande.refresh_from_db()
+        self.assertEqual((demande.statut, demande.reservation_id), ('Promue', None))
+
+    def test_historique_unifie(self):
+        list(archiver(timezone.now().date() - timedelta(days=365)))
+        vus, curseur = [], None
+        while True:
+            page, curseur = paginer_fusion(historique(self.utilisateur), ('date', 'heure_debut', 'id'),
+                                           curseur, taille=3)
+            vus += [resa.pk for resa in page]
+            if curseur is None:
+                break
+        self.assertEqual(vus, self.ordre)
+
+        self.client.force_login(self.utilisateur)
+        reponse = self.client.get('/mes-reservations/')
+        self.assertEqual([r.pk for r in reponse.context['reservations']], self.ordre)
+        contenu = b''.join(self.client.get('/mes-reservations/export.csv').streaming_content).decode()
+        self.assertEqual(len(contenu.lstrip('\ufeff').splitlines()), 11)
+
+
+# 🏁 TERMINAISON DES RÉSERVATIONS PASSÉES
+class TerminaisonTests(TestCase):
+    def setUp(self):
+        self.utilisateur = creer_utilisateur()
+        self.salle = creer_salle()
+        # Un « aujourd'hui » fictif, un mois dans le passé
+        aujourd_hui = timezone.localdate() - timedelta(days=30)
+        hier, demain_ = aujourd_hui - timedelta(days=1), aujourd_hui + timedelta(days=1)
+        self.midi = timezone.make_aware(timezone.datetime.combine(aujourd_hui, time(12)))
+        self.jours = hier, aujourd_hui
+        creneaux = [
+            (hier, 8, 'Validée'), (hier, 10, 'Validée'), (hier, 14, 'Validée'), (hier, 16, 'En attente'),
+            (aujourd_hui, 9, 'Validée'), (aujourd_hui, 11, 'Validée'), (aujourd_hui, 13, 'Validée'),
+            (demain_, 10, 'Validée'),
+        ]
+        for jour, heure, statut in creneaux:
+            Reservation.objects.create(salle=self.salle, utilisateur=self.utilisateur, date=jour,
+                                       heure_debut=time(heure), heure_fin=time(heure + 1), statut=statut)
+        statistiques.recalculer()
+
+    def test_terminaison_par_lots_idempotente(self):
+        self.assertEqual(list(terminer_expirees(2, self.midi)), [2, 2, 1])
+        hier, aujourd_hui = self.jours
+        terminees = Reservation.objects.filter(statut='Terminée')
+        self.assertEqual(
+            sorted((r.date, r.heure_debut.hour) for r in terminees),
+            [(hier, 8), (hier, 10), (hier, 14), (aujourd_hui, 9), (aujourd_hui, 11)],
+        )
+        self.assertTrue(all(r.date_traitement == self.midi for r in terminees))
+        self.assertEqual(list(terminer_expirees(2, self.midi)), [])
+        self.assertEqual(statistiques.verifier(), {})
+        self.assertEqual(OccupationJour.objects.get(date=hier).masque,
+                         masque_creneau(time(16), time(17)))
+
+    def test_commande(self):
+        sortie = StringIO()
+        call_command('terminer_reservations', stdout=sortie)
+        self.assertIn('7 réservation(s) terminée(s)', sortie.getvalue())
+
+
+# 🔎 RECHERCHE DE SALLES
+class RechercheSallesTests(TestCase):
+    def setUp(self):
+        self.utilisateur = creer_utilisateur()
+        self.a = creer_salle('A', capacite=30, equipements='Projecteur Wifi')
+        self.b = creer_salle('B', capacite=20, equipements='Projecteur')
+        self.c = creer_salle('C', capacite=100, equipements='Projecteur, Wifi, Sono')
+        self.d = creer_salle('D', capacite=25, equipements='Projecteur')
+        creer_salle('E', capacite=40, equipements='Projecteur', est_disponible=False)
+        Reservation.objects.create(salle=self.d, utilisateur=self.utilisateur, date=demain(),
+                                   heure_debut=time(9), heure_fin=time(11), statut='Validée')
+
+    def test_jetons_normalises_et_synchronises(self):
+        self.a.equipements = 'Vidéo conférence, WIFI'
+        self.a.save()
+        self.assertEqual(set(self.a.jetons.values_list('jeton', flat=True)), {'video-conference', 'wifi'})
+        self.assertEqual(self.a.liste_equipements, ['Vidéo conférence', 'WIFI'])
+
+    def test_classement_en_une_requete(self):
+        with self.assertNumQueries(1):
+            salles = list(rechercher_salles(demain(), time(10), time(11), 15, ['projecteur']))
+        self.assertEqual(salles, [self.b, self.a, self.c])
+        self.assertEqual([s.places_perdues for s in salles], [5, 15, 85])
+
+        salles = rechercher_salles(demain(), time(11), time(12), 15, ['Wifi', 'projecteur'])
+        self.assertEqual(list(salles), [self.a, self.c])
+        self.assertEqual(list(rechercher_salles(demain(), time(11), time(12), 25, ['Projecteur'])),
+                         [self.d, self.a, self.c])
+
+    def test_api(self):
+        self.client.force_login(self.utilisateur)
+        reponse = self.client.get('/api/salles/recherche/', {
+            'date': demain().isoformat(), 'heure_debut': '10:00', 'heure_fin': '11:00',
+            'capacite': 25, 'equipements': 'wifi',
+        })
+        self.assertEqual(reponse.status_code, 200)
+        self.assertEqual([s['nom'] for s in reponse.json()['salles']], ['A', 'C'])
+        self.assertEqual(reponse.json()['salles'][1]['equipements'], ['Projecteur', 'Wifi', 'Sono'])
+
+        reponse = self.client.get('/api/salles/recherche/', {'date': 'hier'})
+        self.assertEqual(reponse.status_code, 400)
+
+
+# 🔐 AUTHENTIFICATION ET SESSIONS
+class AuthentificationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.utilisateur = creer_utilisateur()
+        self.en_attente = creer_utilisateur('en_attente', est_approuve=False)
+
+    def test_compte_non_approuve_refuse_a_la_connexion(self):
+        self.assertIsNone(authenticate(username='en_attente', password='motdepasse123'))
+        reponse = self.client.post('/connexion/', {'username': 'en_attente', 'password': 'motdepasse123'})
+        self.assertRedirects(reponse, '/connexion/')
+        self.assertIn('en attente', str(list(get_messages(reponse.wsgi_request))[0]))
+
+        reponse = self.client.post('/connexion/', {'username': 'etudiant', 'password': 'motdepasse123'})
+        self.assertRedirects(reponse, '/')
+
+    def test_compte_desapprouve_deconnecte(self):
+        self.client.force_login(self.utilisateur)
+        self.assertEqual(self.client.get('/').status_code, 200)
+        self.utilisateur.est_approuve = False
+        self.utilisateur.save()
+        self.assertRedirects(self.client.get('/'), '/connexion/?next=/')
+
+    def test_approbation_en_masse_invalide_le_cache(self):
+        self.client.force_login(self.en_attente)
+        self.assertEqual(self.client.get('/').status_code, 302)
+        admin = creer_utilisateur('admin', statut='administrateur', is_staff=True, is_superuser=True)
+        client_admin = self.client_class()
+        client_admin.force_login(admin)
+        client_admin.post('/admin/reservation/utilisateur/', {
+            'action': 'approuver_comptes', '_selected_action': [self.en_attente.pk],
+        })
+        self.client.force_login(self.en_attente)
+        self.assertEqual(self.client.get('/').status_code, 200)
+
+    @override_settings(CACHE_PARTAGE=False)
+    def test_compte_desactive_sans_signal_rejete_sans_cache_partage(self):
+        self.client.force_login(self.utilisateur)
+        self.assertEqual(self.client.get('/').status_code, 200)
+        Utilisateur.objects.filter(pk=self.utilisateur.pk).update(is_active=False)  # Ni signal ni invalidation
+        self.assertRedirects(self.client.get('/'), '/connexion/?next=/')
+
+        Utilisateur.objects.filter(pk=self.utilisateur.pk).update(is_active=True, est_approuve=False)
+        self.client.force_login(self.utilisateur)
+        self.assertRedirects(self.client.get('/'), '/connexion/?next=/')
+        self.assertIsNone(cache.get(cle_utilisateur(self.utilisateur.pk)))
+
+    @override_settings(CACHE_PARTAGE=True)
+    def test_requetes_par_requete_authentifiee(self):
+        # api_disponibilites fait une requête : session et utilisateur n'en coûtent aucune
+        for moteur in ['django.contrib.sessions.backends.cached_db',
+                       'django.contrib.sessions.backends.signed_cookies']:
+            with self.subTest(moteur), override_settings(SESSION_ENGINE=moteur):
+                client = self.client_class()
+                client.force_login(self.utilisateur)
+                client.get('/api/disponibilites/')
+                with self.assertNumQueries(1):
+                    self.assertEqual(client.get('/api/disponibilites/').status_code, 200)
+
+
+# 👥 COMPTES : APPROBATION EN MASSE ET IMPORT CSV
+class ComptesTests(TestCase):
+    CSV = (
+        "username;email;statut;mot_de_passe\n"
+        "alice;alice@campus.test;enseignant;Campus-2026!\n"
+        "bob;BOB@campus.test;;\n"
+        "carla;etudiant@campus.test;delegue;Campus-2026!\n"
+        "dan;dan@campus.test;directeur;Campus-2026!\n"
+    )
+
+    def setUp(self):
+        cache.clear()
+        self.admin = creer_utilisateur('admin', statut='administrateur', is_staff=True, is_superuser=True)
+        self.en_attente = [creer_utilisateur(f'attente{n}', est_approuve=False) for n in range(3)]
+        statistiques.recalculer()
+
+    def test_approbation_retourne_les_pk_exacts(self):
+        self.assertEqual(approuver(Utilisateur.objects.all()), [u.pk for u in self.en_attente])
+        self.assertEqual(approuver(Utilisateur.objects.all()), [])
+        self.assertEqual(
+            sorted(EmailSortant.objects.filter(sujet__contains='approuvé').values_list('destinataires', flat=True)),
+            [[f'attente{n}@campus.test'] for n in range(3)],
+        )
+        self.assertEqual(statistiques.verifier(), {})
+
+    def test_message_de_l_action_admin(self):
+        self.client.force_login(self.admin)
+        reponse = self.client.post('/admin/reservation/utilisateur/', {
+            'action': 'approuver_comptes',
+            '_selected_action': [self.admin.pk, self.en_attente[0].pk],
+        })
+        self.assertEqual(str(list(get_messages(reponse.wsgi_request))[0]), "✅ 1 compte(s) approuvé(s)")
+
+    def test_import_csv(self):
+        creer_utilisateur('etudiant')
+        statistiques.recalculer()
+        resultat = importer_utilisateurs(lire_csv(StringIO(self.CSV)), processus=2)
+
+        self.assertEqual([u.username for u in resultat.crees], ['alice', 'bob'])
+        self.assertEqual([(numero, erreur) for numero, _, erreur in resultat.erreurs],
+                         [(4, 'compte déjà existant'), (5, 'statut inconnu « directeur »')])
+        self.assertEqual(list(resultat.mots_de_passe_generes), ['bob'])
+        self.assertEqual(authenticate(username='alice', password='Campus-2026!').statut, 'enseignant')
+        bob = authenticate(username='bob', password=resultat.mots_de_passe_generes['bob'])
+        self.assertEqual(bob.email, 'bob@campus.test')
+        self.assertEqual(statistiques.verifier(), {})
+
+    def test_email_existant_en_casse_mixte(self):
+        creer_utilisateur('alice2', email='Alice@Campus.test')
+        resultat = importer_utilisateurs(lire_csv(StringIO(self.CSV)), processus=1)
+        self.assertEqual([u.username for u in resultat.crees], ['bob', 'carla'])
+        self.assertIn((2, 'alice', 'compte déjà existant'), resultat.erreurs)
+
+    def test_commande(self):
+        with tempfile.TemporaryDirectory() as dossier:
+            chemin, sortie_mdp = Path(dossier) / 'classe.csv', Path(dossier) / 'mdp.csv'
+            chemin.write_text(self.CSV.replace(';', ','), encoding='utf-8')
+            sortie, erreurs = StringIO(), StringIO()
+            call_command('importer_utilisateurs', str(chemin), '--processus', '1', '--sortie', str(sortie_mdp),
+                         stdout=sortie, stderr=erreurs)
+            self.assertIn('3 compte(s) créé(s), 1 ligne(s) écartée(s)', sortie.getvalue())
+            self.assertIn('ligne 5 (dan)', erreurs.getvalue())
+            self.assertEqual(sortie_mdp.read_text(encoding='utf-8').splitlines()[0], 'username;mot_de_passe')
+
+    def test_import_depuis_l_admin(self):
+        self.client.force_login(self.admin)
+        self.assertContains(self.client.get('/admin/reservation/utilisateur/'),
+                            '/admin/reservation/utilisateur/importer/')
+        self.assertContains(self.client.get('/admin/reservation/utilisateur/importer/'), 'Importer une liste de classe')
+        fichier = SimpleUploadedFile('classe.csv', self.CSV.encode('utf-8'), content_type='text/csv')
+        reponse = self.client.post('/admin/reservation/utilisateur/importer/', {'fichier': fichier})
+
+        self.assertEqual(str(list(get_messages(reponse.wsgi_request))[0]),
+                         "✅ 3 compte(s) créé(s), 1 ligne(s) écartée(s)")
+        self.assertContains(reponse, 'statut inconnu « directeur »')
+        bob = Utilisateur.objects.get(username='bob')
+        mot_de_passe = reponse.context['resultat'].mots_de_passe_generes['bob']
+        self.assertContains(reponse, mot_de_passe)
+        self.assertTrue(bob.check_password(mot_de_passe) and bob.est_approuve)
+        self.assertEqual(statistiques.verifier(), {})
+
+    def test_import_depuis_l_admin_reserve_au_personnel(self):
+        self.client.force_login(creer_utilisateur('etudiant'))
+        reponse = self.client.post('/admin/reservation/utilisateur/importer/',
+                                   {'fichier': SimpleUploadedFile('classe.csv', self.CSV.encode('utf-8'))})
+        self.assertEqual(reponse.status_code, 302)  # Connexion admin
+        self.assertFalse(Utilisateur.objects.filter(username='alice').exists())
+
+
+# ⚡ API ASYNCHRONE
+class ApiAsynchroneTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.utilisateur = creer_utilisateur()
+        self.admin = creer_utilisateur('admin', statut='administrateur', is_staff=True)
+        self.salle = creer_salle()
+        self.reservations = [
+            Reservation.objects.create(salle=self.salle, utilisateur=self.utilisateur,
+                                       date=demain() + timedelta(days=n), heure_debut=time(10),
+                                       heure_fin=time(12), statut='Validée')
+            for n in range(3)
+        ]
+        statistiques.recalculer()
+
+    async def test_disponibilites_identiques_a_la_vue_synchrone(self):
+        await self.async_client.aforce_login(self.utilisateur)
+        parametres = {'debut': demain().isoformat()}
+        reponse = await self.async_client.get('/api/async/disponibilites/', parametres)
+        self.assertEqual(reponse.status_code, 200)
+        await sync_to_async(self.client.force_login)(self.utilisateur)
+        synchrone = await sync_to_async(self.client.get)('/api/disponibilites/', parametres)
+        self.assertEqual(reponse.json(), synchrone.json())
+        reponse = await self.async_client.get('/api/async/disponibilites/', {'debut': 'hier'})
+        self.assertEqual(reponse.status_code, 400)
+
+    async def test_statistiques_reservees_aux_administrateurs(self):
+        await self.async_client.aforce_login(self.utilisateur)
+        self.assertEqual((await self.async_client.get('/api/async/statistiques/')).status_code, 403)
+        await self.async_client.aforce_login(self.admin)
+        reponse = await self.async_client.get('/api/async/statistiques/')
+        self.assertEqual(reponse.json()['reservations_validees'], 3)
+
+    async def test_mes_reservations_paginees(self):
+        await self.async_client.aforce_login(self.utilisateur)
+        reponse = await self.async_client.get('/api/async/mes-reservations/')
+        self.assertEqual([r['id'] for r in reponse.json()['reservations']],
+                         [r.pk for r in reversed(self.reservations)])
+        self.assertIsNone(reponse.json()['suivant'])
+        reponse = await self.async_client.get('/api/async/mes-reservations/', {'apres': '%%%'})
+        self.assertEqual(reponse.status_code, 400)
+
+    async def test_non_connecte(self):
+        reponse = await self.async_client.get('/api/async/statistiques/')
+        self.assertEqual(reponse.status_code, 302)
+
+
+# 📡 FLUX SSE DE LA FILE DES RÉSERVATIONS
+@override_settings(FLUX_DUREE_MAX=0)
+class FluxReservationsTests(TestCase):
+    def setUp(self):
+        self.utilisateur = creer_utilisateur()
+        self.admin = creer_utilisateur('admin', statut='administrateur', is_staff=True)
+        self.salle = creer_salle()
+        statistiques.recalculer()
+
+    def creer(self, debut, **kwargs):
+        return Reservation.objects.create(salle=self.salle, utilisateur=self.utilisateur, date=demain(),
+                                          heure_debut=time(debut), heure_fin=time(debut + 1), **kwargs)
+
+    def journal(self):
+        return list(EvenementReservation.objects.order_by('pk').values_list(
+            'reservation_id', 'type', 'statut', 'ancien_statut'))
+
+    def test_journal_des_changements(self):
+        a, b, c = self.creer(8), self.creer(10), self.creer(12)
+        valider_en_lot(Reservation.objects.filter(pk=a.pk))
+        b.statut = 'Refusée'
+        b.save()
+        pk_c = c.pk
+        c.delete()
+        self.assertEqual(self.journal(), [
+            (a.pk, 'creation', 'En attente', ''),
+            (b.pk, 'creation', 'En attente', ''),
+            (pk_c, 'creation', 'En attente', ''),
+            (a.pk, 'statut', 'Validée', 'En attente'),
+            (b.pk, 'statut', 'Refusée', 'En attente'),
+            (pk_c, 'suppression', '', 'En attente'),
+        ])
+
+    def test_reprise_apres_last_event_id(self):
+        self.creer(8)
+        dernier = flux.dernier_identifiant()
+        resa = self.creer(10)
+        self.client.force_login(self.admin)
+        reponse = self.client.get('/admin-dashboard/flux/', HTTP_LAST_EVENT_ID=str(dernier))
+        self.assertEqual(reponse['Content-Type'], 'text/event-stream')
+        contenu = b''.join(reponse.streaming_content).decode()
+        self.assertIn(f"id: {dernier + 1}\nevent: reservation\n", contenu)
+        self.assertIn(f'"reservation": {resa.pk}', contenu)
+        self.assertIn('"salle": "Salle A"', contenu)
+        self.assertEqual(contenu.count('event: reservation'), 1)
+
+    def test_sans_identifiant_seulement_les_nouveautes(self):
+        self.creer(8)
+        self.client.force_login(self.admin)
+        contenu = b''.join(self.client.get('/admin-dashboard/flux/').streaming_content).decode()
+        self.assertNotIn('event: reservation', contenu)
+        self.assertTrue(contenu.startswith('retry: '))
+
+    def test_reserve_aux_administrateurs(self):
+        self.client.force_login(self.utilisateur)
+        self.assertEqual(self.client.get('/admin-dashboard/flux/').status_code, 403)
+
+    @override_settings(FLUX_RETENTION=3600)
+    def test_commande_de_purge(self):
+        ancienne, recente = self.creer(8), self.creer(10)
+        EvenementReservation.objects.filter(reservation_id=ancienne.pk).update(
+            date_creation=timezone.now() - timedelta(hours=2))
+        sortie = StringIO()
+        call_command('purger_flux', stdout=sortie)
+        self.assertIn('1 événement(s)', sortie.getvalue())
+        self.assertEqual(self.journal(), [(recente.pk, 'creation', 'En attente', '')])
+
+    @override_settings(FLUX_DUREE_MAX=300, FLUX_INTERVALLE=0.05)
+    def test_wsgi_rend_le_worker_apres_un_intervalle(self):
+        self.client.force_login(self.admin)
+        reponse = self.client.get('/admin-dashboard/flux/')
+        depart = monotonic()
+        contenu = b''.join(reponse.streaming_content).decode()
+        self.assertLess(monotonic() - depart, 5)
+        self.assertTrue(contenu.startswith('retry: 50\n\n'))
+
+    async def test_flux_asynchrone(self):
+        resa = await sync_to_async(self.creer)(8)
+        await self.async_client.aforce_login(self.admin)
+        reponse = await self.async_client.get('/admin-dashboard/flux/', {'depuis': 0})
+        contenu = ''.join([morceau.decode() async for morceau in reponse.streaming_content])
+        self.assertIn(f'"reservation": {resa.pk}', contenu)
+
+
+# ⏳ LISTE D'ATTENTE
+class ListeAttenteTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.titulaire = creer_utilisateur('titulaire')
+        self.premier = creer_utilisateur('premier')
+        self.second = creer_utilisateur('second')
+        self.salle = creer_salle()
+        self.jour = demain()
+        self.occupee = Reservation.objects.create(salle=self.salle, utilisateur=self.titulaire, date=self.jour,
+                                                  heure_debut=time(10), heure_fin=time(12))
+
+    def attendre(self, utilisateur, debut, fin, **kwargs):
+        return DemandeAttente.objects.create(salle=self.salle, utilisateur=utilisateur, date=self.jour,
+                                             heure_debut=time(debut), heure_fin=time(fin), **kwargs)
+
+    def test_rejoindre_depuis_le_formulaire_en_conflit(self):
+        self.client.force_login(self.premier)
+        creneau = {'salle': self.salle.pk, 'date': self.jour.isoformat(), 'heure_debut': '10:00', 'heure_fin': '11:00'}
+        self.assertContains(self.client.post('/', creneau), 'Rejoindre la liste d')
+
+        self.assertRedirects(self.client.post('/liste-attente/', creneau), '/mes-reservations/')
+        self.assertEqual(DemandeAttente.objects.get().utilisateur, self.premier)
+        self.assertContains(self.client.get('/mes-reservations/'), 'attente-card')
+
+        self.client.post('/liste-attente/', creneau)  # Doublon
+        self.client.post('/liste-attente/', {**creneau, 'heure_debut': '14:00', 'heure_fin': '15:00'})  # Libre
+        self.assertEqual(DemandeAttente.objects.count(), 1)
+
+    def test_liberation_marque_seulement_la_journee_concernee(self):
+        demande = self.attendre(self.premier, 10, 11, a_examiner=False)
+        ailleurs = DemandeAttente.objects.create(salle=creer_salle('B'), utilisateur=self.premier, date=self.jour,
+                                                 heure_debut=time(10), heure_fin=time(11), a_examiner=False)
+        with self.assertNumQueries(1):
+            self.assertEqual(signaler_liberations([(self.salle.pk, self.jour)]), 1)
+        demande.refresh_from_db()
+        ailleurs.refresh_from_db()
+        self.assertTrue(demande.a_examiner)
+        self.assertFalse(ailleurs.a_examiner)
+
+    def test_annulation_promeut_la_premiere_demande_compatible(self):
+        Reservation.objects.create(salle=self.salle, utilisateur=self.titulaire, date=self.jour,
+                                   heure_debut=time(8), heure_fin=time(10), statut='Validée')
+        trop_tot = self.attendre(self.premier, 9, 11, a_examiner=False)  # Chevauche 8h-10h
+        premier = self.attendre(self.premier, 10, 11, a_examiner=False)
+        second = self.attendre(self.second, 10, 12, a_examiner=False)
+        self.assertEqual(promouvoir().examinees, 0)  # Rien de libéré
+
+        self.occupee.statut = 'Terminée'  # annuler_reservation
+        self.occupee.save()
+        resultat = promouvoir()
+        self.assertEqual([demande.pk for demande in resultat.promues], [premier.pk])
+        self.assertEqual(resultat.examinees, 3)
+
+        premier.refresh_from_db()
+        self.assertEqual(premier.statut, 'Promue')
+        self.assertEqual((premier.reservation.utilisateur, premier.reservation.statut), (self.premier, 'En attente'))
+        self.assertEqual(DemandeAttente.objects.get(pk=second.pk).statut, 'En file')
+        self.assertEqual(DemandeAttente.objects.get(pk=trop_tot.pk).statut, 'En file')
+        self.assertEqual(EmailSortant.objects.filter(destinataires=[self.premier.email]).count(), 1)
+
+    def test_erreur_en_cours_de_lot_sans_reservation_orpheline(self):
+        premier = self.attendre(self.premier, 10, 11)
+        second = self.attendre(self.second, 11, 12)
+        self.occupee.statut = 'Terminée'
+        self.occupee.save()
+        with mock.patch('reservation.attente.envoyer_email_promotion', side_effect=[None, RuntimeError]):
+            with self.assertRaises(RuntimeError):
+                promouvoir()
+
+        premier.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((premier.statut, premier.a_examiner), ('Promue', False))
+        self.assertEqual((second.statut, second.a_examiner), ('En file', True))  # Réexaminée au prochain passage
+        self.assertFalse(Reservation.objects.filter(utilisateur=self.second).exists())
+        self.assertEqual([demande.pk for demande in promouvoir().promues], [second.pk])
+
+    def test_refus_en_masse_libere(self):
+        admin = creer_utilisateur('admin', is_staff=True, is_superuser=True)
+        demande = self.attendre(self.premier, 10, 12, a_examiner=False)
+        self.client.force_login(admin)
+        self.client.post('/admin/reservation/reservation/', {
+            'action': 'refuser_reservations', '_selected_action': [self.occupee.pk],
+        })
+        self.assertEqual(Reservation.objects.get(pk=self.occupee.pk).statut, 'Refusée')
+        call_command('promouvoir_liste_attente', stdout=StringIO())
+        demande.refresh_from_db()
+        self.assertEqual(demande.statut, 'Promue')
+
+    def test_expiration(self):
+        passee = DemandeAttente.objects.create(salle=self.salle, utilisateur=self.premier, heure_debut=time(10),
+                                               heure_fin=time(11), date=self.jour - timedelta(days=3))
+        self.attendre(self.premier, 10, 11)
+        self.assertEqual(expirer(), 1)
+        passee.refresh_from_db()
+        self.assertEqual(passee.statut, 'Expirée')
+
+
+# 🔂 IDEMPOTENCE DU FORMULAIRE DE RÉSERVATION
+@override_settings(CACHE_PARTAGE=True)
+class IdempotenceTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.utilisateur = creer_utilisateur()
+        self.salle = creer_salle()
+        self.client.force_login(self.utilisateur)
+        self.creneau = {'salle': self.salle.pk, 'date': demain().isoformat(),
+                        'heure_debut': '10:00', 'heure_fin': '11:00', 'cle_idempotence': 'cle-1'}
+
+    def test_nouvelle_cle_a_chaque_affichage(self):
+        premier, second = ReservationForm(), ReservationForm()
+        self.assertIn('type="hidden" name="cle_idempotence"', str(premier['cle_idempotence']))
+        self.assertNotEqual(str(premier['cle_idempotence']), str(second['cle_idempotence']))
+
+    def test_renvoi_rejoue_sans_requete_de_conflit(self):
+        self.assertRedirects(self.client.post('/', self.creneau), '/', fetch_redirect_response=False)
+        with CaptureQueriesContext(connection) as requetes:
+            reponse = self.client.post('/', self.creneau)
+        self.assertRedirects(reponse, '/', fetch_redirect_response=False)
+        self.assertFalse([q for q in requetes.captured_queries if 'reservation_reservation' in q['sql']])
+        self.assertEqual(Reservation.objects.count(), 1)
+        self.assertIn('a été enregistrée', str(list(get_messages(reponse.wsgi_request))[-1]))
+
+        self.client.post('/', {**self.creneau, 'cle_idempotence': 'cle-2', 'heure_debut': '14:00',
+                               'heure_fin': '15:00'})
+        self.assertEqual(Reservation.objects.count(), 2)
+
+    def test_echec_libere_la_cle(self):
+        Reservation.objects.create(salle=self.salle, utilisateur=creer_utilisateur('autre'), date=demain(),
+                                   heure_debut=time(10), heure_fin=time(11))
+        self.assertEqual(self.client.post('/', self.creneau).status_code, 200)  # Conflit
+        self.client.post('/', {**self.creneau, 'heure_debut': '12:00', 'heure_fin': '13:00'})
+        self.assertTrue(Reservation.objects.filter(utilisateur=self.utilisateur).exists())
+
+    def test_doublons_concurrents_une_seule_ecriture(self):
+        demarre, liberer = threading.Event(), threading.Event()
+        appels, resultats = [], []
+
+        def lente():
+            appels.append('premier')
+            demarre.set()
+            liberer.wait(5)
+            return {'reservation': 1, 'message': 'ok'}
+
+        def doublon():
+            appels.append('doublon')
+            return {'reservation': 2, 'message': 'doublon'}
+
+        premier = threading.Thread(target=lambda: resultats.append(une_seule_fois(1, 'cle', lente)))
+        premier.start()
+        demarre.wait(5)
+        self.assertEqual(une_seule_fois(1, 'cle', doublon), (None, True))  # En cours : réponse immédiate
+        liberer.set()
+        premier.join()
+        self.assertEqual(resultats, [({'reservation': 1, 'message': 'ok'}, False)])
+        self.assertEqual(une_seule_fois(1, 'cle', doublon), ({'reservation': 1, 'message': 'ok'}, True))
+        self.assertEqual(appels, ['premier'])
+
+    @override_settings(CACHE_PARTAGE=False)
+    def test_sans_cache_partage_action_executee(self):
+        appels = []
+        for _ in range(2):
+            une_seule_fois(1, 'cle', lambda: appels.append('appel') or {'reservation': 1, 'message': 'ok'})
+        self.assertEqual(appels, ['appel', 'appel'])
+        self.assertIsNone(cache.get('idempotence:1:cle'))
+
+
+# 🪞 ROUTAGE VERS LA RÉPLIQUE
+@override_settings(REPLIQUE_ALIAS='replique', REPLIQUE_EPINGLE=5)
+class RoutageRepliqueTests(SimpleTestCase):
+    def setUp(self):
+        self.routeur = RouteurReplique()
+        self.requete = RequestFactory().get('/mes-reservations/')
+
+    def lire(self, etat, vue_lecture=True, modele=Reservation):
+        vue = lecture_replique(lambda request: self.routeur.db_for_read(modele))
+        with routage(etat):
+            return vue(self.requete) if vue_lecture else self.routeur.db_for_read(modele)
+
+    def test_lectures_des_vues_en_lecture_seule(self):
+        self.assertEqual(self.lire(EtatRoutage()), 'replique')
+        self.assertIsNone(self.lire(EtatRoutage(), vue_lecture=False))
+        self.assertIsNone(self.lire(EtatRoutage(epingle=True)))  # Vient d'écrire
+        self.assertIsNone(self.lire(EtatRoutage(), modele=Session))
+        self.requete.method = 'POST'
+        self.assertIsNone(self.lire(EtatRoutage()))
+        self.assertFalse(self.routeur.allow_migrate('replique', 'reservation'))
+
+    def test_ecriture_pose_le_cookie_d_epinglage(self):
+        def vue(request):
+            self.assertEqual(self.routeur.db_for_write(Reservation), 'default')
+            return HttpResponse()
+
+        reponse = RepliqueMiddleware(vue)(RequestFactory().post('/'))
+        self.assertEqual(reponse.cookies['primaire']['max-age'], 5)
+        self.assertNotIn('primaire', RepliqueMiddleware(lambda request: HttpResponse())(self.requete).cookies)
+
+    @override_settings(REPLIQUE_ALIAS=None)
+    def test_inactif_sans_replique(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            RepliqueMiddleware(lambda request: HttpResponse())
+
+
+# Réplique distincte fournie par le lanceur de tests : chaque base a sa propre salle.
+# TransactionTestCase : le routeur garde sur la principale les lectures faites
+# dans une transaction, or TestCase enveloppe chaque test dans atomic()
+@override_settings(REPLIQUE_ALIAS='replique', REPLIQUE_EPINGLE=5)
+class LecturesSurRepliqueTests(TransactionTestCase):
+    databases = {'default', 'replique'}
+
+    def setUp(self):
+        self.utilisateur = creer_utilisateur()
+        self.salle = creer_salle('Salle principale')
+        Salle.objects.using('replique').bulk_create([Salle(nom='Salle de la réplique', capacite=10)])
+        # Le flush de fin de test suit allow_migrate, qui exclut la réplique
+        self.addCleanup(lambda: Salle.objects.using('replique').all()._raw_delete('replique'))
+        self.client.force_login(self.utilisateur)
+
+    def salles_lues(self):
+        return [salle['nom'] for salle in self.client.get('/api/disponibilites/').json()['salles']]
+
+    def test_vue_en_lecture_seule_lit_la_replique(self):
+        self.assertEqual(self.salles_lues(), ['Salle de la réplique'])
+
+    def test_apres_une_ecriture_lectures_sur_la_principale(self):
+        reponse = self.client.post('/', {'salle': self.salle.pk, 'date': demain().isoformat(),
+                                         'heure_debut': '10:00', 'heure_fin': '11:00'})
+        self.assertEqual(reponse.cookies['primaire']['max-age'], 5)
+        self.assertTrue(Reservation.objects.filter(utilisateur=self.utilisateur).exists())
+        self.assertEqual(self.salles_lues(), ['Salle principale'])  # Cookie renvoyé par le client
+
+        self.client.cookies.pop('primaire')  # Épinglage expiré
+        self.assertEqual(self.salles_lues(), ['Salle de la réplique'])
+
+
+# 🏢 IMPORT DES SALLES ET FLUX ICALENDAR
+class ImportSallesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_csv_upsert_sur_le_nom(self):
+        desactivee = creer_salle('Amphi 1', est_disponible=False)
+        salles_disponibles()  # Cache rempli
+        contenu = ("nom;capacite;localisation;equipements\n"
+                   "Amphi 1;200;Bâtiment B;Micro, Vidéoprojecteur\n"
+                   "Labo 3;;Bâtiment C;\n"
+                   "TD 4;25;Bâtiment C;Tableau\n")
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, encoding='utf-8') as fichier:
+            fichier.write(contenu)
+        sortie, erreurs = StringIO(), StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('importer_salles', fichier.name, stdout=sortie, stderr=erreurs)
+        Path(fichier.name).unlink()
+
+        self.assertIn('1 salle(s) créée(s), 1 mise(s) à jour, 1 ligne(s) écartée(s)', sortie.getvalue())
+        self.assertIn('ligne 3 (Labo 3)', erreurs.getvalue())
+        desactivee.refresh_from_db()
+        self.assertEqual((desactivee.pk, desactivee.capacite, desactivee.est_disponible), (desactivee.pk, 200, False))
+        self.assertEqual(set(desactivee.jetons.values_list('jeton', flat=True)), {'micro', 'videoprojecteur'})
+        self.assertEqual([salle.nom for salle in salles_disponibles()], ['TD 4'])
+        self.assertEqual(statistiques.lire_statistiques()['total_salles'], 2)
+
+    def test_json_en_une_transaction(self):
+        lignes = lire_json(StringIO('[{"nom": "A", "capacite": 10, "localisation": "Rdc", "est_disponible": false},'
+                                    ' {"nom": "B", "capacite": 12, "localisation": "Rdc",'
+                                    ' "equipements": "Wifi"}]'))
+        # Savepoint, existantes, upsert, relecture, jetons (lecture + insertion), compteur, release
+        with self.assertNumQueries(8):
+            resultat = importer_salles(lignes)
+        self.assertEqual([salle.nom for salle in resultat.crees], ['A', 'B'])
+        self.assertFalse(Salle.objects.get(nom='A').est_disponible)
+
+
+class CalendriersTests(TestCase):
+    def setUp(self):
+        self.utilisateur = creer_utilisateur()
+        self.autre = creer_utilisateur('autre')
+        self.salle = creer_salle()
+        Reservation.objects.create(salle=self.salle, utilisateur=self.utilisateur, date=demain(),
+                                   heure_debut=time(10), heure_fin=time(11))
+        Reservation.objects.create(salle=self.salle, utilisateur=self.autre, date=demain(),
+                                   heure_debut=time(14), heure_fin=time(15), statut='Refusée')
+
+    def lire(self, url):
+        reponse = self.client.get(url)
+        self.assertEqual(reponse['Content-Type'], 'text/calendar; charset=utf-8')
+        return b''.join(reponse.streaming_content).decode()
+
+    def test_abonnement_par_jeton_sans_session(self):
+        jeton = jeton_calendrier(self.utilisateur)
+        with self.assertNumQueries(2):  # Utilisateur du jeton, puis les réservations
+            contenu = self.lire(f'/calendrier/mes-reservations.ics?jeton={jeton}')
+        self.assertEqual(contenu.count('BEGIN:VEVENT'), 1)
+        self.assertEqual(self.client.get('/calendrier/mes-reservations.ics?jeton=1:faux').status_code, 403)
+        self.assertEqual(self.client.get(f'/calendrier/salles/{self.salle.pk}.ics').status_code, 403)
+
+    def test_revocation_du_jeton(self):
+        ancien = jeton_calendrier(self.utilisateur)
+        self.client.force_login(self.utilisateur)
+        self.client.post('/calendrier/regenerer/')
+        self.client.logout()
+        self.utilisateur.refresh_from_db()
+        nouveau = jeton_calendrier(self.utilisateur)
+
+        self.assertEqual(self.client.get(f'/calendrier/mes-reservations.ics?jeton={ancien}').status_code, 403)
+        self.assertEqual(self.client.get(f'/calendrier/mes-reservations.ics?jeton={nouveau}').status_code, 200)
+        # Compte désactivé ou plus approuvé : le jeton courant ne sert plus non plus
+        self.utilisateur.is_active = False
+        self.utilisateur.save()
+        self.assertEqual(self.client.get(f'/calendrier/mes-reservations.ics?jeton={nouveau}').status_code, 403)
+        self.utilisateur.is_active, self.utilisateur.est_approuve = True, False
+        self.utilisateur.save()
+        self.assertEqual(self.client.get(f'/calendrier/mes-reservations.ics?jeton={nouveau}').status_code, 403)
+
+    def test_occupation_d_une_salle(self):
+        self.client.force_login(self.autre)
+        contenu = self.lire(f'/calendrier/salles/{self.salle.pk}.ics')
+        self.assertIn('X-WR-CALNAME:Occupation de Salle A', contenu)
+        self.assertEqual(contenu.count('BEGIN:VEVENT'), 1)  # La réservation refusée ne bloque rien
+        self.assertContains(self.client.get('/mes-reservations/'), '/calendrier/mes-reservations.ics?jeton=')
+
+    def test_horaires_en_utc(self):
+        for jour in (date(2030, 1, 15), date(2030, 7, 15)):  # Heure d'hiver, heure d'été
+            Reservation.objects.create(salle=self.salle, utilisateur=self.utilisateur, date=jour,
+                                       heure_debut=time(10), heure_fin=time(11, 30))
+        self.client.force_login(self.utilisateur)
+        contenu = self.lire('/calendrier/mes-reservations.ics')
+        self.assertNotIn('TZID=', contenu)
+        self.assertIn('DTSTART:20300115T090000Z\r\nDTEND:20300115T103000Z\r\n', contenu)
+        self.assertIn('DTSTART:20300715T080000Z\r\nDTEND:20300715T093000Z\r\n', contenu)
+
+
+# 📊 ANALYSES D'OCCUPATION
+class AnalysesOccupationTests(TestCase):
+    LUNDI = date(2026, 1, 5)
+
+    def setUp(self):
+        cache.clear()
+        self.a, self.b = creer_salle('A'), creer_salle('B')
+        utilisateur = creer_utilisateur()
+        jour = lambda decalage: self.LUNDI + timedelta(days=decalage)
+        for salle, decalage, debut, fin, statut in [
+            (self.a, 0, time(10), time(12), 'Validée'),
+            (self.a, 0, time(10), time(11), 'Refusée'),
+            (self.b, 1, time(9, 30), time(10), 'Terminée'),
+            (self.b, 7, time(9), time(10), 'Validée'),  # Hors période
+        ]:
+            Reservation.objects.create(salle=salle, utilisateur=utilisateur, date=jour(decalage),
+                                       heure_debut=debut, heure_fin=fin, statut=statut)
+        ReservationArchivee.objects.create(id=10_000, salle=self.b, utilisateur=utilisateur, date=jour(2),
+                                           heure_debut=time(14), heure_fin=time(15), statut='Terminée',
+                                           date_creation=timezone.now())
+
+    def test_matrices_refus_et_pointes(self):
+        resultat = calculer_occupation(self.LUNDI, self.LUNDI + timedelta(days=6), taille_lot=2)
+        a, b = resultat['salles']
+        dix, neuf, quatorze = HEURES.index(10), HEURES.index(9), HEURES.index(14)
+        self.assertEqual(resultat['reservations'], 4)
+        self.assertEqual((a['matrice'][0][dix], a['matrice'][0][dix + 1], a['matrice'][0][dix + 2]), (1.0, 1.0, 0.0))
+        self.assertEqual((b['matrice'][1][neuf], b['matrice'][2][quatorze]), (0.5, 1.0))
+        self.assertEqual((a['demandes'], a['refusees'], a['taux_refus']), (2, 1, 0.5))
+        self.assertEqual(a['semaines'], [round(120 / (7 * 12 * 60), 4)])
+        self.assertEqual(resultat['matrice'][0][dix], 0.5)
+        self.assertEqual({(p['jour'], p['heure']) for p in resultat['heures_de_pointe'][:3]},
+                         {('lundi', 10), ('lundi', 11), ('mercredi', 14)})
+
+    def test_terminee_occupe_seulement_les_jours_passes(self):
+        # Vu depuis le lundi : les réservations terminées de mardi et mercredi ne comptent pas
+        with mock.patch('reservation.analyses.timezone.localdate', return_value=self.LUNDI):
+            resultat = calculer_occupation(self.LUNDI, self.LUNDI + timedelta(days=6))
+        a, b = resultat['salles']
+        self.assertEqual(a['matrice'][0][HEURES.index(10)], 1.0)  # Validée
+        self.assertEqual((b['utilisation'], b['demandes']), (0.0, 2))
+
+    def test_cache_et_vues_reservees_au_personnel(self):
+        debut, fin = self.LUNDI, self.LUNDI + timedelta(days=6)
+        occupation(debut, fin)
+        with self.assertNumQueries(0):
+            occupation(debut, fin)
+
+        self.client.force_login(creer_utilisateur('etudiant2'))
+        self.assertEqual(self.client.get('/api/occupation/').status_code, 302)  # Connexion admin
+        self.client.force_login(creer_utilisateur('gestion', is_staff=True))
+        reponse = self.client.get(f'/api/occupation/?debut={debut}&fin={fin}')
+        self.assertEqual(reponse.json()['salles'][1]['nom'], 'B')
+        self.assertEqual(self.client.get('/api/occupation/?debut=2026-02-01&fin=2026-01-01').status_code, 400)
+        self.assertContains(self.client.get(f'/admin-dashboard/occupation/?debut={debut}&fin={fin}'),
+                            'Occupation par jour et par heure')
@@ -12,8 +12,31 @@ urlpatterns = [
     # 🏠 Utilisateur standard
     path('', views.accueil, name='accueil'),
     path('mes-reservations/', views.mes_reservations, name='mes_reservations'),
+    path('mes-reservations/export.csv', views.exporter_reservations_csv, name='exporter_reservations_csv'),
+    path('mes-reservations/export.ics', views.exporter_reservations_ical, name='exporter_reservations_ical'),
+    path('calendrier/mes-reservations.ics', views.calendrier_utilisateur, name='calendrier_utilisateur'),
+    path('calendrier/regenerer/', views.regenerer_abonnement, name='regenerer_abonnement'),
+    path('calendrier/salles/<int:salle_id>.ics', views.calendrier_salle, name='calendrier_salle'),
     path('annuler/<int:reservation_id>/', views.annuler_reservation, name='annuler_reservation'),
+    path('liste-attente/', views.rejoindre_liste_attente, name='rejoindre_liste_attente'),
+    path('liste-attente/<int:demande_id>/quitter/', views.quitter_liste_attente, name='quitter_liste_attente'),
+    
+    # 🟩 API
+    path('api/disponibilites/', views.api_disponibilites, name='api_disponibilites'),
+    path('api/recurrences/', views.api_recurrences, name='api_recurrences'),
+    path('api/salles/recherche/', views.api_recherche_salles, name='api_recherche_salles'),
+    
+    # ⚡ API asynchrone (ASGI)
+    path('api/async/disponibilites/', views.api_disponibilites_async, name='api_disponibilites_async'),
+    path('api/async/statistiques/', views.api_statistiques, name='api_statistiques'),
+    path('api/async/mes-reservations/', views.api_mes_reservations, name='api_mes_reservations'),
     
     # 👑 Administrateur
     path('admin-dashboard/', views.admin_dashboard, name='admin_dashboard'),
+    path('admin-dashboard/flux/', views.flux_reservations, name='flux_reservations'),
+    path('admin-dashboard/occupation/', views.analyses_occupation, name='analyses_occupation'),
+    path('api/occupation/', views.api_occupation, name='api_occupation'),
+    
+    # 📈 Supervision
+    path('metriques/', views.metriques, name='metriques'),
 ]
\ No newline at end of file
@@ -1,7 +1,114 @@
-from django.core.mail import send_mail
+from datetime import timedelta
+
+from django.core.mail import get_connection, EmailMessage
 from django.conf import settings
-from django.template.loader import render_to_string
-from django.utils.html import strip_tags
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import EmailSortant
+
+
+def mettre_en_file(sujet, message, destinataires, expediteur=None):
+    """📥 Enregistre un email à envoyer par la commande envoyer_emails"""
+    return EmailSortant.objects.create(
+        sujet=sujet,
+        message=message,
+        expediteur=expediteur if expediteur is not None else settings.EMAIL_HOST_USER,
+        destinataires=list(destinataires),
+    )
+
+
+def _delai_avant_essai(tentatives):
+    # ⏳ Backoff exponentiel : 1, 2, 4, 8... minutes, plafonné à une heure
+    return timedelta(minutes=min(2 ** (tentatives - 1), 60))
+
+
+def _reserver_lot(taille_lot):
+    """🔒 Passe un lot en « En cours » et valide aussitôt : l'envoi se fait hors transaction.
+
+    prochain_essai devient la fin du bail (EMAIL_BAIL) : un lot resté « En cours »
+    après l'arrêt brutal d'un worker est repris une fois le bail expiré.
+    """
+    maintenant = timezone.now()
+    with transaction.atomic():
+        lot = EmailSortant.objects.filter(
+            statut__in=('En attente', 'En cours'),
+            prochain_essai__lte=maintenant,
+        ).order_by('prochain_essai', 'pk')
+        if connection.features.has_select_for_update_skip_locked:
+            # 🔒 Plusieurs workers peuvent tourner sans envoyer deux fois
+            lot = lot.select_for_update(skip_locked=True)
+        elif not connection.features.has_select_for_update:
+            # SQLite : une écriture factice prend le verrou d'écriture avant la
+            # lecture, ce qui sérialise aussi les autres processus
+            EmailSortant.objects.filter(pk=0).update(statut=F('statut'))
+        lot = list(lot[:taille_lot])
+        if lot:
+            EmailSortant.objects.filter(pk__in=[email.pk for email in lot]).update(
+                statut='En cours', prochain_essai=maintenant + timedelta(seconds=settings.EMAIL_BAIL),
+            )
+    return lot
+
+
+def envoyer_file_emails(taille_lot=None, max_tentatives=None):
+    """📤 Envoie un lot d'emails en attente sur une seule connexion SMTP.
+
+    Trois temps : réservation du lot (courte transaction), envoi sans
+    transaction ni verrou, puis une écriture des résultats. La connexion SMTP
+    et les envois ne bloquent donc ni les réservations (verrou d'écriture
+    SQLite) ni les lignes (PostgreSQL). Retourne le nombre d'emails envoyés,
+    reportés et abandonnés.
+    """
+    taille_lot = taille_lot or settings.EMAIL_TAILLE_LOT
+    max_tentatives = max_tentatives or settings.EMAIL_MAX_TENTATIVES
+    resultat = {'envoyes': 0, 'reportes': 0, 'abandonnes': 0}
+
+    lot = _reserver_lot(taille_lot)
+    if not lot:
+        return resultat
+
+    smtp = get_connection(fail_silently=False)
+    try:
+        smtp.open()
+        erreur_connexion = None
+    except Exception as exc:
+        erreur_connexion = exc
+
+    maintenant = timezone.now()
+    for email in lot:
+        erreur = erreur_connexion
+        if erreur is None:
+            try:
+                smtp.send_messages([EmailMessage(
+                    email.sujet, email.message, email.expediteur or None,
+                    email.destinataires, connection=smtp,
+                )])
+            except Exception as exc:
+                erreur = exc
+
+        if erreur is None:
+            email.statut = 'Envoyé'
+            email.date_envoi = maintenant
+            resultat['envoyes'] += 1
+        else:
+            email.tentatives += 1
+            email.derniere_erreur = f"{type(erreur).__name__}: {erreur}"
+            if email.tentatives >= max_tentatives:
+                email.statut = 'Abandonné'
+                resultat['abandonnes'] += 1
+            else:
+                email.statut = 'En attente'
+                email.prochain_essai = maintenant + _delai_avant_essai(email.tentatives)
+                resultat['reportes'] += 1
+
+    if erreur_connexion is None:
+        smtp.close()
+
+    EmailSortant.objects.bulk_update(
+        lot, ['statut', 'tentatives', 'prochain_essai', 'derniere_erreur', 'date_envoi']
+    )
+    return resultat
 
 def envoyer_email_inscription(utilisateur):
     """📧 Email de confirmation d'inscription (compte en attente)"""
@@ -20,13 +127,34 @@ def envoyer_email_inscription(utilisateur):
     Service de réservation
     """
     
-    send_mail(
-        sujet,
-        message,
-        settings.EMAIL_HOST_USER,
-        [utilisateur.email],
-        fail_silently=True,
-    )
+    mettre_en_file(sujet, message, [utilisateur.email])
+
+def envoyer_emails_approbation(utilisateurs):
+    """📧 Emails « compte approuvé », mis en file en une seule requête.
+
+    `utilisateurs` : (username, email) des comptes approuvés. Le worker
+    envoyer_emails les expédie ensuite par lots sur une seule connexion SMTP.
+    """
+    sujet = "✅ Votre compte a été approuvé"
+    EmailSortant.objects.bulk_create([
+        EmailSortant(
+            sujet=sujet,
+            message=f"""
+    Bonjour {username},
+    
+    Votre compte a été approuvé par un administrateur.
+    
+    📅 Vous pouvez dès maintenant vous connecter et réserver des salles.
+    
+    Cordialement,
+    Service de réservation
+    """,
+            expediteur=settings.EMAIL_HOST_USER,
+            destinataires=[email],
+        )
+        for username, email in utilisateurs
+        if email
+    ], batch_size=500)
 
 def envoyer_email_validation(reservation):
     """📧 Email de validation de réservation"""
@@ -46,10 +174,24 @@ def envoyer_email_validation(reservation):
     Service de réservation
     """
     
-    send_mail(
-        sujet,
-        message,
-        settings.EMAIL_HOST_USER,
-        [reservation.utilisateur.email],
-        fail_silently=True,
-    )
\ No newline at end of file
+    mettre_en_file(sujet, message, [reservation.utilisateur.email])
+
+def envoyer_email_promotion(demande):
+    """📧 Email « une place s'est libérée » (demande de liste d'attente promue)"""
+    sujet = "🎉 Une place s'est libérée"
+    message = f"""
+    Bonjour {demande.utilisateur.username},
+    
+    Le créneau que vous attendiez s'est libéré : votre demande a été transformée en réservation.
+    
+    📅 Date : {demande.date}
+    ⏰ Horaire : {demande.heure_debut} - {demande.heure_fin}
+    📍 Salle : {demande.salle.nom} - {demande.salle.localisation}
+    
+    Elle est maintenant en attente de validation par un administrateur.
+    
+    Cordialement,
+    Service de réservation
+    """
+    
+    mettre_en_file(sujet, message, [demande.utilisateur.email])
\ No newline at end of file
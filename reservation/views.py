@@ -1,13 +1,41 @@
+import hmac
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
-from django.contrib.auth import login, authenticate, logout
+from django.urls import reverse
+from django.views.decorators.http import require_POST
+from django.core.exceptions import NON_FIELD_ERRORS
+from django.contrib.auth import login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib import messages
 from django.utils import timezone
 from django.db.models import Q
-from .models import Utilisateur, Salle, Reservation
-from .forms import InscriptionForm, ConnexionForm, ReservationForm
+from .models import Utilisateur, Salle, Reservation, ReservationArchivee, DemandeAttente
+from .forms import (
+    InscriptionForm, ConnexionForm, ReservationForm, RecurrenceForm, RechercheSalleForm, ListeAttenteForm,
+)
 from .utils import envoyer_email_inscription  # ⚠️ À créer
+from .services import reserver, reserver_serie, ConflitReservation
+from .idempotence import une_seule_fois, cle_idempotence
+from .routage import lecture_replique
+from .statistiques import lire_statistiques, alire_statistiques
+from .disponibilites import grille, agrille
+from .cache import salles_disponibles, version_salles, version_reservations
+from .pagination import paginer_fusion, apaginer_fusion, CurseurInvalide
+from .exports import lignes_csv, lignes_ical, jeton_calendrier, utilisateur_du_jeton
+from .archives import historique
+from .recherche import rechercher_salles
+from .instrumentation import metriques as registre_metriques
+from .analyses import occupation
+from . import flux
+
+# 📄 Ordre de mes_reservations (même ordre que l'index resa_utilisateur_date_idx)
+CHAMPS_PAGINATION = ('date', 'heure_debut', 'id')
+ORDRE_PAGINATION = [f"-{champ}" for champ in CHAMPS_PAGINATION]
 
 # 📝 PAGE D'INSCRIPTION
 def inscription(request):
@@ -39,27 +67,22 @@ def connexion(request):
     if request.method == 'POST':
         form = ConnexionForm(request, data=request.POST)
         if form.is_valid():
-            username = form.cleaned_data.get('username')
-            password = form.cleaned_data.get('password')
-            user = authenticate(username=username, password=password)
+            # 🔐 ApprobationBackend n'authentifie que les comptes approuvés
+            user = form.get_user()
+            login(request, user)
+            messages.success(request, f'✅ Bienvenue {user.username}!')
             
-            if user is not None:
-                # 🔐 Vérifier si le compte est approuvé
-                if not user.est_approuve:
-                    messages.error(
-                        request,
-                        '⏳ Votre compte est en attente d\'approbation par un administrateur.'
-                    )
-                    return redirect('reservation:connexion')  # ✅ CORRIGÉ
-                
-                login(request, user)
-                messages.success(request, f'✅ Bienvenue {user.username}!')
-                
-                # 👑 Redirection selon le statut
-                if user.statut == 'administrateur':
-                    return redirect('reservation:admin_dashboard')  # ✅ CORRIGÉ
-                else:
-                    return redirect('reservation:accueil')  # ✅ CORRIGÉ
+            # 👑 Redirection selon le statut
+            if user.statut == 'administrateur':
+                return redirect('reservation:admin_dashboard')  # ✅ CORRIGÉ
+            else:
+                return redirect('reservation:accueil')  # ✅ CORRIGÉ
+        elif getattr(request, 'compte_en_attente', False):
+            messages.error(
+                request,
+                '⏳ Votre compte est en attente d\'approbation par un administrateur.'
+            )
+            return redirect('reservation:connexion')  # ✅ CORRIGÉ
     else:
         form = ConnexionForm()
     
@@ -73,55 +96,154 @@ def deconnexion(request):
 
 # 🏠 PAGE D'ACCUEIL (RÉSERVATION) - PROTÉGÉE
 @login_required
+@lecture_replique
 def accueil(request):
-    # 🔐 Vérifier que l'utilisateur est approuvé
-    if not request.user.est_approuve:
-        messages.error(request, '⏳ Votre compte n\'est pas encore approuvé')
-        return redirect('reservation:connexion')  # ✅ CORRIGÉ
-    
-    salles = Salle.objects.filter(est_disponible=True)
+    salles = salles_disponibles()
     reservations_utilisateur = Reservation.objects.filter(
         utilisateur=request.user
-    ).order_by('-date', '-heure_debut')[:5]  # 5 dernières réservations
+    ).select_related('salle').order_by('-date', '-heure_debut')[:5]  # 5 dernières réservations
     
     if request.method == 'POST':
         form = ReservationForm(request.POST, utilisateur=request.user)
-        if form.is_valid():
+        
+        def enregistrer():
+            if not form.is_valid():
+                return None
             reservation = form.save(commit=False)
             reservation.utilisateur = request.user
-            reservation.statut = "En attente"
-            reservation.save()
-            
-            messages.success(
-                request,
-                f"✅ Votre réservation pour {reservation.salle.nom} "
-                f"le {reservation.date} de {reservation.heure_debut} à {reservation.heure_fin} "
-                f"a été enregistrée ! Statut : En attente de validation."
-            )
+            try:
+                reserver(reservation, statut="En attente")
+            except ConflitReservation as erreur:
+                form.add_error(None, erreur)
+                return None
+            return {
+                'reservation': reservation.pk,
+                'message': f"✅ Votre réservation pour {reservation.salle.nom} "
+                           f"le {reservation.date} de {reservation.heure_debut} à {reservation.heure_fin} "
+                           f"a été enregistrée ! Statut : En attente de validation.",
+            }
+        
+        # 🔂 Un envoi répété (même clé) reçoit le résultat du premier, sans validation ni écriture
+        resultat, rejoue = une_seule_fois(request.user.pk, cle_idempotence(request), enregistrer)
+        if resultat is not None:
+            messages.success(request, resultat['message'])
             return redirect('reservation:accueil')  # ✅ CORRIGÉ
+        if rejoue:
+            messages.info(request, "⏳ Votre réservation est en cours d'enregistrement.")
+            return redirect('reservation:accueil')
     else:
         form = ReservationForm(utilisateur=request.user)
     
     return render(request, 'reservation/accueil.html', {
         'salles': salles,
         'form': form,
-        'reservations': reservations_utilisateur
+        'reservations': reservations_utilisateur,
+        'proposer_attente': form.has_error(NON_FIELD_ERRORS, 'conflit'),  # ⏳ Créneau pris
+        # 🧩 Clés des fragments en cache : cartes des salles et dernières réservations
+        # (celles-ci seulement si le cache est partagé : durée 0 = pas de cache)
+        'duree_fragments': settings.CACHE_FRAGMENTS_TIMEOUT,
+        'version_salles': version_salles(),
+        'duree_reservations': settings.CACHE_FRAGMENTS_TIMEOUT if settings.CACHE_PARTAGE else 0,
+        'version_reservations': version_reservations(request.user.pk) if settings.CACHE_PARTAGE else None,
     })
 
 # 📋 MES RÉSERVATIONS
 @login_required
+@lecture_replique
 def mes_reservations(request):
-    if not request.user.est_approuve:
-        return redirect('reservation:connexion')  # ✅ CORRIGÉ
-    
-    reservations = Reservation.objects.filter(
-        utilisateur=request.user
-    ).order_by('-date', '-heure_debut')
+    try:
+        # Réservations courantes et archivées, dans un seul fil chronologique
+        reservations, curseur_suivant = paginer_fusion(
+            historique(request.user),
+            CHAMPS_PAGINATION,
+            curseur=request.GET.get('apres'),
+        )
+    except CurseurInvalide:
+        return redirect('reservation:mes_reservations')
     
+    page_suivante = bool(request.GET.get('apres'))
     return render(request, 'reservation/mes_reservations.html', {
-        'reservations': reservations
+        'reservations': reservations,
+        'curseur_suivant': curseur_suivant,
+        'page_suivante': page_suivante,
+        # ⏳ Liste d'attente, en tête de la première page seulement
+        'demandes_attente': [] if page_suivante else DemandeAttente.objects.filter(
+            utilisateur=request.user, statut='En file',
+        ).select_related('salle').order_by('date', 'heure_debut'),
+        # 📅 URL d'abonnement à coller dans un client de calendrier
+        'url_abonnement': request.build_absolute_uri(
+            f"{reverse('reservation:calendrier_utilisateur')}?jeton={jeton_calendrier(request.user)}"
+        ),
     })
 
+# 📤 EXPORTS DE MES RÉSERVATIONS (flux, mémoire constante)
+@login_required
+def exporter_reservations_csv(request):
+    reponse = StreamingHttpResponse(
+        lignes_csv(*[queryset.order_by(*ORDRE_PAGINATION) for queryset in historique(request.user)]),
+        content_type='text/csv; charset=utf-8',
+    )
+    reponse['Content-Disposition'] = 'attachment; filename="mes-reservations.csv"'
+    return reponse
+
+@login_required
+def exporter_reservations_ical(request):
+    reponse = StreamingHttpResponse(
+        lignes_ical(
+            f"Réservations de {request.user.username}",
+            *[queryset.order_by(*ORDRE_PAGINATION) for queryset in historique(request.user)],
+        ),
+        content_type='text/calendar; charset=utf-8',
+    )
+    reponse['Content-Disposition'] = 'attachment; filename="mes-reservations.ics"'
+    return reponse
+
+# 📅 FLUX ICALENDAR D'ABONNEMENT (une requête, lue avec iterator())
+def _abonne(request):
+    """🔗 Utilisateur connecté, ou porteur du ?jeton= de son URL d'abonnement"""
+    if request.user.is_authenticated:
+        return request.user
+    return utilisateur_du_jeton(request.GET.get('jeton', ''))
+
+@login_required
+@require_POST
+def regenerer_abonnement(request):
+    # L'ancienne URL cesse de fonctionner (post_save : utilisateur oublié du cache)
+    request.user.version_calendrier += 1
+    request.user.save(update_fields=['version_calendrier'])
+    messages.success(request, "🔗 Nouvelle URL d'abonnement : l'ancienne est révoquée")
+    return redirect('reservation:mes_reservations')
+
+def _jeton_invalide():
+    return HttpResponse("Jeton d'abonnement invalide\n", status=403, content_type='text/plain')
+
+def _calendrier(nom, reservations):
+    reponse = StreamingHttpResponse(lignes_ical(nom, reservations), content_type='text/calendar; charset=utf-8')
+    reponse['Cache-Control'] = 'private, max-age=300'  # Les clients interrogent le flux en boucle
+    return reponse
+
+def calendrier_utilisateur(request):
+    utilisateur = _abonne(request)
+    if utilisateur is None:
+        return _jeton_invalide()
+    depuis = timezone.localdate() - timedelta(days=settings.CALENDRIER_JOURS_PASSES)
+    return _calendrier(
+        f"Réservations de {utilisateur.username}",
+        Reservation.objects.filter(utilisateur=utilisateur, date__gte=depuis).order_by(*ORDRE_PAGINATION),
+    )
+
+def calendrier_salle(request, salle_id):
+    if _abonne(request) is None:
+        return _jeton_invalide()
+    salle = get_object_or_404(Salle, pk=salle_id)
+    depuis = timezone.localdate() - timedelta(days=settings.CALENDRIER_JOURS_PASSES)
+    return _calendrier(
+        f"Occupation de {salle.nom}",
+        Reservation.objects.filter(
+            salle=salle, statut__in=Reservation.STATUTS_ACTIFS, date__gte=depuis,
+        ).order_by(*ORDRE_PAGINATION),
+    )
+
 # ❌ ANNULER UNE RÉSERVATION
 @login_required
 def annuler_reservation(request, reservation_id):
@@ -136,32 +258,244 @@ def annuler_reservation(request, reservation_id):
     
     return redirect('reservation:mes_reservations')  # ✅ CORRIGÉ
 
+# ⏳ LISTE D'ATTENTE
+@login_required
+@require_POST
+def rejoindre_liste_attente(request):
+    form = ListeAttenteForm(request.POST, utilisateur=request.user)
+    if not form.is_valid():
+        for erreurs in form.errors.values():
+            for erreur in erreurs:
+                messages.error(request, erreur)
+        return redirect('reservation:accueil')
+    
+    demande = form.save(commit=False)
+    demande.utilisateur = request.user
+    demande.save()
+    messages.success(
+        request,
+        f"⏳ Vous êtes en liste d'attente pour {demande.salle.nom} le {demande.date} "
+        f"de {demande.heure_debut:%H:%M} à {demande.heure_fin:%H:%M}. "
+        f"Si le créneau se libère, la réservation sera créée pour vous."
+    )
+    return redirect('reservation:mes_reservations')
+
+@login_required
+def quitter_liste_attente(request, demande_id):
+    demande = get_object_or_404(DemandeAttente, id=demande_id, utilisateur=request.user, statut='En file')
+    demande.statut = 'Annulée'
+    demande.save(update_fields=['statut'])
+    messages.success(request, "✅ Vous avez quitté la liste d'attente")
+    return redirect('reservation:mes_reservations')
+
 # 👑 DASHBOARD ADMIN
 @login_required
+@lecture_replique
 def admin_dashboard(request):
     # Vérifier que c'est bien un administrateur
     if request.user.statut != 'administrateur':
         messages.error(request, '⛔ Accès non autorisé')
         return redirect('reservation:accueil')  # ✅ CORRIGÉ
     
-    # Statistiques
-    total_utilisateurs = Utilisateur.objects.count()
-    utilisateurs_en_attente = Utilisateur.objects.filter(est_approuve=False).count()
-    reservations_en_attente = Reservation.objects.filter(statut='En attente').count()
-    reservations_validees = Reservation.objects.filter(statut='Validée').count()
-    total_salles = Salle.objects.count()
+    # Statistiques (compteurs matérialisés, une seule requête)
+    statistiques = lire_statistiques()
     
     # Listes
     utilisateurs_non_approuves = Utilisateur.objects.filter(est_approuve=False)[:10]
-    reservations_a_traiter = Reservation.objects.filter(statut='En attente').order_by('date')[:10]
+    reservations_a_traiter = Reservation.objects.filter(
+        statut='En attente'
+    ).select_related('salle', 'utilisateur').order_by('date')[:10]
     
     context = {
-        'total_utilisateurs': total_utilisateurs,
-        'utilisateurs_en_attente': utilisateurs_en_attente,
-        'reservations_en_attente': reservations_en_attente,
-        'reservations_validees': reservations_validees,
-        'total_salles': total_salles,
+        **statistiques,
         'utilisateurs_non_approuves': utilisateurs_non_approuves,
         'reservations_a_traiter': reservations_a_traiter,
+        'dernier_evenement': flux.dernier_identifiant(),  # 📡 Le flux SSE reprend à partir d'ici
     }
-    return render(request, 'reservation/admin_dashboard.html', context)
\ No newline at end of file
+    return render(request, 'reservation/admin_dashboard.html', context)
+
+# 📡 FLUX SSE DE LA FILE DES RÉSERVATIONS (dashboard admin)
+def _dernier_evenement(request):
+    """🔖 Dernier événement reçu : Last-Event-ID (reconnexion) ou ?depuis= (rendu de la page)"""
+    valeur = request.headers.get('Last-Event-ID') or request.GET.get('depuis')
+    try:
+        return max(int(valeur), 0) if valeur else None
+    except ValueError:
+        return None
+
+@login_required
+async def flux_reservations(request):
+    utilisateur = await request.auser()
+    if utilisateur.statut != 'administrateur':
+        return HttpResponse("Accès non autorisé\n", status=403, content_type='text/plain')
+    
+    dernier = _dernier_evenement(request)
+    if dernier is None:
+        dernier = await flux.adernier_identifiant()
+    # Sous ASGI, un flux ouvert FLUX_DUREE_MAX secondes ne coûte qu'une coroutine.
+    # Sous WSGI, il bloquerait un worker par onglet : simple long-poll d'un
+    # FLUX_INTERVALLE, puis le navigateur se reconnecte (retry, Last-Event-ID)
+    if isinstance(request, ASGIRequest):
+        evenements = flux.aflux(dernier)
+    else:
+        evenements = flux.flux(dernier, duree_max=settings.FLUX_INTERVALLE)
+    reponse = StreamingHttpResponse(evenements, content_type='text/event-stream')
+    reponse['Cache-Control'] = 'no-cache'
+    reponse['X-Accel-Buffering'] = 'no'  # nginx : pas de mise en tampon
+    return reponse
+
+# 🟩 API : GRILLE DE DISPONIBILITÉ DES SALLES
+def _periode(request):
+    """📅 (début, fin) de ?debut=&fin=, ou une JsonResponse d'erreur"""
+    try:
+        debut = date.fromisoformat(request.GET['debut']) if request.GET.get('debut') else timezone.now().date()
+        fin = date.fromisoformat(request.GET['fin']) if request.GET.get('fin') else debut + timedelta(days=6)
+    except ValueError:
+        return JsonResponse({'erreur': "Dates attendues au format AAAA-MM-JJ"}, status=400)
+    
+    if fin < debut or (fin - debut).days > 31:
+        return JsonResponse({'erreur': "Période invalide (31 jours maximum)"}, status=400)
+    return debut, fin
+
+@login_required
+@lecture_replique
+def api_disponibilites(request):
+    periode = _periode(request)
+    if isinstance(periode, JsonResponse):
+        return periode
+    return JsonResponse(grille(*periode))
+
+# ⚡ API ASYNCHRONE (ASGI) : lectures interrogées en boucle par les écrans
+# Sous uvicorn, une requête en attente de la base ne bloque plus un worker entier.
+@login_required
+@lecture_replique
+async def api_disponibilites_async(request):
+    periode = _periode(request)
+    if isinstance(periode, JsonResponse):
+        return periode
+    return JsonResponse(await agrille(*periode))
+
+@login_required
+@lecture_replique
+async def api_statistiques(request):
+    utilisateur = await request.auser()
+    if utilisateur.statut != 'administrateur':
+        return JsonResponse({'erreur': "Accès non autorisé"}, status=403)
+    return JsonResponse(await alire_statistiques())
+
+@login_required
+@lecture_replique
+async def api_mes_reservations(request):
+    utilisateur = await request.auser()
+    try:
+        reservations, curseur_suivant = await apaginer_fusion(
+            historique(utilisateur), CHAMPS_PAGINATION, curseur=request.GET.get('apres'),
+        )
+    except CurseurInvalide:
+        return JsonResponse({'erreur': "Curseur invalide"}, status=400)
+    
+    return JsonResponse({
+        'reservations': [
+            {
+                'id': resa.pk,
+                'salle': resa.salle.nom,
+                'date': resa.date.isoformat(),
+                'heure_debut': resa.heure_debut.strftime('%H:%M'),
+                'heure_fin': resa.heure_fin.strftime('%H:%M'),
+                'statut': resa.statut,
+                'archivee': isinstance(resa, ReservationArchivee),
+            }
+            for resa in reservations
+        ],
+        'suivant': curseur_suivant,
+    })
+
+# 🔎 API : RECHERCHE DE SALLES LIBRES
+@login_required
+@lecture_replique
+def api_recherche_salles(request):
+    form = RechercheSalleForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({'erreurs': form.errors}, status=400)
+    
+    salles = rechercher_salles(**form.cleaned_data)
+    return JsonResponse({'salles': [
+        {
+            'id': salle.pk,
+            'nom': salle.nom,
+            'capacite': salle.capacite,
+            'localisation': salle.localisation,
+            'equipements': salle.liste_equipements,
+            'places_perdues': salle.places_perdues,
+        }
+        for salle in salles
+    ]})
+
+# 🔁 API : RÉSERVATION RÉCURRENTE
+@login_required
+@require_POST
+def api_recurrences(request):
+    form = RecurrenceForm(request.POST, utilisateur=request.user)
+    if not form.is_valid():
+        return JsonResponse({'erreurs': form.errors}, status=400)
+    
+    resultat = reserver_serie(form.save(commit=False))
+    return JsonResponse({
+        'recurrence': form.instance.pk,
+        'creees': [{'id': resa.pk, 'date': resa.date.isoformat()} for resa in resultat.creees],
+        'conflits': [
+            {'date': jour.isoformat(), 'reservations': pks}
+            for jour, pks in resultat.conflits.items()
+        ],
+    }, status=201)
+
+# 📊 ANALYSES D'OCCUPATION (équipe du personnel)
+def _periode_analyse(request):
+    """📅 (début, fin) de ?debut=&fin= ; par défaut les 4 dernières semaines"""
+    try:
+        fin = date.fromisoformat(request.GET['fin']) if request.GET.get('fin') else timezone.localdate()
+        debut = date.fromisoformat(request.GET['debut']) if request.GET.get('debut') else fin - timedelta(days=27)
+    except ValueError:
+        raise ValueError("Dates attendues au format AAAA-MM-JJ")
+    if fin < debut or (fin - debut).days >= settings.ANALYSES_JOURS_MAX:
+        raise ValueError(f"Période invalide ({settings.ANALYSES_JOURS_MAX} jours maximum)")
+    return debut, fin
+
+@staff_member_required
+@lecture_replique
+def api_occupation(request):
+    try:
+        periode = _periode_analyse(request)
+    except ValueError as erreur:
+        return JsonResponse({'erreur': str(erreur)}, status=400)
+    return JsonResponse(occupation(*periode))
+
+@staff_member_required
+@lecture_replique
+def analyses_occupation(request):
+    try:
+        debut, fin = _periode_analyse(request)
+        resultat = occupation(debut, fin)
+    except ValueError as erreur:  # Période invalide
+        messages.error(request, f"⚠️ {erreur}")
+        return render(request, 'reservation/occupation.html', {'resultat': None})
+    
+    return render(request, 'reservation/occupation.html', {
+        'resultat': resultat,
+        'lignes_matrice': list(zip(resultat['jours'], resultat['matrice'])),
+        # Salles les plus sollicitées d'abord
+        'salles': sorted(resultat['salles'], key=lambda salle: -salle['utilisation']),
+        'url_json': f"{reverse('reservation:api_occupation')}?debut={debut}&fin={fin}",
+    })
+
+# 📈 MÉTRIQUES PROMETHEUS
+def metriques(request):
+    # Scraper Prometheus (jeton Bearer) ou membre du staff connecté
+    jeton = getattr(settings, 'INSTRUMENTATION_JETON', '')
+    autorisation = request.headers.get('Authorization', '')
+    par_jeton = bool(jeton) and hmac.compare_digest(autorisation, f"Bearer {jeton}")
+    if not (par_jeton or request.user.is_staff):
+        return HttpResponse("Accès non autorisé\n", status=403, content_type='text/plain')
+    
+    return HttpResponse(registre_metriques.prometheus(),
+                        content_type='text/plain; version=0.0.4; charset=utf-8')